@@ -0,0 +1,128 @@
+# integraciones/clientes_google.py
+"""
+Credenciales y clientes de Google Drive / Docs compartidos por todo el proceso.
+
+Antes cada sync releía service_account.json (credenciales nuevas = pedir un
+access token de nuevo) y armaba los servicios desde cero, con conexiones
+HTTP nuevas. Acá:
+
+- Las credenciales se cargan una vez (se recargan si cambia el archivo) y
+  conservan su token; google-auth lo renueva solo cuando vence.
+- Los servicios se arman desde el documento de discovery que trae
+  googleapiclient, parseado una sola vez.
+- Los pares (drive, docs) con su transporte autorizado se reusan entre
+  requests. httplib2 no es thread-safe: cada par se presta a un solo hilo
+  a la vez (ver clientes_google()).
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+import google_auth_httplib2
+import httplib2
+from django.conf import settings
+from google.oauth2 import service_account
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    "https://www.googleapis.com/auth/drive.readonly",
+    "https://www.googleapis.com/auth/documents.readonly",
+]
+
+# Timeout de cada pedido HTTP a Google (segundos)
+GOOGLE_HTTP_TIMEOUT = getattr(settings, "GOOGLE_HTTP_TIMEOUT", 60)
+
+# Pares de clientes ociosos que se guardan para reusar
+CLIENTES_MAX_LIBRES = getattr(settings, "PRICE_DOC_SYNC_WORKERS", 4)
+
+_lock = threading.Lock()
+_credenciales = {"clave": None, "credentials": None}
+_clientes_libres = []  # [(credentials, drive, docs)]
+
+
+def _ruta_service_account():
+    return os.path.join(settings.BASE_DIR, "credenciales", "service_account.json")
+
+
+def get_google_credentials():
+    """
+    Credenciales del service account, cargadas una vez por proceso.
+    Si el archivo cambia (otra clave) se vuelven a leer y se descartan los
+    clientes armados con las anteriores.
+    """
+    key_path = _ruta_service_account()
+    clave = (key_path, os.path.getmtime(key_path))
+
+    with _lock:
+        if _credenciales["clave"] == clave:
+            return _credenciales["credentials"]
+
+        credentials = service_account.Credentials.from_service_account_file(
+            key_path,
+            scopes=SCOPES,
+        )
+        _credenciales.update(clave=clave, credentials=credentials)
+        _clientes_libres.clear()
+
+    sa_email = getattr(credentials, "service_account_email", "desconocido")
+    logger.info("SERVICE ACCOUNT EMAIL: %s", sa_email)
+
+    return credentials
+
+
+@lru_cache(maxsize=None)
+def _documento_discovery(servicio, version):
+    # El JSON que viene con googleapiclient (sin pedirlo a la red)
+    return json.loads(discovery_cache.get_static_doc(servicio, version))
+
+
+def _armar_clientes(credentials):
+    """
+    (drive, docs) con un transporte autorizado propio: el token se agrega
+    y renueva en cada pedido, y la conexión queda abierta para el siguiente.
+    """
+    http = google_auth_httplib2.AuthorizedHttp(
+        credentials,
+        http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT),
+    )
+    drive = build_from_document(_documento_discovery("drive", "v3"), http=http)
+    docs = build_from_document(_documento_discovery("docs", "v1"), http=http)
+    return drive, docs
+
+
+@contextmanager
+def clientes_google(credentials=None):
+    """
+    Presta un par (drive, docs) para usar en este hilo:
+
+        with clientes_google(credentials) as (drive, docs):
+            ...
+
+    Al salir el par vuelve a quedar libre para otro request / hilo.
+    """
+    credentials = credentials or get_google_credentials()
+
+    par = None
+    with _lock:
+        for i in range(len(_clientes_libres) - 1, -1, -1):
+            if _clientes_libres[i][0] is credentials:
+                par = _clientes_libres.pop(i)[1:]
+                break
+    if par is None:
+        par = _armar_clientes(credentials)
+
+    try:
+        yield par
+    finally:
+        with _lock:
+            # Si mientras tanto cambió la clave, el par quedó viejo: no se guarda
+            vigente = credentials is _credenciales["credentials"]
+            if vigente and len(_clientes_libres) < CLIENTES_MAX_LIBRES:
+                _clientes_libres.append((credentials, *par))
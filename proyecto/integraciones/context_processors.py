@@ -1,4 +1,4 @@
-from integraciones.views import fetch_instagram_media
+from integraciones.instagram import fetch_instagram_media
 
 def instagram_feed(request):
     """
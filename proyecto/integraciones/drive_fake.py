@@ -0,0 +1,249 @@
+# integraciones/drive_fake.py
+"""
+Clientes falsos de Google Drive / Docs para probar la sincronización de
+listas de precios sin red ni credenciales.
+
+    drive = DriveFake(demora=0.2)
+    drive.agregar_doc("DOC1", [["ART1", "Mate", "$ 1.000"]], revision="r1")
+    drive.agregar_archivo("PDF1", open("lista.pdf", "rb").read(), mime_type=PDF_MIME)
+
+    sync_price_doc_and_build_candidates(source, None, drive=drive, docs=drive)
+    sync_all_price_sources(None, clientes=lambda credentials: (drive, drive))
+    revisar_fuentes_vencidas(clientes=lambda credentials: (drive, drive))
+
+Imita sólo lo que usan services_price_doc y programador_precios:
+files().get(...).execute(), files().get_media(...) (compatible con
+MediaIoBaseDownload, por rangos), files().watch(...), channels().stop(...) y
+documents().get(...).execute(). "demora" simula la latencia de cada llamada;
+`pedidos` cuenta las llamadas por tipo ("files.get", "descarga", ...).
+
+Notificaciones push: después de cambiar un archivo vigilado,
+notificaciones(file_id) da los headers que mandaría Drive a cada canal,
+listos para postearlos al callback:
+
+    for headers in drive.notificaciones("DOC1"):
+        client.post(url_callback, **{f"HTTP_{k.upper().replace('-', '_')}": v for k, v in headers.items()})
+"""
+import threading
+import time
+from collections import Counter
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from .services_price_doc import GOOGLE_DOC_MIME, PDF_MIME
+
+
+def doc_json_desde_filas(filas):
+    """
+    JSON de un Google Doc con una tabla armada con las filas dadas
+    (lista de listas de textos), como lo devuelve documents().get().
+    """
+    def _celda(texto):
+        return {
+            "content": [
+                {"paragraph": {"elements": [{"textRun": {"content": f"{texto}\n"}}]}}
+            ]
+        }
+
+    return {
+        "body": {
+            "content": [
+                {
+                    "table": {
+                        "tableRows": [
+                            {"tableCells": [_celda(t) for t in fila]}
+                            for fila in filas
+                        ]
+                    }
+                }
+            ]
+        }
+    }
+
+
+def _no_encontrado(file_id):
+    return HttpError(
+        httplib2.Response({"status": 404}),
+        f"File not found: {file_id}".encode(),
+        uri=f"fake://drive/{file_id}",
+    )
+
+
+class _Ejecutable:
+    def __init__(self, drive, resultado, tipo):
+        self._drive = drive
+        self._resultado = resultado
+        self._tipo = tipo
+
+    def execute(self, num_retries=0):
+        self._drive._llamada(self._tipo)
+        return self._resultado()
+
+
+class _HttpFake:
+    """Responde los pedidos por rango que hace MediaIoBaseDownload."""
+
+    def __init__(self, drive, contenido):
+        self._drive = drive
+        self._contenido = contenido
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        self._drive._llamada("descarga")
+        total = len(self._contenido)
+        rango = (headers or {}).get("range", "")
+        if not rango.startswith("bytes="):
+            return httplib2.Response({"status": 200, "content-length": str(total)}), self._contenido
+
+        desde, hasta = (int(x) for x in rango[len("bytes="):].split("-"))
+        if total == 0:
+            return httplib2.Response({"status": 416, "content-range": "bytes */0"}), b""
+        parte = self._contenido[desde:hasta + 1]
+        fin = desde + len(parte) - 1
+        return (
+            httplib2.Response({"status": 206, "content-range": f"bytes {desde}-{fin}/{total}"}),
+            parte,
+        )
+
+
+class _MediaFake:
+    def __init__(self, drive, file_id, contenido):
+        self.uri = f"fake://drive/{file_id}?alt=media"
+        self.headers = {}
+        self.http = _HttpFake(drive, contenido)
+
+
+class _FilesFake:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def get(self, fileId, fields=None, **kwargs):
+        def _meta():
+            archivo = self._drive._archivo(fileId)
+            return {
+                "id": fileId,
+                "name": archivo["nombre"],
+                "modifiedTime": archivo["modificado"],
+                "headRevisionId": archivo["revision"],
+                "mimeType": archivo["mime_type"],
+            }
+        return _Ejecutable(self._drive, _meta, "files.get")
+
+    def get_media(self, fileId, **kwargs):
+        return _MediaFake(self._drive, fileId, self._drive._archivo(fileId)["contenido"])
+
+    def watch(self, fileId, body, **kwargs):
+        def _abrir():
+            self._drive._archivo(fileId)
+            canal = {
+                "kind": "api#channel",
+                "id": body["id"],
+                "resourceId": f"recurso-{fileId}",
+                "resourceUri": f"fake://drive/{fileId}",
+                "token": body.get("token", ""),
+                "expiration": str(body.get("expiration", "")),
+            }
+            self._drive.canales[body["id"]] = {**canal, "file_id": fileId}
+            return canal
+        return _Ejecutable(self._drive, _abrir, "files.watch")
+
+
+class _ChannelsFake:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def stop(self, body, **kwargs):
+        def _cerrar():
+            self._drive.canales.pop(body["id"], None)
+        return _Ejecutable(self._drive, _cerrar, "channels.stop")
+
+
+class _DocumentsFake:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def get(self, documentId, **kwargs):
+        return _Ejecutable(
+            self._drive,
+            lambda: self._drive._archivo(documentId)["doc_json"],
+            "documents.get",
+        )
+
+
+class DriveFake:
+    """
+    Drive + Docs en memoria. El mismo objeto sirve como cliente de Drive y
+    de Docs, y se puede compartir entre hilos.
+    """
+
+    def __init__(self, demora=0):
+        self.demora = demora
+        self.llamadas = 0
+        self.pedidos = Counter()
+        self.canales = {}  # id -> canal abierto con files().watch()
+        self._archivos = {}
+        self._lock = threading.Lock()
+
+    # ---- carga de archivos ----
+
+    def agregar_archivo(self, file_id, contenido, mime_type=PDF_MIME, revision="1", nombre=""):
+        self._archivos[file_id] = {
+            "nombre": nombre or file_id,
+            "contenido": contenido,
+            "doc_json": None,
+            "mime_type": mime_type,
+            "revision": str(revision),
+            "modificado": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        }
+
+    def agregar_doc(self, file_id, filas, revision="1", nombre=""):
+        """Google Doc nativo con una tabla de filas [ART, producto, ..., "$ precio"]."""
+        self.agregar_archivo(file_id, b"", mime_type=GOOGLE_DOC_MIME, revision=revision, nombre=nombre)
+        self._archivos[file_id]["doc_json"] = doc_json_desde_filas(filas)
+
+    # ---- API de googleapiclient ----
+
+    def files(self):
+        return _FilesFake(self)
+
+    def documents(self):
+        return _DocumentsFake(self)
+
+    def channels(self):
+        return _ChannelsFake(self)
+
+    # ---- notificaciones push ----
+
+    def notificaciones(self, file_id, estado="update", cambiado="content"):
+        """Headers X-Goog-* de la notificación a cada canal abierto sobre el archivo."""
+        headers = []
+        for numero, canal in enumerate(self.canales.values(), start=1):
+            if canal["file_id"] != file_id:
+                continue
+            h = {
+                "X-Goog-Channel-ID": canal["id"],
+                "X-Goog-Channel-Token": canal["token"],
+                "X-Goog-Message-Number": str(numero),
+                "X-Goog-Resource-ID": canal["resourceId"],
+                "X-Goog-Resource-State": estado,
+                "X-Goog-Resource-URI": canal["resourceUri"],
+            }
+            if cambiado:
+                h["X-Goog-Changed"] = cambiado
+            headers.append(h)
+        return headers
+
+    # ---- internos ----
+
+    def _archivo(self, file_id):
+        try:
+            return self._archivos[file_id]
+        except KeyError:
+            raise _no_encontrado(file_id) from None
+
+    def _llamada(self, tipo):
+        with self._lock:
+            self.llamadas += 1
+            self.pedidos[tipo] += 1
+        if self.demora:
+            time.sleep(self.demora)
@@ -14,6 +14,8 @@ class PriceDocSourceForm(forms.ModelForm):
             "activo",
             "orden",
             "es_principal",
+            "snapshots_completos",
+            "intervalo_revision",
         ]
         widgets = {
             "nombre": forms.TextInput(attrs={
@@ -41,6 +43,14 @@ class PriceDocSourceForm(forms.ModelForm):
             "es_principal": forms.CheckboxInput(attrs={
                 "class": "form-check-input",
             }),
+            "snapshots_completos": forms.NumberInput(attrs={
+                "class": "form-control",
+                "min": "1",
+            }),
+            "intervalo_revision": forms.NumberInput(attrs={
+                "class": "form-control",
+                "min": "0",
+            }),
         }
 
     def clean_doc_id(self):
@@ -49,6 +59,13 @@ class PriceDocSourceForm(forms.ModelForm):
             raise forms.ValidationError("Tenés que ingresar el doc_id.")
         return doc_id
 
+    def clean_snapshots_completos(self):
+        completos = self.cleaned_data.get("snapshots_completos") or 0
+        if completos < 1:
+            # La próxima sync compara contra el último: ese tiene que quedar completo
+            raise forms.ValidationError("Tiene que quedar al menos 1 snapshot completo.")
+        return completos
+
     def clean_nombre(self):
         nombre = (self.cleaned_data.get("nombre") or "").strip()
         if not nombre:
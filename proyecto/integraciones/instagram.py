@@ -0,0 +1,197 @@
+# integraciones/instagram.py
+"""
+Feed de Instagram para los templates (context processor instagram_feed).
+
+El render nunca espera a Instagram:
+
+- Se sirve siempre lo último guardado en cache. Si ya venció, se devuelve
+  igual y se refresca en un hilo aparte (stale-while-revalidate).
+- Los errores y la falta de token también se guardan: se sigue mostrando lo
+  último bueno y no se reintenta hasta INSTAGRAM_ERROR_SECONDS.
+- Las imágenes se bajan, se achican y se sirven desde MEDIA
+  (instagram/<id>.jpg): las URLs del CDN de Instagram vencen.
+
+Cada ítem del feed tiene: id, image_url, permalink, caption, timestamp.
+"""
+import logging
+import threading
+import time
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+INSTAGRAM_CACHE_KEY = "instagram_feed"
+INSTAGRAM_LOCK_KEY = "instagram_media_refrescando"
+
+INSTAGRAM_API_URL = "https://graph.instagram.com/me/media"
+
+# Lo último bueno se guarda mucho más que su vigencia: es lo que se sirve
+# mientras se refresca o si Instagram falla
+INSTAGRAM_GUARDAR_SECONDS = 7 * 24 * 3600
+
+# Espera antes de reintentar después de un error
+INSTAGRAM_ERROR_SECONDS = getattr(settings, "INSTAGRAM_ERROR_SECONDS", 300)
+
+# Imágenes espejadas
+INSTAGRAM_CARPETA = "instagram"
+INSTAGRAM_MINIATURA_PX = 640
+INSTAGRAM_IMAGEN_MAX_BYTES = 10 * 1024 * 1024
+
+_refrescando = threading.Lock()
+
+
+def fetch_instagram_media():
+    """
+    Posts recientes de Instagram listos para usar en templates.
+    No hace pedidos: devuelve lo guardado (o [] la primera vez) y, si está
+    vencido, lanza el refresco en segundo plano.
+    """
+    entrada = cache.get(INSTAGRAM_CACHE_KEY)
+    if entrada is None or time.time() >= entrada["vence"]:
+        _refrescar_en_segundo_plano()
+    return entrada["media"] if entrada else []
+
+
+def _refrescar_en_segundo_plano():
+    # Un solo refresco a la vez: en el proceso (lock) y entre procesos (cache.add)
+    if not _refrescando.acquire(blocking=False):
+        return
+    if not cache.add(INSTAGRAM_LOCK_KEY, True, 120):
+        _refrescando.release()
+        return
+
+    def _correr():
+        try:
+            refrescar_instagram_media()
+        finally:
+            cache.delete(INSTAGRAM_LOCK_KEY)
+            _refrescando.release()
+
+    threading.Thread(target=_correr, name="instagram-feed", daemon=True).start()
+
+
+def _guardar(media, vigencia):
+    cache.set(
+        INSTAGRAM_CACHE_KEY,
+        {"media": media, "vence": time.time() + vigencia},
+        INSTAGRAM_GUARDAR_SECONDS,
+    )
+
+
+def refrescar_instagram_media():
+    """
+    Consulta la API de Instagram (Basic Display, con el token de settings),
+    espeja las imágenes y guarda el feed en cache. Si algo falla deja lo
+    último bueno con vigencia corta (cache negativo). Devuelve el feed guardado.
+    """
+    anterior = cache.get(INSTAGRAM_CACHE_KEY)
+    media_anterior = anterior["media"] if anterior else []
+
+    access_token = getattr(settings, "INSTAGRAM_ACCESS_TOKEN", "")
+    limit = getattr(settings, "INSTAGRAM_MEDIA_LIMIT", 8)
+    cache_timeout = getattr(settings, "INSTAGRAM_CACHE_SECONDS", 1800)
+
+    if not access_token:
+        # Se avisa una vez por período, no en cada render
+        logger.warning("INSTAGRAM_ACCESS_TOKEN no configurado")
+        _guardar(media_anterior, cache_timeout)
+        return media_anterior
+
+    params = {
+        "fields": "id,caption,media_type,media_url,permalink,thumbnail_url,timestamp",
+        "access_token": access_token,
+        "limit": limit,
+    }
+
+    try:
+        resp = requests.get(INSTAGRAM_API_URL, params=params, timeout=10)
+        resp.raise_for_status()
+        data = resp.json().get("data", [])
+    except Exception as e:
+        logger.error("Error al consultar Instagram: %s", e, exc_info=True)
+        _guardar(media_anterior, INSTAGRAM_ERROR_SECONDS)
+        return media_anterior
+
+    media = []
+    for item in data:
+        media_type = item.get("media_type")
+        if media_type == "VIDEO":
+            image_url = item.get("thumbnail_url") or item.get("media_url")
+        else:
+            image_url = item.get("media_url")
+
+        if not image_url or not item.get("id"):
+            continue
+
+        media.append(
+            {
+                "id": item.get("id"),
+                "image_url": _espejar_imagen(item["id"], image_url),
+                "permalink": item.get("permalink"),
+                "caption": item.get("caption", ""),
+                "timestamp": item.get("timestamp", ""),
+            }
+        )
+
+    _borrar_imagenes_viejas({m["id"] for m in media})
+    _guardar(media, cache_timeout)
+    return media
+
+
+def _nombre_imagen(media_id) -> str:
+    return f"{INSTAGRAM_CARPETA}/{media_id}.jpg"
+
+
+def _espejar_imagen(media_id, url: str) -> str:
+    """
+    URL local de la imagen del post: la baja y la achica si todavía no está.
+    Si no se puede, queda la URL de Instagram.
+    """
+    nombre = _nombre_imagen(media_id)
+    if default_storage.exists(nombre):
+        return default_storage.url(nombre)
+
+    try:
+        with requests.get(url, timeout=10, stream=True) as resp:
+            resp.raise_for_status()
+            contenido = BytesIO()
+            for parte in resp.iter_content(64 * 1024):
+                contenido.write(parte)
+                if contenido.tell() > INSTAGRAM_IMAGEN_MAX_BYTES:
+                    raise ValueError("imagen demasiado grande")
+
+        contenido.seek(0)
+        with Image.open(contenido) as imagen:
+            imagen = imagen.convert("RGB")
+            imagen.thumbnail((INSTAGRAM_MINIATURA_PX, INSTAGRAM_MINIATURA_PX))
+            salida = BytesIO()
+            imagen.save(salida, "JPEG", quality=85, optimize=True)
+
+        default_storage.save(nombre, ContentFile(salida.getvalue()))
+        return default_storage.url(nombre)
+    except Exception as e:
+        logger.warning("No se pudo espejar la imagen de Instagram %s: %s", media_id, e)
+        return url
+
+
+def _borrar_imagenes_viejas(ids_actuales):
+    """
+    Borra las imágenes espejadas de posts que ya no están en el feed.
+    """
+    try:
+        _, archivos = default_storage.listdir(INSTAGRAM_CARPETA)
+    except (FileNotFoundError, NotImplementedError):
+        return
+
+    actuales = {f"{media_id}.jpg" for media_id in ids_actuales}
+    for archivo in archivos:
+        if archivo not in actuales:
+            default_storage.delete(f"{INSTAGRAM_CARPETA}/{archivo}")
@@ -0,0 +1,107 @@
+# integraciones/management/commands/compactar_snapshots_precios.py
+"""
+Retención de snapshots de listas de precios.
+
+Cada fuente guarda completos (fila por fila en PriceDocItem) sus últimos
+PriceDocSource.snapshots_completos snapshots; los anteriores se compactan
+a un blob comprimido por snapshot. Se siguen pudiendo ver en el
+diagnóstico de matching.
+
+    python manage.py compactar_snapshots_precios
+    python manage.py compactar_snapshots_precios --source 3 --lote 50
+    python manage.py compactar_snapshots_precios --borrar-dias 365   # además borra compactados viejos
+    python manage.py compactar_snapshots_precios --dry-run
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from integraciones.models import PriceDocMatch, PriceDocSnapshot, PriceDocSource
+
+
+class Command(BaseCommand):
+    help = "Compacta (y opcionalmente borra) snapshots viejos de listas de precios, en lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source", type=int, default=None,
+            help="Sólo esta fuente (ID).",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=20,
+            help="Snapshots por lote.",
+        )
+        parser.add_argument(
+            "--borrar-dias", type=int, default=0,
+            help="Borrar snapshots compactados con más de N días (0 = no borrar).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Sólo mostrar qué se haría.",
+        )
+
+    def handle(self, *args, **options):
+        source = None
+        if options["source"] is not None:
+            source = PriceDocSource.objects.filter(pk=options["source"]).first()
+            if source is None:
+                raise CommandError(f"No existe la fuente {options['source']}.")
+        lote = max(1, options["lote"])
+
+        pendientes = PriceDocSnapshot.para_compactar(source)
+        if options["dry_run"]:
+            cantidad = pendientes.count()
+            filas = sum(pendientes.values_list("cantidad_items", flat=True))
+            self.stdout.write(f"Se compactarían {cantidad} snapshots ({filas} filas).")
+        else:
+            snapshots = filas = 0
+            while True:
+                # Cada compactar() marca el snapshot: la consulta se achica sola
+                ids = list(PriceDocSnapshot.para_compactar(source).values_list("id", flat=True)[:lote])
+                if not ids:
+                    break
+                for snapshot in PriceDocSnapshot.objects.filter(pk__in=ids):
+                    filas += snapshot.compactar()
+                    snapshots += 1
+                self.stdout.write(f"  {snapshots} snapshots compactados ({filas} filas)…")
+            self.stdout.write(self.style.SUCCESS(
+                f"{snapshots} snapshots compactados, {filas} filas fuera de PriceDocItem."
+            ))
+            self._purgar_matches(source)
+
+        if options["borrar_dias"] > 0:
+            self._borrar(source, options["borrar_dias"], lote, options["dry_run"])
+
+    def _borrar(self, source, dias, lote, dry_run):
+        viejos = PriceDocSnapshot.objects.filter(
+            compactado=True,
+            creado_en__lt=timezone.now() - timedelta(days=dias),
+        )
+        if source is not None:
+            viejos = viejos.filter(source=source)
+
+        if dry_run:
+            self.stdout.write(f"Se borrarían {viejos.count()} snapshots compactados de más de {dias} días.")
+            return
+
+        borrados = 0
+        while True:
+            ids = list(viejos.values_list("id", flat=True)[:lote])
+            if not ids:
+                break
+            PriceDocSnapshot.objects.filter(pk__in=ids).delete()
+            borrados += len(ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"{borrados} snapshots compactados de más de {dias} días borrados."
+        ))
+
+    def _purgar_matches(self, source):
+        # Matches que quedaron guardados de snapshots ya compactados
+        # (el diagnóstico de un compactado ya no los guarda)
+        sobrantes = PriceDocMatch.objects.filter(snapshot__compactado=True)
+        if source is not None:
+            sobrantes = sobrantes.filter(snapshot__source=source)
+        borrados, _ = sobrantes.delete()
+        if borrados:
+            self.stdout.write(f"{borrados} matches de snapshots compactados borrados.")
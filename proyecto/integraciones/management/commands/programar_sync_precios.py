@@ -0,0 +1,67 @@
+# integraciones/management/commands/programar_sync_precios.py
+"""
+Programador de la sincronización de listas de precios (ver
+integraciones.programador_precios). Pensado para correr como worker:
+
+    python manage.py programar_sync_precios
+    python manage.py programar_sync_precios --espera 30
+    python manage.py programar_sync_precios --una-vez        # p. ej. desde cron
+
+En cada vuelta renueva los canales push de Drive que estén por vencer (si
+PRICE_DOC_PUSH_URL está configurada) y revisa las fuentes a las que les toca.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from integraciones.programador_precios import (
+    push_configurado,
+    renovar_canales,
+    revisar_fuentes_vencidas,
+)
+
+
+class Command(BaseCommand):
+    help = "Revisa periódicamente las listas de precios en Drive y sincroniza las que cambiaron."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--espera", type=int, default=60,
+            help="Segundos entre vueltas.",
+        )
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Hacer una sola vuelta y salir.",
+        )
+
+    def handle(self, *args, **options):
+        if push_configurado():
+            self.stdout.write("Notificaciones push de Drive activadas.")
+
+        try:
+            while True:
+                self._vuelta()
+                if options["una_vez"]:
+                    return
+                time.sleep(max(1, options["espera"]))
+        except KeyboardInterrupt:
+            self.stdout.write("Programador detenido.")
+
+    def _vuelta(self):
+        # Proceso largo: no arrastrar conexiones caídas entre vueltas
+        close_old_connections()
+
+        try:
+            abiertos = renovar_canales()
+            if abiertos:
+                self.stdout.write(f"{abiertos} canales de notificación renovados.")
+
+            for r in revisar_fuentes_vencidas():
+                if r["error"]:
+                    self.stderr.write(f"{r['source_nombre']}: {r['error']}")
+                elif r["sincronizada"]:
+                    self.stdout.write(f"{r['source_nombre']}: sincronizada, {r['cambios']} cambios.")
+        except Exception as e:
+            # Credenciales, red, etc.: se reintenta en la próxima vuelta
+            self.stderr.write(self.style.ERROR(f"Vuelta fallida: {e}"))
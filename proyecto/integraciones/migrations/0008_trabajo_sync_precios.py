@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0007_alter_priceupdatecandidate_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoSyncPrecios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('cambios', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('snapshot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='integraciones.pricedocsnapshot')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_sync', to='integraciones.pricedocsource')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_sync_precios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado_en', '-id'],
+                'indexes': [models.Index(fields=['source', 'creado_en'], name='integracion_source__4da6c1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0008_trabajo_sync_precios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='sincronizando_desde',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:26
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def calcular_hashes(apps, schema_editor):
+    # Mismo cálculo que utils_doc_precios.hash_fila / hash_contenido, copiado
+    # acá para que la migración no dependa del código de la app
+    PriceDocSnapshot = apps.get_model("integraciones", "PriceDocSnapshot")
+    PriceDocItem = apps.get_model("integraciones", "PriceDocItem")
+
+    for snapshot in PriceDocSnapshot.objects.iterator(chunk_size=100):
+        items = list(PriceDocItem.objects.filter(snapshot=snapshot))
+        for item in items:
+            compra = Decimal(item.compra).quantize(Decimal("0.01"))
+            texto = "\x1f".join([item.art or "", item.producto or "", item.descripcion or "", str(compra)])
+            item.row_hash = hashlib.sha1(texto.encode("utf-8")).hexdigest()
+        PriceDocItem.objects.bulk_update(items, ["row_hash"], batch_size=1000)
+
+        snapshot.contenido_hash = hashlib.sha256(
+            "\n".join(sorted(i.row_hash for i in items)).encode("ascii")
+        ).hexdigest()
+        snapshot.save(update_fields=["contenido_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0009_price_source_sincronizando'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricedocitem',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='pricedocsnapshot',
+            name='contenido_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='pricedocitem',
+            index=models.Index(fields=['snapshot', 'art', 'row_hash'], name='integracion_snapsho_fa8606_idx'),
+        ),
+        migrations.RunPython(calcular_hashes, migrations.RunPython.noop),
+    ]
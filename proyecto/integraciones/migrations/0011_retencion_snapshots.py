@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def contar_items(apps, schema_editor):
+    PriceDocSnapshot = apps.get_model("integraciones", "PriceDocSnapshot")
+    PriceDocItem = apps.get_model("integraciones", "PriceDocItem")
+
+    cantidad = (
+        PriceDocItem.objects
+        .filter(snapshot=OuterRef("pk"))
+        .order_by()
+        .values("snapshot")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    PriceDocSnapshot.objects.update(cantidad_items=Coalesce(Subquery(cantidad), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0010_snapshot_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricedocsnapshot',
+            name='cantidad_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pricedocsnapshot',
+            name='compactado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='pricedocsnapshot',
+            name='items_comprimidos',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='snapshots_completos',
+            field=models.PositiveIntegerField(default=5, help_text='Snapshots recientes que se guardan completos; los anteriores se comprimen.'),
+        ),
+        migrations.RunPython(contar_items, migrations.RunPython.noop),
+    ]
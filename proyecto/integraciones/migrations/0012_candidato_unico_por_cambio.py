@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def quitar_duplicados(apps, schema_editor):
+    """
+    Deja un candidato por (fuente, ART, compra vieja, compra nueva):
+    el aplicado si hay alguno, si no el más nuevo.
+    """
+    PriceUpdateCandidate = apps.get_model("integraciones", "PriceUpdateCandidate")
+
+    repetidos = (
+        PriceUpdateCandidate.objects
+        .order_by()
+        .values("source_id", "art", "old_compra", "new_compra")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+    )
+    for r in repetidos:
+        ids = list(
+            PriceUpdateCandidate.objects
+            .filter(
+                source_id=r["source_id"],
+                art=r["art"],
+                old_compra=r["old_compra"],
+                new_compra=r["new_compra"],
+            )
+            .order_by("-aplicado", "-id")
+            .values_list("id", flat=True)
+        )
+        PriceUpdateCandidate.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0011_retencion_snapshots'),
+        ('pdf', '0029_item_factura_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='priceupdatecandidate',
+            constraint=models.UniqueConstraint(fields=('source', 'art', 'old_compra', 'new_compra'), name='candidato_unico_por_cambio'),
+        ),
+    ]
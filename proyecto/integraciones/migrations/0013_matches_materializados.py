@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0012_candidato_unico_por_cambio'),
+        ('pdf', '0029_item_factura_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricedocsnapshot',
+            name='matches_firma',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.CreateModel(
+            name='PriceDocMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('art', models.CharField(max_length=120)),
+                ('producto_doc', models.CharField(blank=True, default='', max_length=255)),
+                ('descripcion_doc', models.TextField(blank=True, default='')),
+                ('compra', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('sku_match', models.CharField(blank=True, default='', max_length=120)),
+                ('match_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('estado', models.CharField(choices=[('exacto', 'Exacto'), ('fuzzy', 'Fuzzy'), ('sin_match', 'Sin match')], default='sin_match', max_length=10)),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pdf.productoprecio')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='integraciones.pricedocsnapshot')),
+            ],
+            options={
+                'ordering': ['orden'],
+                'indexes': [models.Index(fields=['snapshot', 'estado', 'orden'], name='integracion_snapsho_52f302_idx')],
+                'constraints': [models.UniqueConstraint(fields=('snapshot', 'orden'), name='match_unico_por_fila')],
+            },
+        ),
+    ]
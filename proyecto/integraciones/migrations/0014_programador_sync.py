@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integraciones', '0013_matches_materializados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='canal_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='canal_recurso',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='canal_token',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='canal_vence',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='errores_seguidos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='intervalo_revision',
+            field=models.PositiveIntegerField(default=30, help_text='Minutos entre revisiones automáticas en Drive (0 = sólo a mano).'),
+        ),
+        migrations.AddField(
+            model_name='pricedocsource',
+            name='proxima_revision',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
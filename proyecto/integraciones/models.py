@@ -1,9 +1,13 @@
+import json
+import zlib
+from datetime import timedelta
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.conf import settings
-from pdf.models import ProductoPrecio
+from pdf.models import ProductoPrecio, ProductoVariante, StockInsuficiente, StockMovimiento
 
 
 class Pedido(models.Model):
@@ -42,6 +46,54 @@ class Pedido(models.Model):
     def __str__(self):
         return f"Pedido #{self.id} - {self.estado} - ${self.total}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Pago aprobado (webhook, admin o a mano): el stock se descuenta una
+        # sola vez, aunque el pedido se vuelva a guardar o la notificación se repita
+        if self.estado == self.Estado.APROBADO and not self.stock_descontado:
+            self.descontar_stock()
+
+    def descontar_stock(self, usuario=None):
+        """
+        Descuenta del stock los ítems del pedido (pago aprobado), una sola vez.
+
+        La marca stock_descontado se toma con un UPDATE condicional en la misma
+        transacción que los movimientos: si dos notificaciones del pago llegan
+        juntas, solo una descuenta. Devuelve False si ya estaba descontado.
+        """
+        with transaction.atomic():
+            tomado = Pedido.objects.filter(pk=self.pk, stock_descontado=False).update(
+                stock_descontado=True
+            )
+            if not tomado:
+                return False
+            self.stock_descontado = True
+
+            items = list(self.items.all())
+            productos = ProductoPrecio.objects.in_bulk([i.producto_id for i in items])
+            variantes = ProductoVariante.objects.in_bulk([i.variante_id for i in items if i.variante_id])
+
+            for item in items:
+                producto = productos.get(item.producto_id)
+                if producto is None:
+                    # Producto borrado después de la compra: no hay stock que mover
+                    continue
+                variante = variantes.get(item.variante_id)
+                try:
+                    StockMovimiento.mover(
+                        producto, -item.cantidad, StockMovimiento.Motivo.PEDIDO,
+                        variante=variante, ref=self, usuario=usuario,
+                    )
+                except StockInsuficiente as e:
+                    # El pago ya entró: se descuenta lo que haya y la diferencia
+                    # queda a resolver a mano
+                    if e.disponible > 0:
+                        StockMovimiento.mover(
+                            producto, -e.disponible, StockMovimiento.Motivo.PEDIDO,
+                            variante=variante, ref=self, usuario=usuario,
+                        )
+        return True
+
 
 class PedidoItem(models.Model):
     pedido = models.ForeignKey(
@@ -90,7 +142,14 @@ class PagoMP(models.Model):
 Q2 = Decimal("0.01")
 
 
+class SyncEnCurso(Exception):
+    """La fuente ya se está sincronizando en otro hilo / proceso."""
+
+
 class PriceDocSource(models.Model):
+    # Una marca de sync más vieja que esto se da por muerta (reinicio, etc.)
+    SYNC_VENCE = timedelta(minutes=15)
+
     TIPO_CHOICES = [
         ("google_doc", "Google Doc"),
         ("google_sheet", "Google Sheet"),
@@ -140,6 +199,32 @@ class PriceDocSource(models.Model):
     ultimo_estado = models.CharField(max_length=50, blank=True, default="")
     ultimo_error = models.TextField(blank=True, default="")
 
+    # Marca de "sincronizando": una sola sync por fuente a la vez
+    sincronizando_desde = models.DateTimeField(null=True, blank=True)
+
+    # Retención: los últimos N snapshots quedan con sus filas en PriceDocItem,
+    # los más viejos se compactan (ver manage.py compactar_snapshots_precios)
+    snapshots_completos = models.PositiveIntegerField(
+        default=5,
+        help_text="Snapshots recientes que se guardan completos; los anteriores se comprimen.",
+    )
+
+    # Revisión automática (manage.py programar_sync_precios): cada
+    # intervalo_revision minutos se mira la revisión en Drive y sólo si
+    # cambió se descarga. Con errores seguidos la espera se duplica.
+    intervalo_revision = models.PositiveIntegerField(
+        default=30,
+        help_text="Minutos entre revisiones automáticas en Drive (0 = sólo a mano).",
+    )
+    proxima_revision = models.DateTimeField(null=True, blank=True, db_index=True)
+    errores_seguidos = models.PositiveIntegerField(default=0)
+
+    # Canal de notificaciones push de Drive (files.watch), si está configurado
+    canal_id = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    canal_token = models.CharField(max_length=64, blank=True, default="")
+    canal_recurso = models.CharField(max_length=255, blank=True, default="")
+    canal_vence = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ["orden", "nombre"]
 
@@ -151,6 +236,27 @@ class PriceDocSource(models.Model):
         if self.es_principal:
             PriceDocSource.objects.exclude(pk=self.pk).update(es_principal=False)
 
+    def tomar_sync(self):
+        """
+        Toma la marca de sync con un UPDATE condicional: entre hilos o procesos
+        que sincronizan la misma fuente, solo uno la consigue.
+        Levanta SyncEnCurso si otro la tiene (y no venció).
+        """
+        ahora = timezone.now()
+        tomado = (
+            PriceDocSource.objects
+            .filter(pk=self.pk)
+            .filter(Q(sincronizando_desde__isnull=True) | Q(sincronizando_desde__lt=ahora - self.SYNC_VENCE))
+            .update(sincronizando_desde=ahora)
+        )
+        if not tomado:
+            raise SyncEnCurso(f"La fuente '{self.nombre}' ya se está sincronizando.")
+        self.sincronizando_desde = ahora
+
+    def liberar_sync(self):
+        PriceDocSource.objects.filter(pk=self.pk).update(sincronizando_desde=None)
+        self.sincronizando_desde = None
+
 
 class PriceDocSnapshot(models.Model):
     """
@@ -164,9 +270,148 @@ class PriceDocSnapshot(models.Model):
     )
     creado_en = models.DateTimeField(auto_now_add=True)
 
+    # sha256 de los row_hash de sus ítems (sin importar el orden):
+    # dos snapshots con la misma tabla tienen el mismo hash
+    contenido_hash = models.CharField(max_length=64, blank=True, default="")
+
+    # Compactado: sus filas viven comprimidas en items_comprimidos
+    # (JSON + zlib) y ya no en PriceDocItem
+    cantidad_items = models.PositiveIntegerField(default=0)
+    compactado = models.BooleanField(default=False)
+    items_comprimidos = models.BinaryField(null=True, blank=True, editable=False)
+
+    # sha1 de los productos (id, SKU) contra los que se calcularon sus
+    # PriceDocMatch; vacío = todavía sin calcular
+    matches_firma = models.CharField(max_length=40, blank=True, default="")
+
+    CAMPOS_FILA = ("art", "producto", "descripcion", "compra", "row_hash")
+
     def __str__(self):
         return f"Snapshot {self.id} de {self.source} ({self.creado_en})"
 
+    def filas(self):
+        """
+        Ítems del snapshot, esté compactado o no. Los de un snapshot
+        compactado son PriceDocItem sin guardar, armados desde el blob.
+        """
+        if not self.compactado:
+            return list(self.items.all())
+
+        filas = json.loads(zlib.decompress(bytes(self.items_comprimidos)).decode("utf-8"))
+        return [
+            PriceDocItem(
+                snapshot=self,
+                art=art,
+                producto=producto,
+                descripcion=descripcion,
+                compra=Decimal(compra),
+                row_hash=row_hash,
+            )
+            for art, producto, descripcion, compra, row_hash in filas
+        ]
+
+    def compactar(self):
+        """
+        Pasa las filas a items_comprimidos y las borra de PriceDocItem.
+        Devuelve la cantidad de filas compactadas.
+        """
+        if self.compactado:
+            return 0
+
+        with transaction.atomic():
+            filas = [
+                [art, producto, descripcion, str(compra), row_hash]
+                for art, producto, descripcion, compra, row_hash in (
+                    self.items.order_by("id").values_list(*self.CAMPOS_FILA)
+                )
+            ]
+            self.items_comprimidos = zlib.compress(
+                json.dumps(filas, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                9,
+            )
+            self.cantidad_items = len(filas)
+            self.compactado = True
+            # Compactado no guarda matches: el diagnóstico los calcula en memoria
+            self.matches_firma = ""
+            self.save(update_fields=["items_comprimidos", "cantidad_items", "compactado", "matches_firma"])
+            self.items.all().delete()
+            self.matches.all().delete()
+        return len(filas)
+
+    @classmethod
+    def para_compactar(cls, source=None):
+        """
+        Snapshots completos que quedaron fuera de la retención de su fuente.
+        El último de cada fuente nunca se compacta: es contra el que compara la próxima sync.
+        """
+        sources = PriceDocSource.objects.all()
+        if source is not None:
+            sources = sources.filter(pk=source.pk)
+
+        ids = []
+        for source_id, completos in sources.values_list("id", "snapshots_completos"):
+            ids.extend(
+                cls.objects
+                .filter(source_id=source_id)
+                .order_by("-creado_en", "-id")
+                .values_list("id", flat=True)[max(1, completos):]
+            )
+        return cls.objects.filter(pk__in=ids, compactado=False).order_by("creado_en", "id")
+
+
+class TrabajoSyncPrecios(models.Model):
+    """
+    Sincronización de una fuente corrida fuera del request
+    (ver services_price_doc.iniciar_sync_fuente). La pantalla de cambios
+    sólo lee candidatos guardados y consulta este trabajo por polling.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", "Pendiente"
+        PROCESANDO = "procesando", "Procesando"
+        LISTO = "listo", "Listo"
+        ERROR = "error", "Error"
+
+    source = models.ForeignKey(
+        PriceDocSource,
+        on_delete=models.CASCADE,
+        related_name="trabajos_sync",
+    )
+    estado = models.CharField(max_length=12, choices=Estado.choices, default=Estado.PENDIENTE)
+
+    cambios = models.PositiveIntegerField(default=0)
+    snapshot = models.ForeignKey(
+        PriceDocSnapshot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    error = models.TextField(blank=True, default="")
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="trabajos_sync_precios",
+    )
+    creado_en = models.DateTimeField(default=timezone.now)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-creado_en", "-id"]
+        indexes = [
+            models.Index(fields=["source", "creado_en"]),
+        ]
+
+    def __str__(self):
+        return f"Sync {self.source_id} ({self.estado})"
+
+    @property
+    def terminado(self):
+        return self.estado in (self.Estado.LISTO, self.Estado.ERROR)
+
 
 class PriceDocItem(models.Model):
     """
@@ -184,10 +429,68 @@ class PriceDocItem(models.Model):
     descripcion = models.TextField(blank=True, default="")
     compra = models.DecimalField(max_digits=12, decimal_places=2)
 
+    # sha1 de (art, producto, descripcion, compra): si coincide con el del
+    # snapshot anterior para el mismo ART, la fila no cambió
+    row_hash = models.CharField(max_length=40, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["snapshot", "art", "row_hash"]),
+        ]
+
     def __str__(self):
         return f"{self.art} - {self.compra}"
 
 
+class PriceDocMatch(models.Model):
+    """
+    Resultado del match de una fila del snapshot contra ProductoPrecio,
+    calculado al crear el snapshot (ver services_price_doc.materializar_matches)
+    y recalculado sólo cuando cambian los productos.
+    """
+    class Estado(models.TextChoices):
+        EXACTO = "exacto", "Exacto"
+        FUZZY = "fuzzy", "Fuzzy"
+        SIN_MATCH = "sin_match", "Sin match"
+
+    snapshot = models.ForeignKey(
+        PriceDocSnapshot,
+        on_delete=models.CASCADE,
+        related_name="matches",
+    )
+    # Posición de la fila dentro del snapshot
+    orden = models.PositiveIntegerField()
+
+    # Copia de la fila (sirve también para snapshots compactados)
+    art = models.CharField(max_length=120)
+    producto_doc = models.CharField(max_length=255, blank=True, default="")
+    descripcion_doc = models.TextField(blank=True, default="")
+    compra = models.DecimalField(max_digits=12, decimal_places=2)
+
+    producto = models.ForeignKey(
+        ProductoPrecio,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    sku_match = models.CharField(max_length=120, blank=True, default="")
+    match_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    estado = models.CharField(max_length=10, choices=Estado.choices, default=Estado.SIN_MATCH)
+
+    class Meta:
+        ordering = ["orden"]
+        indexes = [
+            models.Index(fields=["snapshot", "estado", "orden"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["snapshot", "orden"], name="match_unico_por_fila"),
+        ]
+
+    def __str__(self):
+        return f"{self.art} → {self.sku_match or '—'} ({self.estado})"
+
+
 class PriceUpdateCandidate(models.Model):
     """
     Cambio detectado entre dos snapshots para un ART.
@@ -240,6 +543,13 @@ class PriceUpdateCandidate(models.Model):
             models.Index(fields=["source", "art"]),
             models.Index(fields=["aprobado", "aplicado"]),
         ]
+        constraints = [
+            # Un candidato por cambio: el sync hace upsert sobre esta clave
+            models.UniqueConstraint(
+                fields=["source", "art", "old_compra", "new_compra"],
+                name="candidato_unico_por_cambio",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.art} ({self.old_compra} → {self.new_compra})"
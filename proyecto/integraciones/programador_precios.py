@@ -0,0 +1,278 @@
+# integraciones/programador_precios.py
+"""
+Sincronización automática de las listas de precios.
+
+- Revisión periódica: cada fuente activa se revisa cada `intervalo_revision`
+  minutos con files().get(fields=headRevisionId, modifiedTime), que es
+  barato. Sólo si la revisión cambió se descarga y se arma el snapshot.
+  Con errores seguidos la espera se duplica (hasta REVISION_ESPERA_MAX) y
+  siempre lleva un poco de azar para que las fuentes no se junten.
+- Notificaciones push de Drive (si PRICE_DOC_PUSH_URL está configurada):
+  cada fuente mantiene un canal de files().watch(); cuando Drive avisa que
+  cambió el contenido se lanza la sync en segundo plano sin esperar a la
+  próxima revisión.
+
+Lo corre manage.py programar_sync_precios.
+"""
+import logging
+import random
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .clientes_google import clientes_google
+from .models import PriceDocSource, SyncEnCurso
+from .services_price_doc import (
+    iniciar_sync_fuente,
+    registrar_estado_sync,
+    sync_price_doc_and_build_candidates,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Tope de la espera entre revisiones cuando una fuente viene fallando
+REVISION_ESPERA_MAX = timedelta(hours=6)
+
+# ± fracción de azar sobre cada espera
+REVISION_JITTER = 0.1
+
+# URL pública (https) a la que Drive manda las notificaciones; vacía = sin push
+PUSH_URL = getattr(settings, "PRICE_DOC_PUSH_URL", "")
+
+# Drive acepta canales de archivos de hasta un día; se renuevan antes de vencer
+CANAL_DURACION = timedelta(days=1)
+CANAL_RENOVAR_ANTES = timedelta(hours=2)
+
+# Si no se pudo abrir el canal, cuánto esperar para volver a intentar
+CANAL_REINTENTO = timedelta(minutes=30)
+
+
+# ============================================================
+# Revisión periódica
+# ============================================================
+
+def espera_hasta_revision(source: PriceDocSource) -> timedelta:
+    """
+    Intervalo de la fuente, duplicado por cada error seguido (con tope)
+    y con ±REVISION_JITTER de azar.
+    """
+    espera = timedelta(minutes=source.intervalo_revision)
+    if source.errores_seguidos:
+        espera = min(
+            espera * 2 ** min(source.errores_seguidos, 10),
+            max(espera, REVISION_ESPERA_MAX),
+        )
+    return espera * random.uniform(1 - REVISION_JITTER, 1 + REVISION_JITTER)
+
+
+def _programar(source: PriceDocSource, error: bool):
+    source.errores_seguidos = source.errores_seguidos + 1 if error else 0
+    source.proxima_revision = timezone.now() + espera_hasta_revision(source)
+    source.save(update_fields=["errores_seguidos", "proxima_revision"])
+
+
+def fuentes_a_revisar(ahora=None):
+    """
+    Fuentes activas con revisión automática cuya próxima revisión ya llegó
+    (o que nunca se revisaron).
+    """
+    ahora = ahora or timezone.now()
+    return (
+        PriceDocSource.objects
+        .filter(activo=True, intervalo_revision__gt=0)
+        .exclude(doc_id="")
+        .exclude(doc_id__iexact="legacy")
+        .filter(Q(proxima_revision__isnull=True) | Q(proxima_revision__lte=ahora))
+        .order_by("proxima_revision", "orden", "id")
+    )
+
+
+def revisar_fuente(source: PriceDocSource, drive, docs) -> dict:
+    """
+    Mira la revisión del archivo en Drive y, sólo si cambió, sincroniza.
+    Deja programada la próxima revisión. Devuelve un resumen.
+    """
+    resultado = {
+        "source_id": source.id,
+        "source_nombre": source.nombre,
+        "sincronizada": False,
+        "cambios": 0,
+        "error": "",
+    }
+
+    try:
+        meta = drive.files().get(
+            fileId=source.doc_id,
+            fields="headRevisionId, modifiedTime",
+        ).execute()
+        revision = meta.get("headRevisionId") or meta.get("modifiedTime") or ""
+
+        if revision and revision == source.last_revision_id:
+            _programar(source, error=False)
+            return resultado
+
+        cambios, _ = sync_price_doc_and_build_candidates(source, None, drive=drive, docs=docs)
+    except SyncEnCurso:
+        # La está sincronizando otro (botón, push): se revisa en el próximo turno
+        _programar(source, error=False)
+        return resultado
+    except Exception as e:
+        logger.warning("Revisión de la fuente %s falló: %s", source.pk, e)
+        resultado["error"] = str(e)
+        registrar_estado_sync(source, error=str(e))
+        _programar(source, error=True)
+        return resultado
+
+    resultado["sincronizada"] = True
+    resultado["cambios"] = cambios
+    registrar_estado_sync(source)
+    _programar(source, error=False)
+    return resultado
+
+
+def revisar_fuentes_vencidas(clientes=None) -> list[dict]:
+    """
+    Una pasada del programador: revisa las fuentes que tocan ahora.
+
+    clientes: callable(credentials) -> (drive, docs) para usar otros clientes
+    (p. ej. integraciones.drive_fake); por defecto los compartidos de Google.
+    """
+    fuentes = list(fuentes_a_revisar())
+    if not fuentes:
+        return []
+
+    if clientes is not None:
+        drive, docs = clientes(None)
+        return [revisar_fuente(source, drive, docs) for source in fuentes]
+
+    with clientes_google() as (drive, docs):
+        return [revisar_fuente(source, drive, docs) for source in fuentes]
+
+
+# ============================================================
+# Notificaciones push de Drive
+# ============================================================
+
+def push_configurado() -> bool:
+    return bool(PUSH_URL)
+
+
+def canales_a_renovar(ahora=None):
+    """
+    Fuentes activas con revisión automática sin canal o con el canal por vencer.
+    """
+    ahora = ahora or timezone.now()
+    return (
+        PriceDocSource.objects
+        .filter(activo=True, intervalo_revision__gt=0)
+        .exclude(doc_id="")
+        .exclude(doc_id__iexact="legacy")
+        .filter(Q(canal_vence__isnull=True) | Q(canal_vence__lte=ahora + CANAL_RENOVAR_ANTES))
+    )
+
+
+def renovar_canal(source: PriceDocSource, drive):
+    """
+    Abre un canal nuevo de files().watch() para la fuente y cierra el anterior.
+    Las notificaciones del canal viejo que lleguen igual se ignoran
+    (ver recibir_notificacion).
+    """
+    anterior = (source.canal_id, source.canal_recurso)
+    canal_id = uuid.uuid4().hex
+    token = secrets.token_urlsafe(24)
+    vence = timezone.now() + CANAL_DURACION
+
+    canal = drive.files().watch(
+        fileId=source.doc_id,
+        body={
+            "id": canal_id,
+            "type": "web_hook",
+            "address": PUSH_URL,
+            "token": token,
+            "expiration": int(vence.timestamp() * 1000),
+        },
+    ).execute()
+
+    source.canal_id = canal_id
+    source.canal_token = token
+    source.canal_recurso = canal.get("resourceId", "")
+    if canal.get("expiration"):
+        vence = datetime.fromtimestamp(int(canal["expiration"]) / 1000, tz=dt_timezone.utc)
+    source.canal_vence = vence
+    source.save(update_fields=["canal_id", "canal_token", "canal_recurso", "canal_vence"])
+
+    if anterior[0]:
+        try:
+            drive.channels().stop(body={"id": anterior[0], "resourceId": anterior[1]}).execute()
+        except Exception as e:
+            # Si no se pudo cerrar vence solo
+            logger.info("No se pudo cerrar el canal %s: %s", anterior[0], e)
+
+
+def renovar_canales(clientes=None) -> int:
+    """
+    Renueva los canales push que hacen falta. Devuelve cuántos abrió.
+    """
+    if not push_configurado():
+        return 0
+
+    fuentes = list(canales_a_renovar())
+    if not fuentes:
+        return 0
+
+    def _renovar(drive):
+        abiertos = 0
+        for source in fuentes:
+            try:
+                renovar_canal(source, drive)
+                abiertos += 1
+            except Exception as e:
+                logger.warning("No se pudo abrir el canal de la fuente %s: %s", source.pk, e)
+                # Mientras tanto queda la revisión periódica; se reintenta más tarde
+                PriceDocSource.objects.filter(pk=source.pk).update(
+                    canal_vence=timezone.now() + CANAL_RENOVAR_ANTES + CANAL_REINTENTO
+                )
+        return abiertos
+
+    if clientes is not None:
+        return _renovar(clientes(None)[0])
+    with clientes_google() as (drive, _):
+        return _renovar(drive)
+
+
+def recibir_notificacion(headers) -> bool:
+    """
+    Procesa una notificación de Drive (headers X-Goog-*).
+    Devuelve False si el canal no es de ninguna fuente activa o el token no
+    coincide. Si cambió el contenido lanza la sync de la fuente en segundo plano.
+    """
+    canal_id = headers.get("X-Goog-Channel-ID", "")
+    token = headers.get("X-Goog-Channel-Token", "")
+    if not canal_id:
+        return False
+
+    source = PriceDocSource.objects.filter(activo=True, canal_id=canal_id).first()
+    if source is None or not secrets.compare_digest(token, source.canal_token):
+        return False
+
+    estado = headers.get("X-Goog-Resource-State", "")
+    cambiado = headers.get("X-Goog-Changed", "")
+    # "sync" confirma el canal; trash / remove no traen lista nueva;
+    # los cambios sólo de permisos o nombre no cambian precios
+    if estado not in {"update", "change"}:
+        return True
+    if cambiado and "content" not in cambiado.split(","):
+        return True
+
+    try:
+        iniciar_sync_fuente(source)
+    except Exception as e:
+        # Queda para la próxima revisión periódica
+        logger.warning("No se pudo lanzar la sync de la fuente %s: %s", source.pk, e)
+        PriceDocSource.objects.filter(pk=source.pk).update(proxima_revision=timezone.now())
+    return True
@@ -1,24 +1,37 @@
 # integraciones/services_price_doc.py
-from io import BytesIO
-
-from django.db import transaction
+import difflib
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, Max, OuterRef, Subquery
 from django.utils import timezone
 
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 
-from pdf.models import ProductoPrecio
-from pdf.utils import get_similarity
+from pdf.models import PrecioHistorial, ProductoPrecio
 
+from .clientes_google import clientes_google, get_google_credentials
 from .models import (
+    PriceDocItem,
+    PriceDocMatch,
     PriceDocSource,
     PriceDocSnapshot,
     PriceUpdateCandidate,
+    Q2,
+    SyncEnCurso,
+    TrabajoSyncPrecios,
 )
 from .utils_doc_precios import (
     crear_snapshot_desde_doc_json,
-    crear_snapshot_desde_docx_bytes,
-    crear_snapshot_desde_pdf_bytes,
+    crear_snapshot_desde_docx,
+    crear_snapshot_desde_pdf,
 )
 
 
@@ -26,37 +39,42 @@ GOOGLE_DOC_MIME = "application/vnd.google-apps.document"
 PDF_MIME = "application/pdf"
 DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
 
+# Un trabajo de sync "procesando" más viejo que esto se da por muerto (reinicio, etc.)
+SYNC_TRABAJO_VENCE = timedelta(minutes=15)
 
-def _build_drive_service(credentials):
-    """
-    Cliente para Google Drive API.
-    """
-    return build("drive", "v3", credentials=credentials)
+# Fuentes sincronizadas a la vez en sync_all_price_sources
+SYNC_MAX_WORKERS = getattr(settings, "PRICE_DOC_SYNC_WORKERS", 4)
 
+# Tamaño de los bloques de bulk_create / bulk_update
+BULK_CHUNK = 500
 
-def _build_docs_service(credentials):
-    """
-    Cliente para Google Docs API.
-    (Solo se usa si el archivo es un documento de Google nativo).
-    """
-    return build("docs", "v1", credentials=credentials)
+# Descargas de Drive: tamaño de cada pedido por rango y hasta cuánto se
+# guarda en memoria antes de pasar a un archivo temporal en disco
+DRIVE_CHUNK = getattr(settings, "PRICE_DOC_DOWNLOAD_CHUNK", 8 * 1024 * 1024)
+DRIVE_SPOOL_MAX = getattr(settings, "PRICE_DOC_SPOOL_MAX", 2 * 1024 * 1024)
 
 
-def _download_drive_file_bytes(drive, file_id: str) -> bytes:
+def _download_drive_file(drive, file_id: str):
     """
-    Descarga un archivo de Drive y devuelve su contenido en bytes.
+    Descarga un archivo de Drive a un SpooledTemporaryFile (en memoria hasta
+    DRIVE_SPOOL_MAX, después en disco) y lo devuelve posicionado al inicio.
+    Se baja por partes de DRIVE_CHUNK: en memoria nunca hay más que una.
+    El que lo llama lo cierra (usarlo con `with`).
     """
-    buf = BytesIO()
-    request_download = drive.files().get_media(fileId=file_id)
-    downloader = MediaIoBaseDownload(buf, request_download)
+    archivo = tempfile.SpooledTemporaryFile(max_size=DRIVE_SPOOL_MAX)
+    try:
+        request_download = drive.files().get_media(fileId=file_id)
+        downloader = MediaIoBaseDownload(archivo, request_download, chunksize=DRIVE_CHUNK)
 
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+    except Exception:
+        archivo.close()
+        raise
 
-    file_bytes = buf.getvalue()
-    buf.close()
-    return file_bytes
+    archivo.seek(0)
+    return archivo
 
 
 def _build_snapshot_from_source(
@@ -64,39 +82,75 @@ def _build_snapshot_from_source(
     drive,
     docs,
     mime_type: str,
-) -> PriceDocSnapshot:
+) -> PriceDocSnapshot | None:
     """
     Crea el snapshot según el tipo real del archivo.
+    None si la tabla es idéntica a la del último snapshot.
     """
     if mime_type == GOOGLE_DOC_MIME:
         doc_json = docs.documents().get(documentId=source.doc_id).execute()
         return crear_snapshot_desde_doc_json(source, doc_json)
 
-    file_bytes = _download_drive_file_bytes(drive, source.doc_id)
-
-    if mime_type == PDF_MIME:
-        return crear_snapshot_desde_pdf_bytes(source, file_bytes)
-
-    if mime_type == DOCX_MIME:
-        return crear_snapshot_desde_docx_bytes(source, file_bytes)
-
     # Fallback:
     # si el tipo no vino bien pero en el modelo el usuario marcó pdf/docx,
     # intentamos según source.tipo
-    if source.tipo == "pdf":
-        return crear_snapshot_desde_pdf_bytes(source, file_bytes)
+    if mime_type == PDF_MIME or (mime_type != DOCX_MIME and source.tipo == "pdf"):
+        crear_snapshot = crear_snapshot_desde_pdf
+    elif mime_type == DOCX_MIME or source.tipo in {"docx_drive", "otro"}:
+        crear_snapshot = crear_snapshot_desde_docx
+    else:
+        raise ValueError(
+            f"Tipo de archivo no soportado. mime_type={mime_type!r}, source.tipo={source.tipo!r}"
+        )
+
+    # Se parsea directo desde el archivo temporal, sin pasarlo a bytes
+    with _download_drive_file(drive, source.doc_id) as archivo:
+        return crear_snapshot(source, archivo)
+
+
+def _cambios_entre_snapshots(snapshot_old: PriceDocSnapshot, snapshot_new: PriceDocSnapshot):
+    """
+    [(art, compra_anterior, item_nuevo)] para los ART de ambos snapshots
+    cuya compra cambió.
 
-    if source.tipo in {"docx_drive", "otro"}:
-        return crear_snapshot_desde_docx_bytes(source, file_bytes)
+    Las filas con el mismo (art, row_hash) en el anterior se descartan primero
+    con el índice (snapshot, art, row_hash), así que la compra anterior sólo
+    se busca para las que cambiaron. Con ART repetidos en el anterior se
+    compara contra la compra más alta; en el nuevo gana la última fila.
+    """
+    anteriores = PriceDocItem.objects.filter(snapshot=snapshot_old, art=OuterRef("art"))
+    compra_anterior = (
+        anteriores
+        .order_by()
+        .values("art")
+        .annotate(compra_max=Max("compra"))
+        .values("compra_max")[:1]
+    )
 
-    raise ValueError(
-        f"Tipo de archivo no soportado. mime_type={mime_type!r}, source.tipo={source.tipo!r}"
+    cambiados = (
+        PriceDocItem.objects
+        .filter(snapshot=snapshot_new)
+        .exclude(art="")
+        .annotate(sin_cambios=Exists(anteriores.filter(row_hash=OuterRef("row_hash"))))
+        .filter(sin_cambios=False)
+        .annotate(old_compra=Subquery(compra_anterior))
+        .filter(old_compra__isnull=False)
+        .exclude(compra=F("old_compra"))
+        .order_by("id")
     )
 
+    por_art = {}
+    for item in cambiados:
+        por_art[item.art] = item
+
+    return [(art, item.old_compra, item) for art, item in por_art.items()]
+
 
 def sync_price_doc_and_build_candidates(
     source: PriceDocSource,
     credentials,
+    drive=None,
+    docs=None,
 ) -> tuple[int, PriceDocSnapshot | None]:
     """
     Sincroniza la lista de precios de una fuente.
@@ -110,19 +164,34 @@ def sync_price_doc_and_build_candidates(
     - Consulta metadata en Drive
     - Si la revisión no cambió -> devuelve (0, None)
     - Si cambió:
-        - crea snapshot nuevo
+        - crea snapshot nuevo (si la tabla es idéntica a la anterior no
+          se guarda nada y devuelve (0, None))
         - compara con snapshot anterior
         - genera/actualiza candidatos de cambio
         - devuelve (cantidad_cambios, snapshot_nuevo)
+
+    drive / docs: clientes ya armados (p. ej. integraciones.drive_fake para
+    probar sin red); si no vienen se piden prestados a clientes_google.
+
+    Levanta SyncEnCurso si la fuente ya se está sincronizando en otro lado.
     """
     if not source.doc_id or source.doc_id.strip().lower() == "legacy":
         raise ValueError(
             f"La fuente '{source.nombre}' no tiene un doc_id válido."
         )
 
-    drive = _build_drive_service(credentials)
-    docs = _build_docs_service(credentials)
+    source.tomar_sync()
+    try:
+        if drive is not None and docs is not None:
+            return _sync_price_doc(source, drive, docs)
+        # Clientes compartidos del proceso (ver clientes_google)
+        with clientes_google(credentials) as (drive_google, docs_google):
+            return _sync_price_doc(source, drive or drive_google, docs or docs_google)
+    finally:
+        source.liberar_sync()
+
 
+def _sync_price_doc(source: PriceDocSource, drive, docs):
     # 1) Metadata del archivo
     meta = drive.files().get(
         fileId=source.doc_id,
@@ -138,7 +207,16 @@ def sync_price_doc_and_build_candidates(
         source.save(update_fields=["last_modified_time"])
         return 0, None
 
-    # 2) Crear snapshot nuevo según el tipo de archivo
+    # 2) Snapshot anterior (antes de crear el nuevo)
+    snapshot_old = (
+        PriceDocSnapshot.objects
+        .filter(source=source)
+        .order_by("-creado_en", "-id")
+        .first()
+    )
+
+    # 3) Crear snapshot nuevo según el tipo de archivo
+    #    (None si la tabla quedó igual: p. ej. un cambio sólo de formato)
     snapshot_new = _build_snapshot_from_source(
         source=source,
         drive=drive,
@@ -146,145 +224,332 @@ def sync_price_doc_and_build_candidates(
         mime_type=mime_type,
     )
 
-    # 3) Buscar snapshot anterior
-    snapshot_old = (
-        PriceDocSnapshot.objects
-        .filter(source=source)
-        .exclude(pk=snapshot_new.pk)
-        .order_by("-creado_en")
-        .first()
-    )
-
     # Actualizar metadata en la fuente
     source.last_modified_time = timezone.now()
     source.last_revision_id = revision
     source.save(update_fields=["last_modified_time", "last_revision_id"])
 
-    # Primera sincronización: no hay comparación todavía
+    # Contenido idéntico al último snapshot: no hay nada nuevo
+    if not snapshot_new:
+        return 0, None
+
+    # Match de cada fila contra los productos, guardado para el diagnóstico
+    catalogo = _productos_para_match()
+    materializar_matches(snapshot_new, catalogo)
+
+    # Primera sincronización: no hay contra qué comparar
     if not snapshot_old:
         return 0, snapshot_new
 
-    # 4) Armar diccionarios ART -> item
-    old_by_art = {}
-    for item in snapshot_old.items.all():
-        art = (item.art or "").strip()
-        if art:
-            old_by_art[art] = item
-
-    new_by_art = {}
-    for item in snapshot_new.items.all():
-        art = (item.art or "").strip()
-        if art:
-            new_by_art[art] = item
-
-    cambios = []
-
-    # Solo nos interesan ART que siguen existiendo y cambiaron compra
-    for art, new_item in new_by_art.items():
-        old_item = old_by_art.get(art)
-        if not old_item:
-            continue
+    # 4) ART que siguen existiendo y cambiaron compra (en SQL)
+    cambios = _cambios_entre_snapshots(snapshot_old, snapshot_new)
 
-        if new_item.compra == old_item.compra:
-            continue
+    # 5) Candidatos armados en memoria y guardados de una vez
+    candidatos = _armar_candidatos(source, cambios, catalogo)
+    _guardar_candidatos(candidatos)
+
+    return len(candidatos), snapshot_new
 
-        cambios.append((art, old_item, new_item))
 
-    # 5) Traer productos activos para match
-    skus_db = list(
+def _productos_para_match():
+    """
+    Productos activos para el match por SKU: lista (en el orden de la base)
+    y diccionario sku en minúsculas -> primer producto con ese SKU.
+    """
+    productos = list(
         ProductoPrecio.objects
         .filter(activo=True)
-        .values("id", "sku", "nombre_publico", "precio")
+        .exclude(sku="")
+        .only("id", "sku", "nombre_publico", "precio")
     )
+    por_sku = {}
+    for p in productos:
+        sku = (p.sku or "").strip()
+        if sku:
+            por_sku.setdefault(sku.lower(), p)
+    return productos, por_sku
 
-    from decimal import Decimal as _D
+
+def _firma_productos(catalogo) -> str:
+    """
+    sha1 de los (id, SKU) de los productos: cambia sólo si cambia algo
+    que afecte el match (alta / baja / SKU editado).
+    """
+    productos, _ = catalogo
+    h = hashlib.sha1()
+    for p in sorted(productos, key=lambda p: p.id):
+        h.update(f"{p.id}\x1f{(p.sku or '').strip().lower()}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _match_producto(art: str, catalogo):
+    """
+    (producto, sku_match, score, estado) para un ART: SKU exacto (sin
+    importar mayúsculas) o, si no hay, el SKU más parecido con score >= 90.
+    """
+    productos, por_sku = catalogo
+    art_norm = (art or "").strip()
+    if not art_norm:
+        return None, "", None, PriceDocMatch.Estado.SIN_MATCH
+
+    exacto = por_sku.get(art_norm.lower())
+    if exacto:
+        return exacto, exacto.sku.strip(), Decimal("100.0"), PriceDocMatch.Estado.EXACTO
+
+    # Mismo puntaje que pdf.utils.get_similarity, pero con el ART fijo y
+    # descartando antes por las cotas baratas de difflib los SKU que no
+    # pueden llegar a 90
+    matcher = difflib.SequenceMatcher(None, art_norm.lower())
+    best = None
+    best_score = 0
+    for p in productos:
+        sku = (p.sku or "").strip()
+        if not sku:
+            continue
+        matcher.set_seq2(sku.lower())
+        if matcher.real_quick_ratio() < 0.9 or matcher.quick_ratio() < 0.9:
+            continue
+        score = int(matcher.ratio() * 100)
+        if score > best_score:
+            best_score = score
+            best = p
+
+    if best and best_score >= 90:
+        return best, best.sku.strip(), Decimal(str(best_score)), PriceDocMatch.Estado.FUZZY
+    return None, "", None, PriceDocMatch.Estado.SIN_MATCH
+
+
+def calcular_matches(snapshot: PriceDocSnapshot, catalogo=None) -> list[PriceDocMatch]:
+    """
+    Match de cada fila del snapshot, en el orden del documento, como
+    PriceDocMatch sin guardar (con el producto ya cargado).
+    """
+    catalogo = catalogo or _productos_para_match()
+
+    matches = []
+    por_art = {}
+    for orden, item in enumerate(snapshot.filas()):
+        clave = (item.art or "").strip().lower()
+        if clave not in por_art:
+            por_art[clave] = _match_producto(item.art, catalogo)
+        producto, sku_match, score, estado = por_art[clave]
+        matches.append(PriceDocMatch(
+            snapshot=snapshot,
+            orden=orden,
+            art=item.art,
+            producto_doc=item.producto,
+            descripcion_doc=item.descripcion,
+            compra=item.compra,
+            producto=producto,
+            sku_match=sku_match,
+            match_score=score,
+            estado=estado,
+        ))
+    return matches
+
+
+def materializar_matches(snapshot: PriceDocSnapshot, catalogo=None) -> int:
+    """
+    Calcula el match de cada fila del snapshot y lo guarda en PriceDocMatch
+    (reemplaza los anteriores). Devuelve la cantidad de filas.
+    """
+    catalogo = catalogo or _productos_para_match()
+    matches = calcular_matches(snapshot, catalogo)
 
     with transaction.atomic():
-        count = 0
-
-        for art, old_item, new_item in cambios:
-            match_prod = None
-            match_sku = ""
-            match_score = None
-
-            art_norm = (art or "").strip()
-
-            # Match exacto por SKU
-            for p in skus_db:
-                sku = (p.get("sku") or "").strip()
-                if not sku:
-                    continue
-
-                if sku.lower() == art_norm.lower():
-                    match_prod = ProductoPrecio(id=p["id"])
-                    match_sku = sku
-                    match_score = _D("100.0")
-                    break
-
-            # Si no hubo match exacto, fuzzy >= 90
-            if not match_prod:
-                best = None
-                best_score = 0
-
-                for p in skus_db:
-                    sku = (p.get("sku") or "").strip()
-                    if not sku:
-                        continue
-
-                    score = get_similarity(art_norm, sku)
-                    if score > best_score:
-                        best_score = score
-                        best = p
-
-                if best and best_score >= 90:
-                    match_prod = ProductoPrecio(id=best["id"])
-                    match_sku = (best.get("sku") or "").strip()
-                    match_score = _D(str(best_score))
-
-            # Crear o actualizar candidato
-            cand, _ = PriceUpdateCandidate.objects.get_or_create(
-                source=source,
-                art=art,
-                old_compra=old_item.compra,
-                new_compra=new_item.compra,
-                defaults={
-                    "producto_doc": new_item.producto,
-                    "descripcion_doc": new_item.descripcion,
-                },
-            )
+        snapshot.matches.all().delete()
+        PriceDocMatch.objects.bulk_create(matches, batch_size=BULK_CHUNK)
+        snapshot.matches_firma = _firma_productos(catalogo)
+        snapshot.save(update_fields=["matches_firma"])
+    return len(matches)
+
 
-            # Siempre refrescamos datos del documento
-            cand.producto_doc = new_item.producto
-            cand.descripcion_doc = new_item.descripcion
+def refrescar_matches(snapshot: PriceDocSnapshot) -> bool:
+    """
+    Recalcula los matches guardados del snapshot sólo si cambiaron los
+    productos desde la última vez (o si nunca se calcularon).
+    Devuelve True si los recalculó.
 
-            if match_prod:
-                cand.producto = ProductoPrecio.objects.get(pk=match_prod.id)
-                cand.sku_match = match_sku
-                cand.match_score = match_score
-                cand.calcular_sugerencia()
-            else:
-                cand.producto = None
-                cand.sku_match = ""
-                cand.match_score = None
-                cand.venta_actual = None
-                cand.venta_sugerida = None
-                cand.pct_aumento_venta = None
+    Los snapshots compactados no guardan matches (ver calcular_matches).
+    """
+    if snapshot.compactado:
+        return False
+    catalogo = _productos_para_match()
+    if snapshot.matches_firma and snapshot.matches_firma == _firma_productos(catalogo):
+        return False
+    materializar_matches(snapshot, catalogo)
+    return True
 
-            cand.save()
-            count += 1
 
-    return count, snapshot_new
+def _armar_candidatos(source: PriceDocSource, cambios, catalogo) -> list[PriceUpdateCandidate]:
+    """
+    Un PriceUpdateCandidate (sin guardar) por cada ART que cambió de compra,
+    con el match y la venta sugerida ya calculados.
+    """
+    candidatos = []
+    for art, old_compra, new_item in cambios:
+        producto, sku_match, score, _ = _match_producto(art, catalogo)
+
+        cand = PriceUpdateCandidate(
+            source=source,
+            art=art,
+            old_compra=old_compra,
+            new_compra=new_item.compra,
+            producto_doc=new_item.producto,
+            descripcion_doc=new_item.descripcion,
+            producto=producto,
+            sku_match=sku_match,
+            match_score=score,
+        )
+        # Sin producto deja venta_actual / sugerida / % en None
+        cand.calcular_sugerencia()
+        candidatos.append(cand)
+    return candidatos
 
 
-def sync_all_price_sources(credentials, only_active=True):
+def _guardar_candidatos(candidatos: list[PriceUpdateCandidate]):
+    """
+    Inserta los candidatos o, si ya existe uno para el mismo cambio
+    (fuente, ART, compra vieja, compra nueva), refresca sus datos del
+    documento y el match. aprobado / aplicado no se tocan.
     """
-    Sincroniza todas las fuentes de precios.
+    PriceUpdateCandidate.objects.bulk_create(
+        candidatos,
+        batch_size=BULK_CHUNK,
+        update_conflicts=True,
+        unique_fields=["source", "art", "old_compra", "new_compra"],
+        update_fields=[
+            "producto_doc",
+            "descripcion_doc",
+            "producto",
+            "sku_match",
+            "match_score",
+            "venta_actual",
+            "venta_sugerida",
+            "pct_aumento_venta",
+        ],
+    )
+
+
+def aplicar_candidatos(source: PriceDocSource, ids) -> list[dict]:
+    """
+    Aplica la venta sugerida de los candidatos elegidos (pendientes y con
+    producto) y los marca aplicados. Precios, candidatos e historial se
+    guardan en bloques. Si dos candidatos apuntan al mismo producto, queda
+    el último.
+
+    Devuelve el detalle de cada precio cambiado (para la bitácora).
+    """
+    candidatos = list(
+        PriceUpdateCandidate.objects
+        .filter(
+            source=source,
+            pk__in=list(ids),
+            aplicado=False,
+            producto__isnull=False,
+            venta_sugerida__isnull=False,
+        )
+        .select_related("producto")
+        .order_by("id")
+    )
+
+    ahora = timezone.now()
+    por_producto = {}
+    for c in candidatos:
+        c.aprobado = True
+        c.aplicado = True
+        c.aplicado_en = ahora
+        por_producto[c.producto_id] = c
+
+    productos = []
+    historial = []
+    detalles = []
+    for c in por_producto.values():
+        prod = c.producto
+        precio_anterior = prod.precio or Decimal("0.00")
+        prod.precio = c.venta_sugerida.quantize(Q2)
+        productos.append(prod)
+        historial.append(
+            PrecioHistorial.nuevo(prod, precio_anterior, prod.precio, origen="doc_precios")
+        )
+        detalles.append({
+            "producto_id": prod.id,
+            "sku": prod.sku,
+            "nombre": prod.nombre_publico,
+            "precio_anterior": str(precio_anterior),
+            "precio_nuevo": str(prod.precio),
+            "old_compra": str(c.old_compra),
+            "new_compra": str(c.new_compra),
+        })
+
+    with transaction.atomic():
+        ProductoPrecio.objects.bulk_update(productos, ["precio"], batch_size=BULK_CHUNK)
+        PriceUpdateCandidate.objects.bulk_update(
+            candidatos, ["aprobado", "aplicado", "aplicado_en"], batch_size=BULK_CHUNK
+        )
+        PrecioHistorial.registrar_varios(historial)
+
+    return detalles
+
+
+def _sync_fuente_en_hilo(source_id: int, credentials, clientes):
+    """
+    Sincroniza una fuente dentro de un hilo del pool y devuelve su resultado.
+    Cada hilo usa su propio par de clientes (los de googleapiclient no son
+    thread-safe) y cierra la conexión a la base que abrió.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        "source_id": source_id,
+        "source_nombre": "",
+        "ok": False,
+        "cambios": 0,
+        "snapshot_id": None,
+        "error": None,
+        "en_curso": False,
+        "segundos": 0,
+    }
+    try:
+        source = PriceDocSource.objects.get(pk=source_id)
+        resultado["source_nombre"] = str(source)
+
+        drive, docs = clientes(credentials) if clientes else (None, None)
+        cambios, snapshot = sync_price_doc_and_build_candidates(
+            source=source,
+            credentials=credentials,
+            drive=drive,
+            docs=docs,
+        )
+        resultado.update(
+            ok=True,
+            cambios=cambios,
+            snapshot_id=snapshot.id if snapshot else None,
+        )
+    except SyncEnCurso as e:
+        resultado.update(error=str(e), en_curso=True)
+    except Exception as e:
+        resultado["error"] = str(e)
+    finally:
+        resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+        connection.close()
+    return resultado
+
+
+def sync_all_price_sources(credentials, only_active=True, clientes=None, max_workers=None):
+    """
+    Sincroniza todas las fuentes de precios en un pool de hilos acotado
+    (el trabajo es casi todo espera de red contra Drive).
+
+    - clientes: callable(credentials) -> (drive, docs) que se llama una vez
+      por fuente dentro del hilo; por defecto, los de clientes_google.
+    - max_workers: tamaño del pool (PRICE_DOC_SYNC_WORKERS).
 
     Devuelve:
     {
         "total_fuentes": int,
         "procesadas": int,
         "total_cambios": int,
+        "segundos": float,
         "resultados": [
             {
                 "source_id": ...,
@@ -293,6 +558,8 @@ def sync_all_price_sources(credentials, only_active=True):
                 "cambios": int,
                 "snapshot_id": int|None,
                 "error": str|None,
+                "en_curso": bool,   # otra sync de la misma fuente la tenía tomada
+                "segundos": float,
             }
         ]
     }
@@ -302,44 +569,27 @@ def sync_all_price_sources(credentials, only_active=True):
     if only_active and hasattr(PriceDocSource, "activo"):
         qs = qs.filter(activo=True)
 
-    resultados = []
-    total_cambios = 0
-    procesadas = 0
-
-    for source in qs:
-        try:
-            cambios, snapshot = sync_price_doc_and_build_candidates(
-                source=source,
-                credentials=credentials,
-            )
+    ids = list(qs.values_list("id", flat=True))
+    max_workers = max_workers or SYNC_MAX_WORKERS
+    inicio = time.perf_counter()
 
-            total_cambios += cambios
-            procesadas += 1
-
-            resultados.append({
-                "source_id": source.id,
-                "source_nombre": str(source),
-                "ok": True,
-                "cambios": cambios,
-                "snapshot_id": snapshot.id if snapshot else None,
-                "error": None,
-            })
-
-        except Exception as e:
-            procesadas += 1
-            resultados.append({
-                "source_id": source.id,
-                "source_nombre": str(source),
-                "ok": False,
-                "cambios": 0,
-                "snapshot_id": None,
-                "error": str(e),
-            })
+    resultados = []
+    if ids:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(ids)),
+            thread_name_prefix="sync-precios",
+        ) as pool:
+            # map respeta el orden de las fuentes
+            resultados = list(pool.map(
+                lambda source_id: _sync_fuente_en_hilo(source_id, credentials, clientes),
+                ids,
+            ))
 
     return {
-        "total_fuentes": qs.count(),
-        "procesadas": procesadas,
-        "total_cambios": total_cambios,
+        "total_fuentes": len(ids),
+        "procesadas": len(resultados),
+        "total_cambios": sum(r["cambios"] for r in resultados),
+        "segundos": round(time.perf_counter() - inicio, 3),
         "resultados": resultados,
     }
 
@@ -349,4 +599,113 @@ def sync_price_source_by_id(source_id: int, credentials):
     Helper para sincronizar una fuente puntual por ID.
     """
     source = PriceDocSource.objects.get(pk=source_id)
-    return sync_price_doc_and_build_candidates(source=source, credentials=credentials)
\ No newline at end of file
+    return sync_price_doc_and_build_candidates(source=source, credentials=credentials)
+
+
+# ============================================================
+# SYNC EN SEGUNDO PLANO
+# ============================================================
+
+def registrar_estado_sync(source: PriceDocSource, error: str = "", usuario=None):
+    """
+    Deja en la fuente el resultado de la última sincronización.
+    """
+    source.ultima_revision = timezone.now()
+    source.ultimo_estado = "error" if error else "ok"
+    source.ultimo_error = error
+    campos = ["ultima_revision", "ultimo_estado", "ultimo_error", "actualizado_en"]
+    if usuario is not None:
+        source.actualizado_por = usuario
+        campos.append("actualizado_por")
+    source.save(update_fields=campos)
+
+
+def _correr_sync_fuente(trabajo_id):
+    """
+    Cuerpo del hilo: sincroniza la fuente y deja el resultado en el trabajo y en la fuente.
+    """
+    trabajos = TrabajoSyncPrecios.objects.filter(pk=trabajo_id)
+    credentials = None
+    try:
+        trabajo = TrabajoSyncPrecios.objects.select_related("source", "usuario").get(pk=trabajo_id)
+        trabajos.update(estado=TrabajoSyncPrecios.Estado.PROCESANDO)
+        source = trabajo.source
+
+        try:
+            credentials = get_google_credentials()
+            cambios, snapshot = sync_price_doc_and_build_candidates(source, credentials)
+        except SyncEnCurso as e:
+            # Otra sync (p. ej. "sincronizar todas") la tiene: su resultado queda en la fuente
+            trabajos.update(
+                estado=TrabajoSyncPrecios.Estado.ERROR,
+                error=str(e),
+                terminado_en=timezone.now(),
+            )
+            return
+        except Exception as e:
+            sa_email = getattr(credentials, "service_account_email", "desconocido") if credentials else "desconocido"
+            error = f"{e} (service account: {sa_email})"
+            registrar_estado_sync(source, error=str(e), usuario=trabajo.usuario)
+            trabajos.update(
+                estado=TrabajoSyncPrecios.Estado.ERROR,
+                error=error[:2000],
+                terminado_en=timezone.now(),
+            )
+            return
+
+        registrar_estado_sync(source, usuario=trabajo.usuario)
+        trabajos.update(
+            estado=TrabajoSyncPrecios.Estado.LISTO,
+            cambios=cambios,
+            snapshot=snapshot,
+            terminado_en=timezone.now(),
+        )
+    except Exception as e:
+        trabajos.update(
+            estado=TrabajoSyncPrecios.Estado.ERROR,
+            error=str(e)[:2000],
+            terminado_en=timezone.now(),
+        )
+    finally:
+        # El hilo abrió su propia conexión: cerrarla
+        connection.close()
+
+
+def trabajo_sync_en_curso(source: PriceDocSource):
+    """
+    El trabajo pendiente / procesando de la fuente, si hay uno vigente.
+    """
+    return (
+        TrabajoSyncPrecios.objects
+        .filter(
+            source=source,
+            estado__in=[TrabajoSyncPrecios.Estado.PENDIENTE, TrabajoSyncPrecios.Estado.PROCESANDO],
+            creado_en__gte=timezone.now() - SYNC_TRABAJO_VENCE,
+        )
+        .order_by("-creado_en")
+        .first()
+    )
+
+
+def iniciar_sync_fuente(source: PriceDocSource, usuario=None):
+    """
+    Devuelve el TrabajoSyncPrecios de la fuente y, si hace falta, lo lanza en un hilo.
+    Si ya hay uno corriendo para esa fuente, se devuelve ese (no se apilan syncs).
+    """
+    en_curso = trabajo_sync_en_curso(source)
+    if en_curso:
+        return en_curso
+
+    trabajo = TrabajoSyncPrecios.objects.create(
+        source=source,
+        usuario=usuario if getattr(usuario, "is_authenticated", False) else None,
+    )
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_correr_sync_fuente,
+            args=(trabajo.pk,),
+            name=f"sync-precios-{source.pk}",
+            daemon=True,
+        ).start()
+    )
+    return trabajo
@@ -44,12 +44,30 @@ urlpatterns = [
         name="price_source_sync",
     ),
 
+    path(
+        "integraciones/listas-precios/<int:pk>/sincronizar-en-segundo-plano/",
+        views.price_source_sync_iniciar,
+        name="price_source_sync_iniciar",
+    ),
+
+    path(
+        "integraciones/listas-precios/<int:pk>/sincronizar/estado/",
+        views.price_source_sync_estado,
+        name="price_source_sync_estado",
+    ),
+
     path(
         "integraciones/listas-precios/sincronizar-todas/",
         views.price_sources_sync_all,
         name="price_sources_sync_all",
     ),
 
+    path(
+        "integraciones/listas-precios/notificaciones-drive/",
+        views.price_sources_notificacion_drive,
+        name="price_sources_notificacion_drive",
+    ),
+
     # -------------------------------
     # GESTIÓN DE CAMBIOS DE PRECIOS
     # -------------------------------
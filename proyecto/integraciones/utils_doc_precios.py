@@ -1,4 +1,5 @@
 # integraciones/utils_doc_precios.py
+import hashlib
 import re
 from decimal import Decimal
 from typing import Iterator
@@ -6,10 +7,7 @@ from io import BytesIO
 
 from docx import Document  # python-docx
 
-try:
-    from pypdf import PdfReader
-except Exception:  # pragma: no cover
-    PdfReader = None
+from pdf.utils_texto_pdf import extraer_lineas
 
 from .models import PriceDocSnapshot, PriceDocItem, PriceDocSource, Q2
 
@@ -18,6 +16,9 @@ from .models import PriceDocSnapshot, PriceDocItem, PriceDocSource, Q2
 # Utilidades base
 # =========================
 
+# Ítems guardados por cada bulk_create
+ITEMS_POR_LOTE = 1000
+
 PRICE_RE = re.compile(r"\$\s*([0-9][0-9\.\s]*)(?:,([0-9]{1,2}))?")
 SPLIT_COLS_RE = re.compile(r"\s{2,}|\t+")
 
@@ -91,6 +92,76 @@ def _build_item_from_texts(textos: list[str]) -> dict | None:
     }
 
 
+# =========================
+# Guardado de snapshots
+# =========================
+
+def hash_fila(art: str, producto: str, descripcion: str, compra) -> str:
+    """
+    Hash de una fila de la lista. Si no cambia, la fila es la misma.
+    """
+    compra = Decimal(compra).quantize(Q2)
+    texto = "\x1f".join([art or "", producto or "", descripcion or "", str(compra)])
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def hash_contenido(row_hashes) -> str:
+    """
+    Hash de la tabla entera: independiente del orden de las filas
+    (reordenar la lista no cambia ningún precio).
+    """
+    return hashlib.sha256("\n".join(sorted(row_hashes)).encode("ascii")).hexdigest()
+
+
+def _guardar_snapshot(source: PriceDocSource, items_data: list[dict]) -> PriceDocSnapshot | None:
+    """
+    Guarda el snapshot con sus ítems y hashes.
+    Si la tabla es idéntica a la del último snapshot de la fuente (p. ej. una
+    edición de formato que cambió la revisión), no guarda nada y devuelve None.
+    """
+    filas = []
+    for parsed in items_data:
+        art = (parsed["art"] or "").strip()
+        filas.append((
+            art,
+            parsed["producto"],
+            parsed["descripcion"],
+            parsed["compra"],
+            hash_fila(art, parsed["producto"], parsed["descripcion"], parsed["compra"]),
+        ))
+
+    contenido = hash_contenido(f[4] for f in filas)
+    ultimo_hash = (
+        PriceDocSnapshot.objects
+        .filter(source=source)
+        .order_by("-creado_en", "-id")
+        .values_list("contenido_hash", flat=True)
+        .first()
+    )
+    if ultimo_hash == contenido:
+        return None
+
+    snapshot = PriceDocSnapshot.objects.create(
+        source=source,
+        contenido_hash=contenido,
+        cantidad_items=len(filas),
+    )
+    # De a ITEMS_POR_LOTE: no se arman todos los PriceDocItem a la vez
+    for desde in range(0, len(filas), ITEMS_POR_LOTE):
+        PriceDocItem.objects.bulk_create([
+            PriceDocItem(
+                snapshot=snapshot,
+                art=art,
+                producto=producto,
+                descripcion=descripcion,
+                compra=compra,
+                row_hash=row_hash,
+            )
+            for art, producto, descripcion, compra, row_hash in filas[desde:desde + ITEMS_POR_LOTE]
+        ])
+    return snapshot
+
+
 # =========================
 # Google Docs JSON
 # =========================
@@ -134,89 +205,61 @@ def parse_row_to_item(row: dict) -> dict | None:
     return _build_item_from_texts(textos)
 
 
-def crear_snapshot_desde_doc_json(source: PriceDocSource, doc_json: dict) -> PriceDocSnapshot:
+def crear_snapshot_desde_doc_json(source: PriceDocSource, doc_json: dict) -> PriceDocSnapshot | None:
     """
     Crea un snapshot completo de la lista desde el JSON del Google Doc.
+    None si la tabla es igual a la del último snapshot.
     """
-    snapshot = PriceDocSnapshot.objects.create(source=source)
-
-    items = []
+    items_data = []
     for row in _iter_table_rows(doc_json):
         parsed = parse_row_to_item(row)
-        if not parsed:
-            continue
+        if parsed:
+            items_data.append(parsed)
 
-        items.append(PriceDocItem(
-            snapshot=snapshot,
-            art=parsed["art"],
-            producto=parsed["producto"],
-            descripcion=parsed["descripcion"],
-            compra=parsed["compra"],
-        ))
-
-    PriceDocItem.objects.bulk_create(items)
-    return snapshot
+    return _guardar_snapshot(source, items_data)
 
 
 # =========================
 # DOCX (Word) con python-docx
 # =========================
 
-def crear_snapshot_desde_docx_bytes(source: PriceDocSource, file_bytes: bytes) -> PriceDocSnapshot:
+def _como_archivo(archivo):
+    # Bytes sueltos -> BytesIO; un archivo abierto se usa tal cual
+    if isinstance(archivo, (bytes, bytearray)):
+        return BytesIO(archivo)
+    return archivo
+
+
+def crear_snapshot_desde_docx(source: PriceDocSource, archivo) -> PriceDocSnapshot | None:
     """
     Crea un snapshot leyendo tablas desde un .docx (Office) usando python-docx.
+    `archivo`: archivo binario abierto (p. ej. el temporal de la descarga) o bytes.
+    None si la tabla es igual a la del último snapshot.
     """
-    snapshot = PriceDocSnapshot.objects.create(source=source)
-
-    doc = Document(BytesIO(file_bytes))
-    items = []
+    doc = Document(_como_archivo(archivo))
+    items_data = []
 
     for table in doc.tables:
         for row in table.rows:
             textos = [_normalize_ws(cell.text) for cell in row.cells]
             parsed = _build_item_from_texts(textos)
-            if not parsed:
-                continue
+            if parsed:
+                items_data.append(parsed)
 
-            items.append(PriceDocItem(
-                snapshot=snapshot,
-                art=parsed["art"],
-                producto=parsed["producto"],
-                descripcion=parsed["descripcion"],
-                compra=parsed["compra"],
-            ))
-
-    PriceDocItem.objects.bulk_create(items)
-    return snapshot
+    return _guardar_snapshot(source, items_data)
 
 
 # =========================
 # PDF
 # =========================
 
-def _pdf_extract_lines(file_bytes: bytes) -> list[str]:
+def _pdf_extract_lines(archivo) -> list[str]:
     """
-    Extrae líneas de texto desde un PDF.
+    Extrae líneas de texto desde un PDF (archivo abierto o bytes).
+    Con pypdf: el parser de abajo está armado sobre su orden de líneas.
+    pypdf lee del archivo a medida que recorre las páginas.
     """
-    if PdfReader is None:
-        raise RuntimeError(
-            "No está disponible pypdf. Instalalo con: pip install pypdf"
-        )
-
-    reader = PdfReader(BytesIO(file_bytes))
-    lines: list[str] = []
-
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        if not text:
-            continue
-
-        for raw_line in text.splitlines():
-            line = _normalize_ws(raw_line)
-            if line:
-                lines.append(line)
-
-    return lines
+    return extraer_lineas(archivo, "pypdf")
 
 
 def _parse_pdf_line_direct(line: str) -> dict | None:
@@ -332,17 +375,17 @@ def _parse_pdf_lines_with_context(lines: list[str]) -> list[dict]:
     return items
 
 
-def crear_snapshot_desde_pdf_bytes(source: PriceDocSource, file_bytes: bytes) -> PriceDocSnapshot:
+def crear_snapshot_desde_pdf(source: PriceDocSource, archivo) -> PriceDocSnapshot | None:
     """
     Crea un snapshot leyendo texto desde un PDF.
+    `archivo`: archivo binario abierto (p. ej. el temporal de la descarga) o bytes.
+    None si la tabla es igual a la del último snapshot.
 
     Estrategia:
     1) intenta parsear líneas directas que ya contienen la fila completa
     2) si no encuentra items suficientes, usa un fallback por contexto
     """
-    snapshot = PriceDocSnapshot.objects.create(source=source)
-
-    lines = _pdf_extract_lines(file_bytes)
+    lines = _pdf_extract_lines(archivo)
     items_data: list[dict] = []
 
     # Primer intento: línea completa
@@ -357,21 +400,13 @@ def crear_snapshot_desde_pdf_bytes(source: PriceDocSource, file_bytes: bytes) ->
 
     # Deduplicar por (art, compra) para evitar repetidos por extracción rara del PDF
     seen = set()
-    items = []
+    unicos = []
 
     for parsed in items_data:
         key = (parsed["art"], parsed["compra"])
         if key in seen:
             continue
         seen.add(key)
+        unicos.append(parsed)
 
-        items.append(PriceDocItem(
-            snapshot=snapshot,
-            art=parsed["art"],
-            producto=parsed["producto"],
-            descripcion=parsed["descripcion"],
-            compra=parsed["compra"],
-        ))
-
-    PriceDocItem.objects.bulk_create(items)
-    return snapshot
\ No newline at end of file
+    return _guardar_snapshot(source, unicos)
\ No newline at end of file
@@ -1,56 +1,43 @@
 # integraciones/views.py
-from decimal import Decimal
 import logging
-import os
-import requests
 
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
-from django.db import transaction
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from google.oauth2 import service_account
-
 from owner.models import BitacoraEvento
-from pdf.models import ProductoPrecio
-from pdf.utils import get_similarity
 
+from .clientes_google import get_google_credentials
 from .forms import PriceDocSourceForm
-from .models import PriceDocSource, PriceDocSnapshot, PriceUpdateCandidate, Q2
+from .models import (
+    PriceDocMatch,
+    PriceDocSource,
+    PriceDocSnapshot,
+    PriceUpdateCandidate,
+    SyncEnCurso,
+    TrabajoSyncPrecios,
+)
+from .programador_precios import push_configurado, recibir_notificacion
 from .services_price_doc import (
+    aplicar_candidatos,
+    iniciar_sync_fuente,
+    calcular_matches,
+    refrescar_matches,
     sync_all_price_sources,
-    sync_price_doc_and_build_candidates,
     sync_price_source_by_id,
+    trabajo_sync_en_curso,
 )
 
 logger = logging.getLogger(__name__)
-INSTAGRAM_CACHE_KEY = "instagram_media_cache"
-
-
-def _get_google_credentials():
-    """
-    Carga las credenciales del service account
-    y loguea/imprime el email que se está usando.
-    """
-    key_path = os.path.join(settings.BASE_DIR, "credenciales", "service_account.json")
-    scopes = [
-        "https://www.googleapis.com/auth/drive.readonly",
-        "https://www.googleapis.com/auth/documents.readonly",
-    ]
-    credentials = service_account.Credentials.from_service_account_file(
-        key_path,
-        scopes=scopes,
-    )
-
-    sa_email = getattr(credentials, "service_account_email", "desconocido")
-    logger.info("SERVICE ACCOUNT EMAIL: %s", sa_email)
-    print("SERVICE ACCOUNT EMAIL:", sa_email)
-
-    return credentials
+# Filas por página en el diagnóstico de matching
+MATCHES_POR_PAGINA = 100
 
 
 def _build_drive_url_from_doc_id(doc_id: str, tipo: str) -> str:
@@ -92,61 +79,6 @@ def _get_selected_source_or_default(source_id=None):
     )
 
 
-def _build_match_result_for_art(art: str, skus_db: list[dict]):
-    """
-    Devuelve el resultado del match para un ART de la lista contra ProductoPrecio.
-    """
-    art_norm = (art or "").strip()
-    if not art_norm:
-        return {
-            "producto": None,
-            "sku_match": "",
-            "match_score": None,
-            "estado_match": "sin_match",
-        }
-
-    # Match exacto
-    for p in skus_db:
-        sku = (p.get("sku") or "").strip()
-        if not sku:
-            continue
-        if sku.lower() == art_norm.lower():
-            return {
-                "producto": p,
-                "sku_match": sku,
-                "match_score": Decimal("100.00"),
-                "estado_match": "exacto",
-            }
-
-    # Fuzzy
-    best = None
-    best_score = 0
-    for p in skus_db:
-        sku = (p.get("sku") or "").strip()
-        if not sku:
-            continue
-
-        score = get_similarity(art_norm, sku)
-        if score > best_score:
-            best_score = score
-            best = p
-
-    if best and best_score >= 90:
-        return {
-            "producto": best,
-            "sku_match": (best.get("sku") or "").strip(),
-            "match_score": Decimal(str(best_score)).quantize(Q2),
-            "estado_match": "fuzzy",
-        }
-
-    return {
-        "producto": None,
-        "sku_match": "",
-        "match_score": None,
-        "estado_match": "sin_match",
-    }
-
-
 @login_required
 def price_sources_list(request):
     """
@@ -275,7 +207,7 @@ def price_source_sync(request, pk):
 
     try:
         _ensure_source_url(source)
-        credentials = _get_google_credentials()
+        credentials = get_google_credentials()
         cambios, snapshot = sync_price_source_by_id(source.id, credentials)
 
         source.ultima_revision = timezone.now()
@@ -304,6 +236,9 @@ def price_source_sync(request, pk):
                     "Los cambios se detectarán desde la próxima modificación."
                 )
 
+    except SyncEnCurso as e:
+        messages.warning(request, str(e))
+
     except Exception as e:
         sa_email = getattr(credentials, "service_account_email", "desconocido") if credentials else "desconocido"
 
@@ -332,7 +267,7 @@ def price_sources_sync_all(request):
     credentials = None
 
     try:
-        credentials = _get_google_credentials()
+        credentials = get_google_credentials()
         resultado = sync_all_price_sources(credentials, only_active=True)
 
         sources_map = {
@@ -345,7 +280,8 @@ def price_sources_sync_all(request):
 
         for item in resultado["resultados"]:
             source = sources_map.get(item["source_id"])
-            if not source:
+            if not source or item["en_curso"]:
+                # La sync que la tenía tomada deja su propio estado
                 continue
 
             source.ultima_revision = ahora
@@ -363,9 +299,15 @@ def price_sources_sync_all(request):
 
         messages.success(
             request,
-            f"Se procesaron {resultado['procesadas']} fuentes. "
+            f"Se procesaron {resultado['procesadas']} fuentes en {resultado['segundos']:.1f} s. "
             f"Cambios detectados: {resultado['total_cambios']}."
         )
+        en_curso = [r["source_nombre"] for r in resultado["resultados"] if r["en_curso"]]
+        if en_curso:
+            messages.warning(
+                request,
+                "Ya se estaban sincronizando: " + ", ".join(en_curso) + "."
+            )
 
     except Exception as e:
         sa_email = getattr(credentials, "service_account_email", "desconocido") if credentials else "desconocido"
@@ -378,6 +320,21 @@ def price_sources_sync_all(request):
     return redirect("price_sources_list")
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def price_sources_notificacion_drive(request):
+    """
+    Callback de las notificaciones push de Drive (ver programador_precios).
+    Drive no manda cuerpo: todo viene en los headers X-Goog-*.
+    """
+    if not push_configurado():
+        return HttpResponse(status=404)
+
+    if not recibir_notificacion(request.headers):
+        return HttpResponse(status=404)
+    return HttpResponse(status=200)
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def gestionar_cambios_doc_precios(request, source_id=None):
@@ -385,6 +342,7 @@ def gestionar_cambios_doc_precios(request, source_id=None):
     Vista principal para revisar y aplicar cambios detectados.
     Si viene source_id, muestra esa fuente.
     Si no viene, usa la principal o la primera activa.
+    No consulta Google: muestra los candidatos ya guardados y el estado del último sync.
     """
     source = _get_selected_source_or_default(source_id=source_id)
 
@@ -402,41 +360,8 @@ def gestionar_cambios_doc_precios(request, source_id=None):
             int(x) for x in request.POST.getlist("candidato_id") if x.isdigit()
         ]
 
-        candidatos = PriceUpdateCandidate.objects.filter(
-            source=source,
-            pk__in=ids_aplicar,
-            aplicado=False,
-            producto__isnull=False,
-        )
-
-        aplicados = 0
-        detalles_evento = []
-
-        with transaction.atomic():
-            for c in candidatos.select_related("producto"):
-                prod = c.producto
-                if not prod or c.venta_sugerida is None:
-                    continue
-
-                precio_anterior = prod.precio or Decimal("0.00")
-                prod.precio = c.venta_sugerida.quantize(Q2)
-                prod.save(update_fields=["precio"])
-
-                c.aprobado = True
-                c.aplicado = True
-                c.aplicado_en = timezone.now()
-                c.save(update_fields=["aprobado", "aplicado", "aplicado_en"])
-
-                aplicados += 1
-                detalles_evento.append({
-                    "producto_id": prod.id,
-                    "sku": prod.sku,
-                    "nombre": prod.nombre_publico,
-                    "precio_anterior": str(precio_anterior),
-                    "precio_nuevo": str(prod.precio),
-                    "old_compra": str(c.old_compra),
-                    "new_compra": str(c.new_compra),
-                })
+        detalles_evento = aplicar_candidatos(source, ids_aplicar)
+        aplicados = len(detalles_evento)
 
         if aplicados > 0:
             BitacoraEvento.objects.create(
@@ -452,51 +377,8 @@ def gestionar_cambios_doc_precios(request, source_id=None):
         messages.success(request, f"Se aplicaron {aplicados} cambios de precio.")
         return redirect("gestionar_cambios_doc_precios_source", source_id=source.pk)
 
-    credentials = None
-    try:
-        credentials = _get_google_credentials()
-        n_cambios, snapshot = sync_price_doc_and_build_candidates(source, credentials)
-
-        source.ultima_revision = timezone.now()
-        source.ultimo_estado = "ok"
-        source.ultimo_error = ""
-        if request.user.is_authenticated:
-            source.actualizado_por = request.user
-        source.save(update_fields=["ultima_revision", "ultimo_estado", "ultimo_error", "actualizado_por", "actualizado_en"])
-
-        if n_cambios > 0:
-            messages.info(request, f"Detectados {n_cambios} cambios nuevos en '{source.nombre}'.")
-        else:
-            hay_snapshots = PriceDocSnapshot.objects.filter(source=source).exists()
-            if hay_snapshots:
-                messages.info(
-                    request,
-                    f"Sincronización OK para '{source.nombre}'. "
-                    "No se detectaron cambios de precios."
-                )
-            else:
-                messages.info(
-                    request,
-                    f"Se creó el snapshot inicial de '{source.nombre}'. "
-                    "Los cambios se van a detectar desde la próxima modificación."
-                )
-
-    except Exception as e:
-        sa_email = getattr(credentials, "service_account_email", "desconocido") if credentials else "desconocido"
-
-        source.ultima_revision = timezone.now()
-        source.ultimo_estado = "error"
-        source.ultimo_error = str(e)
-        if request.user.is_authenticated:
-            source.actualizado_por = request.user
-        source.save(update_fields=["ultima_revision", "ultimo_estado", "ultimo_error", "actualizado_por", "actualizado_en"])
-
-        messages.error(
-            request,
-            f"No se pudo sincronizar '{source.nombre}' "
-            f"(service account: {sa_email}): {e}"
-        )
-
+    # El GET sólo lee lo guardado: la sincronización corre aparte
+    # (ver price_source_sync_iniciar / price_source_sync_estado)
     candidatos = (
         PriceUpdateCandidate.objects
         .filter(source=source, aplicado=False)
@@ -513,10 +395,61 @@ def gestionar_cambios_doc_precios(request, source_id=None):
             "source": source,
             "sources": sources,
             "candidatos": candidatos,
+            "trabajo_sync": trabajo_sync_en_curso(source),
+            "ultimo_sync": (
+                TrabajoSyncPrecios.objects
+                .filter(source=source, terminado_en__isnull=False)
+                .order_by("-terminado_en")
+                .first()
+            ),
         },
     )
 
 
+@login_required
+@require_http_methods(["POST"])
+def price_source_sync_iniciar(request, pk):
+    """
+    Lanza la sincronización de una fuente en segundo plano y vuelve a la
+    pantalla de cambios, que consulta el estado por polling.
+    """
+    source = get_object_or_404(PriceDocSource, pk=pk)
+    _ensure_source_url(source)
+    trabajo = iniciar_sync_fuente(source, usuario=request.user)
+
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        return JsonResponse({
+            "trabajo": trabajo.pk,
+            "estado": trabajo.estado,
+            "url": reverse("price_source_sync_estado", args=[source.pk]),
+        })
+
+    messages.info(request, f"Sincronizando '{source.nombre}' en segundo plano…")
+    return redirect("gestionar_cambios_doc_precios_source", source_id=source.pk)
+
+
+@login_required
+def price_source_sync_estado(request, pk):
+    """
+    Polling del estado del último sync de una fuente.
+    """
+    source = get_object_or_404(PriceDocSource, pk=pk)
+    trabajo = TrabajoSyncPrecios.objects.filter(source=source).order_by("-creado_en", "-id").first()
+    if not trabajo:
+        return JsonResponse({"error": "not_found"}, status=404)
+
+    en_curso = trabajo_sync_en_curso(source)
+    return JsonResponse({
+        "trabajo": trabajo.pk,
+        "estado": trabajo.estado,
+        # Uno que quedó colgado (vencido) también cuenta como terminado
+        "terminado": trabajo.terminado or en_curso is None,
+        "cambios": trabajo.cambios,
+        "error": trabajo.error,
+        "pendientes": PriceUpdateCandidate.objects.filter(source=source, aplicado=False).count(),
+    })
+
+
 @login_required
 def diagnostico_match_lista(request, source_id=None):
     """
@@ -534,147 +467,100 @@ def diagnostico_match_lista(request, source_id=None):
 
     _ensure_source_url(source)
 
-    snapshot = (
-        PriceDocSnapshot.objects
-        .filter(source=source)
-        .prefetch_related("items")
-        .order_by("-creado_en")
-        .first()
-    )
+    # Por defecto el último; ?snapshot=<id> permite ver uno anterior (aunque esté compactado)
+    snapshots = PriceDocSnapshot.objects.filter(source=source).order_by("-creado_en", "-id")
+    snapshot_id = request.GET.get("snapshot") or ""
+    if snapshot_id.isdigit():
+        snapshot = snapshots.filter(pk=int(snapshot_id)).first()
+    else:
+        snapshot = snapshots.first()
+
+    historial_snapshots = snapshots.only("id", "creado_en", "compactado", "cantidad_items")[:50]
 
     sources = PriceDocSource.objects.all().order_by("orden", "nombre")
 
+    estado = request.GET.get("estado") or ""
+    if estado not in PriceDocMatch.Estado.values:
+        estado = ""
+    q = (request.GET.get("q") or "").strip()
+
+    contexto = {
+        "source": source,
+        "sources": sources,
+        "snapshot": snapshot,
+        "historial_snapshots": historial_snapshots,
+        "estado_actual": estado,
+        "q": q,
+        "page_obj": None,
+        "resumen": {
+            "total_items": 0,
+            "exactos": 0,
+            "fuzzy": 0,
+            "sin_match": 0,
+        },
+    }
+
     if not snapshot:
         messages.info(
             request,
             f"La fuente '{source.nombre}' todavía no tiene snapshots. Sincronizala primero."
         )
-        return render(
-            request,
-            "integraciones/price_source_match_diagnostico.html",
-            {
-                "source": source,
-                "sources": sources,
-                "snapshot": None,
-                "rows": [],
-                "resumen": {
-                    "total_items": 0,
-                    "exactos": 0,
-                    "fuzzy": 0,
-                    "sin_match": 0,
-                },
-            },
-        )
-
-    skus_db = list(
-        ProductoPrecio.objects
-        .filter(activo=True)
-        .values("id", "sku", "nombre_publico", "precio")
-    )
-
-    rows = []
-    exactos = 0
-    fuzzy = 0
-    sin_match = 0
+        return render(request, "integraciones/price_source_match_diagnostico.html", contexto)
 
-    for item in snapshot.items.all():
-        match = _build_match_result_for_art(item.art, skus_db)
+    if snapshot.compactado:
+        # Snapshot viejo: los matches se calculan para esta vista y no se
+        # guardan, así la retención no tiene que volver a limpiarlos
+        matches = _filtrar_matches(calcular_matches(snapshot), contexto, estado, q)
+    else:
+        # Los matches se calculan al crear el snapshot; acá sólo se rehacen si
+        # cambiaron los productos (o si el snapshot es anterior)
+        refrescar_matches(snapshot)
+
+        matches = snapshot.matches.all()
+        contexto["resumen"] = matches.aggregate(
+            total_items=Count("id"),
+            exactos=Count("id", filter=Q(estado=PriceDocMatch.Estado.EXACTO)),
+            fuzzy=Count("id", filter=Q(estado=PriceDocMatch.Estado.FUZZY)),
+            sin_match=Count("id", filter=Q(estado=PriceDocMatch.Estado.SIN_MATCH)),
+        )
 
-        if match["estado_match"] == "exacto":
-            exactos += 1
-        elif match["estado_match"] == "fuzzy":
-            fuzzy += 1
-        else:
-            sin_match += 1
-
-        rows.append({
-            "item": item,
-            "producto_db": match["producto"],
-            "sku_match": match["sku_match"],
-            "match_score": match["match_score"],
-            "estado_match": match["estado_match"],
-        })
+        if estado:
+            matches = matches.filter(estado=estado)
+        if q:
+            matches = matches.filter(
+                Q(art__icontains=q)
+                | Q(producto_doc__icontains=q)
+                | Q(sku_match__icontains=q)
+                | Q(producto__nombre_publico__icontains=q)
+            )
+        matches = matches.select_related("producto").order_by("orden")
 
-    resumen = {
-        "total_items": len(rows),
-        "exactos": exactos,
-        "fuzzy": fuzzy,
-        "sin_match": sin_match,
-    }
+    contexto["page_obj"] = Paginator(matches, MATCHES_POR_PAGINA).get_page(request.GET.get("page"))
 
-    return render(
-        request,
-        "integraciones/price_source_match_diagnostico.html",
-        {
-            "source": source,
-            "sources": sources,
-            "snapshot": snapshot,
-            "rows": rows,
-            "resumen": resumen,
-        },
-    )
+    return render(request, "integraciones/price_source_match_diagnostico.html", contexto)
 
 
-def fetch_instagram_media():
+def _filtrar_matches(matches, contexto, estado, q):
     """
-    Devuelve una lista de posts recientes de Instagram listos para usar en templates.
-    Usa la Instagram Basic Display API con un access token definido en settings.
-
-    Cada ítem de la lista tiene:
-    - id
-    - image_url
-    - permalink
-    - caption
-    - timestamp
+    Resumen y filtros del diagnóstico sobre matches en memoria
+    (los mismos que se hacen en la base para los guardados).
     """
-    media = cache.get(INSTAGRAM_CACHE_KEY)
-    if media is not None:
-        return media
-
-    access_token = getattr(settings, "INSTAGRAM_ACCESS_TOKEN", "")
-    limit = getattr(settings, "INSTAGRAM_MEDIA_LIMIT", 8)
-
-    if not access_token:
-        logger.warning("INSTAGRAM_ACCESS_TOKEN no configurado")
-        return []
-
-    url = "https://graph.instagram.com/me/media"
-    params = {
-        "fields": "id,caption,media_type,media_url,permalink,thumbnail_url,timestamp",
-        "access_token": access_token,
-        "limit": limit,
+    contexto["resumen"] = {
+        "total_items": len(matches),
+        "exactos": sum(1 for m in matches if m.estado == PriceDocMatch.Estado.EXACTO),
+        "fuzzy": sum(1 for m in matches if m.estado == PriceDocMatch.Estado.FUZZY),
+        "sin_match": sum(1 for m in matches if m.estado == PriceDocMatch.Estado.SIN_MATCH),
     }
 
-    try:
-        resp = requests.get(url, params=params, timeout=5)
-        resp.raise_for_status()
-        data = resp.json().get("data", [])
-    except Exception as e:
-        logger.error("Error al consultar Instagram: %s", e, exc_info=True)
-        return []
-
-    media = []
-    for item in data:
-        media_type = item.get("media_type")
-        if media_type == "VIDEO":
-            image_url = item.get("thumbnail_url") or item.get("media_url")
-        else:
-            image_url = item.get("media_url")
-
-        if not image_url:
-            continue
-
-        media.append(
-            {
-                "id": item.get("id"),
-                "image_url": image_url,
-                "permalink": item.get("permalink"),
-                "caption": item.get("caption", ""),
-                "timestamp": item.get("timestamp", ""),
-            }
-        )
-
-    cache_timeout = getattr(settings, "INSTAGRAM_CACHE_SECONDS", 1800)
-    cache.set(INSTAGRAM_CACHE_KEY, media, cache_timeout)
-
-    return media
+    if estado:
+        matches = [m for m in matches if m.estado == estado]
+    if q:
+        q = q.lower()
+        matches = [
+            m for m in matches
+            if q in (m.art or "").lower()
+            or q in (m.producto_doc or "").lower()
+            or q in (m.sku_match or "").lower()
+            or (m.producto is not None and q in (m.producto.nombre_publico or "").lower())
+        ]
+    return matches
@@ -228,4 +228,12 @@ USE_X_FORWARDED_HOST = True
 INSTAGRAM_ACCESS_TOKEN = os.environ.get("INSTAGRAM_ACCESS_TOKEN", "")
 INSTAGRAM_MEDIA_LIMIT = int(os.environ.get("INSTAGRAM_MEDIA_LIMIT", 8))
 INSTAGRAM_CACHE_SECONDS = int(os.environ.get("INSTAGRAM_CACHE_SECONDS", 1800))  # 30 min
+INSTAGRAM_ERROR_SECONDS = int(os.environ.get("INSTAGRAM_ERROR_SECONDS", 300))  # reintento tras un error
+
+# ==============================
+# LISTAS DE PRECIOS (DRIVE)
+# ==============================
+# URL https pública de integraciones/listas-precios/notificaciones-drive/ para
+# que Drive avise los cambios (files.watch). Vacía = sólo revisión periódica.
+PRICE_DOC_PUSH_URL = os.environ.get("PRICE_DOC_PUSH_URL", "")
 
@@ -169,6 +169,7 @@ class BitacoraEvento(models.Model):
         ("factura_proveedor_confirmada", "Factura de proveedor confirmada"),
 
         ("factura_pdf_generada", "Factura PDF generada"),
+        ("facturas_pdf_lote", "Facturas PDF generadas en lote"),
         ("lista_precios_pdf_generada", "Lista de precios PDF generada"),
 
         # =====================================================
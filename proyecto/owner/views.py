@@ -23,10 +23,13 @@ from django.views.generic import TemplateView
 from pdf.models import (
     ItemFactura,
     ListaPrecioPDF,
+    PrecioHistorial,
     ProductoPrecio,
     FacturaProveedor,
     ProductoVariante,
     Rubro,
+    StockInsuficiente,
+    StockMovimiento,
     SubRubro,
 )
 
@@ -304,6 +307,32 @@ def _parse_precio_desde_pdf(raw: str | None) -> Decimal:
         return Decimal("0")
 
 
+def _stock_base(valor, defecto):
+    """Stock con el que se mostró el formulario (campo oculto stock_original)."""
+    valor = (valor or "").strip()
+    return int(valor) if valor.lstrip("-").isdigit() else defecto
+
+
+def _aplicar_stock_editado(producto, stock_base, stock_nuevo, usuario):
+    """
+    Stock propio cargado a mano en un formulario. Se aplica lo que cambió el
+    usuario (stock_nuevo - stock_base) sobre el stock actual, con la fila
+    bloqueada y a través de StockMovimiento.mover(): una venta registrada
+    mientras el formulario estaba abierto no se pisa. Nunca baja de 0.
+    Tiene que correr dentro de transaction.atomic(); deja producto.stock al día.
+    """
+    actual = (
+        ProductoPrecio.objects
+        .select_for_update()
+        .values_list("stock", flat=True)
+        .get(pk=producto.pk)
+    )
+    producto.stock = actual
+    diferencia = max(stock_nuevo - stock_base, -max(actual, 0))
+    if diferencia:
+        StockMovimiento.mover(producto, diferencia, StockMovimiento.Motivo.AJUSTE, usuario=usuario)
+
+
 # -------------------------------------------------------------------
 # Edición / alta-baja / eliminación desde panel admin
 # -------------------------------------------------------------------
@@ -396,6 +425,8 @@ def owner_producto_editar(request, pk):
             messages.success(request, "Producto eliminado.")
             return redirect("home")
 
+        variantes_antes = PrecioHistorial.precios_de_variantes([producto.pk])
+        stocks_variantes_antes = StockMovimiento.stocks_de_variantes([producto.pk])
         vformset = ProductoVarianteFormSet(
             request.POST,
             request.FILES,
@@ -436,13 +467,36 @@ def owner_producto_editar(request, pk):
 
         if vformset.is_valid():
             with transaction.atomic():
+                # Antes de guardar: si quedan variantes activas, el save lo lleva a 0 (otro movimiento)
+                _aplicar_stock_editado(
+                    producto,
+                    _stock_base(request.POST.get("stock_original"), original_data["stock"]),
+                    producto.stock,
+                    request.user,
+                )
                 producto.save()
                 vformset.save()
+                PrecioHistorial.registrar_varios([
+                    PrecioHistorial.nuevo(
+                        producto, original_data["precio"], producto.precio, origen="owner_editar"
+                    ),
+                    *PrecioHistorial.cambios_de_variantes(
+                        variantes_antes, [producto.pk], origen="owner_editar"
+                    ),
+                ])
+                StockMovimiento.registrar_varios(
+                    StockMovimiento.ajustes_de_variantes(
+                        stocks_variantes_antes, [producto.pk], usuario=request.user
+                    )
+                )
 
                 # CAMBIO CLAVE:
                 # si hay variantes activas, el stock del padre no se suma ni se usa
                 if producto.variantes.filter(activo=True).exists():
                     if producto.stock != 0:
+                        StockMovimiento.registrar_varios([
+                            StockMovimiento.ajuste(producto, producto.stock, 0, usuario=request.user),
+                        ])
                         producto.stock = 0
                         producto.save(update_fields=["stock"])
 
@@ -498,6 +552,7 @@ def owner_producto_editar(request, pk):
             "rubros": rubros,
             "subrubros": subrubros,
             "vformset": vformset,
+            "stock_original": original_data["stock"],
         },
     )
 
@@ -812,6 +867,9 @@ def owner_producto_create_ui(request):
 
             producto.imagen = None
             producto.save()
+            StockMovimiento.registrar_varios([
+                StockMovimiento.ajuste(producto, 0, producto.stock, usuario=request.user),
+            ])
 
             if imagen_file:
                 producto.imagen = imagen_file
@@ -825,11 +883,17 @@ def owner_producto_create_ui(request):
 
             vformset.instance = producto
             vformset.save()
+            StockMovimiento.registrar_varios(
+                StockMovimiento.ajustes_de_variantes({}, [producto.pk], usuario=request.user)
+            )
 
             # CAMBIO CLAVE:
             # si hay variantes activas, el stock del padre no se suma ni se usa
             variantes_activas = producto.variantes.filter(activo=True)
             if variantes_activas.exists() and producto.stock != 0:
+                StockMovimiento.registrar_varios([
+                    StockMovimiento.ajuste(producto, producto.stock, 0, usuario=request.user),
+                ])
                 producto.stock = 0
                 producto.save(update_fields=["stock"])
 
@@ -898,6 +962,12 @@ def owner_productos_completar_desde_factura(request):
     if request.method == "POST":
         all_valid = True
 
+        # Precios antes de que los forms toquen las instancias (para el historial)
+        precios_antes = {p.pk: (p.precio, p.precio_costo) for p in productos}
+        variantes_antes = PrecioHistorial.precios_de_variantes(ids)
+        stocks_antes = {p.pk: p.stock for p in productos}
+        stocks_variantes_antes = StockMovimiento.stocks_de_variantes(ids)
+
         for producto in productos:
             prefix = f"prod_{producto.pk}"
             form = ProductoDesdeFacturaBulkForm(
@@ -926,6 +996,7 @@ def owner_productos_completar_desde_factura(request):
                 all_valid = False
 
         if all_valid:
+            historial = []
             with transaction.atomic():
                 for row in form_rows:
                     producto = row["producto"]
@@ -967,14 +1038,38 @@ def owner_productos_completar_desde_factura(request):
                     producto_editado.rubro = rubro_nombre
                     producto_editado.subrubro = subrubro_nombre
 
+                    _aplicar_stock_editado(
+                        producto_editado,
+                        _stock_base(
+                            request.POST.get(f"{prefix}-stock_original"),
+                            stocks_antes[producto_editado.pk],
+                        ),
+                        producto_editado.stock,
+                        request.user,
+                    )
                     producto_editado.save()
                     row["vformset"].instance = producto_editado
                     row["vformset"].save()
 
+                    precio_antes, costo_antes = precios_antes[producto_editado.pk]
+                    historial.append(PrecioHistorial.nuevo(
+                        producto_editado,
+                        precio_antes,
+                        producto_editado.precio,
+                        origen="completar_factura",
+                        costo_anterior=costo_antes,
+                        costo_nuevo=producto_editado.precio_costo,
+                    ))
+
                     # CAMBIO CLAVE:
                     # si hay variantes activas, el stock del padre no se suma ni se usa
                     if producto_editado.variantes.filter(activo=True).exists():
                         if producto_editado.stock != 0:
+                            StockMovimiento.registrar_varios([
+                                StockMovimiento.ajuste(
+                                    producto_editado, producto_editado.stock, 0, usuario=request.user
+                                ),
+                            ])
                             producto_editado.stock = 0
                             producto_editado.save(update_fields=["stock"])
 
@@ -999,6 +1094,14 @@ def owner_productos_completar_desde_factura(request):
                         },
                     )
 
+                historial += PrecioHistorial.cambios_de_variantes(
+                    variantes_antes, ids, origen="completar_factura"
+                )
+                PrecioHistorial.registrar_varios(historial)
+                StockMovimiento.registrar_varios(
+                    StockMovimiento.ajustes_de_variantes(stocks_variantes_antes, ids, usuario=request.user)
+                )
+
             request.session.pop("productos_factura_creados_ids", None)
             messages.success(request, "Productos actualizados correctamente.")
             return redirect("home")
@@ -1689,71 +1792,69 @@ def owner_venta_rapida_create(request):
         form = VentaRapidaForm(request.POST)
 
         if form.is_valid():
-            with transaction.atomic():
-                venta = form.save(commit=False)
-                producto = venta.producto
-                variante = venta.variante
-
-                if variante:
-                    stock_disponible = variante.stock or 0
-                    costo_unitario = variante.precio if variante.precio is not None else (producto.precio_costo or Decimal("0.00"))
-                else:
-                    if producto.variantes.filter(activo=True).exists():
-                        messages.error(
-                            request,
-                            "Este producto tiene variantes activas. Elegí una variante para registrar la venta."
-                        )
-                        return redirect("owner_venta_rapida_create")
-
-                    stock_disponible = producto.stock or 0
-                    costo_unitario = producto.precio_costo or Decimal("0.00")
+            venta = form.save(commit=False)
+            producto = venta.producto
+            variante = venta.variante
 
-                if stock_disponible < venta.cantidad:
+            if variante:
+                costo_unitario = variante.precio if variante.precio is not None else (producto.precio_costo or Decimal("0.00"))
+            else:
+                if producto.variantes.filter(activo=True).exists():
                     messages.error(
                         request,
-                        f"No hay stock suficiente. Stock actual: {stock_disponible}."
+                        "Este producto tiene variantes activas. Elegí una variante para registrar la venta."
                     )
                     return redirect("owner_venta_rapida_create")
 
-                venta.subtotal = venta.precio_unitario * venta.cantidad
-                venta.costo_unitario = costo_unitario
-                venta.usuario = request.user
-                venta.save()
+                costo_unitario = producto.precio_costo or Decimal("0.00")
 
-                if variante:
-                    variante.stock = (variante.stock or 0) - venta.cantidad
-                    variante.save(update_fields=["stock"])
-                else:
-                    producto.stock = (producto.stock or 0) - venta.cantidad
-                    producto.save(update_fields=["stock"])
+            venta.subtotal = venta.precio_unitario * venta.cantidad
+            venta.costo_unitario = costo_unitario
+            venta.usuario = request.user
 
-                nombre_log = producto.nombre_publico or producto.sku
-                if variante:
-                    nombre_log = f"{nombre_log} - {variante.nombre}"
+            try:
+                with transaction.atomic():
+                    venta.save()
+                    # UPDATE condicional: si otra venta se llevó el stock, no se descuenta nada
+                    StockMovimiento.mover(
+                        producto,
+                        -venta.cantidad,
+                        StockMovimiento.Motivo.VENTA,
+                        variante=variante,
+                        ref=venta,
+                        usuario=request.user,
+                    )
 
-                registrar_evento(
-                    tipo="venta_registrada",
-                    titulo=f"Venta registrada: {nombre_log}",
-                    detalle=(
-                        f"Se vendieron {venta.cantidad} unidad(es) a ${venta.precio_unitario} "
-                        f"por un total de ${venta.subtotal}. Medio de pago: {venta.get_medio_pago_display()}."
-                    ),
-                    user=request.user,
-                    obj=producto,
-                    extra={
-                        "venta_id": venta.id,
-                        "producto_id": producto.id,
-                        "variante_id": variante.id if variante else None,
-                        "sku": producto.sku,
-                        "cantidad": venta.cantidad,
-                        "precio_unitario": str(venta.precio_unitario),
-                        "subtotal": str(venta.subtotal),
-                        "medio_pago": venta.medio_pago,
-                    },
-                )
+                    nombre_log = producto.nombre_publico or producto.sku
+                    if variante:
+                        nombre_log = f"{nombre_log} - {variante.nombre}"
+
+                    registrar_evento(
+                        tipo="venta_registrada",
+                        titulo=f"Venta registrada: {nombre_log}",
+                        detalle=(
+                            f"Se vendieron {venta.cantidad} unidad(es) a ${venta.precio_unitario} "
+                            f"por un total de ${venta.subtotal}. Medio de pago: {venta.get_medio_pago_display()}."
+                        ),
+                        user=request.user,
+                        obj=producto,
+                        extra={
+                            "venta_id": venta.id,
+                            "producto_id": producto.id,
+                            "variante_id": variante.id if variante else None,
+                            "sku": producto.sku,
+                            "cantidad": venta.cantidad,
+                            "precio_unitario": str(venta.precio_unitario),
+                            "subtotal": str(venta.subtotal),
+                            "medio_pago": venta.medio_pago,
+                        },
+                    )
+            except StockInsuficiente as e:
+                messages.error(request, str(e))
+                return redirect("owner_venta_rapida_create")
 
-                messages.success(request, "Venta registrada correctamente.")
-                return redirect("owner_caja_resumen")
+            messages.success(request, "Venta registrada correctamente.")
+            return redirect("owner_caja_resumen")
     else:
         form = VentaRapidaForm()
 
@@ -1835,6 +1936,19 @@ def owner_caja_resumen(request):
         .order_by("-unidades", "-total_vendido")[:10]
     )
 
+    # Costo de compra según facturas de proveedor (una consulta para los 10)
+    productos_mas_vendidos = list(productos_mas_vendidos)
+    costos_compra = ItemFactura.costos_por_producto(
+        [p["producto__id"] for p in productos_mas_vendidos if p["producto__id"]]
+    )
+    for p in productos_mas_vendidos:
+        costo = costos_compra.get(p["producto__id"], {}).get("costo_promedio")
+        p["costo_compra"] = costo
+        p["margen"] = None
+        if costo is not None and p["unidades"] and p["total_vendido"]:
+            precio_medio = p["total_vendido"] / p["unidades"]
+            p["margen"] = (precio_medio - costo) / precio_medio * 100
+
     variantes_mas_vendidas = (
         ventas.filter(variante__isnull=False)
         .values("variante__id", "variante__nombre", "producto__nombre_publico", "producto__sku")
@@ -1890,12 +2004,14 @@ def owner_venta_rapida_delete(request, pk):
     variante = venta.variante
 
     with transaction.atomic():
-        if variante:
-            variante.stock = (variante.stock or 0) + venta.cantidad
-            variante.save(update_fields=["stock"])
-        else:
-            producto.stock = (producto.stock or 0) + venta.cantidad
-            producto.save(update_fields=["stock"])
+        StockMovimiento.mover(
+            producto,
+            venta.cantidad,
+            StockMovimiento.Motivo.VENTA_ANULADA,
+            variante=variante,
+            ref=venta,
+            usuario=request.user,
+        )
 
         nombre_log = producto.nombre_publico or producto.sku
         if variante:
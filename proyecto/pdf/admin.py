@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import ProductoPrecio, ListaPrecioPDF, ProductoVariante
+from .models import (
+    ItemFactura,
+    ListaPrecioPDF,
+    PrecioHistorial,
+    ProductoPrecio,
+    ProductoVariante,
+    StockMovimiento,
+)
 
 @admin.register(ListaPrecioPDF)
 class ListaPrecioPDFAdmin(admin.ModelAdmin):
@@ -24,9 +31,116 @@ class ProductoPrecioAdmin(admin.ModelAdmin):
     list_editable = ("precio", "stock", "activo", "tech", "rubro", "subrubro")
     ordering = ("nombre_publico",)
 
+    def save_model(self, request, obj, form, change):
+        # El ajuste va antes del save: si hay variantes activas, el save lo lleva a 0 (otro movimiento)
+        if change and "stock" in form.changed_data:
+            StockMovimiento.registrar_varios([
+                StockMovimiento.ajuste(obj, form.initial.get("stock"), obj.stock, usuario=request.user),
+            ])
+        super().save_model(request, obj, form, change)
+        if not change:
+            StockMovimiento.registrar_varios([
+                StockMovimiento.ajuste(obj, 0, obj.stock, usuario=request.user),
+            ])
+        if change and {"precio", "precio_costo"} & set(form.changed_data):
+            PrecioHistorial.registrar(
+                obj,
+                form.initial.get("precio"),
+                obj.precio,
+                origen="admin",
+                costo_anterior=form.initial.get("precio_costo", obj.precio_costo),
+                costo_nuevo=obj.precio_costo,
+            )
+
 @admin.register(ProductoVariante)
 class ProductoVarianteAdmin(admin.ModelAdmin):
     list_display = ("producto", "nombre", "stock", "activo", "orden")
     list_filter = ("activo",)
     search_fields = ("producto__nombre_publico", "producto__sku", "nombre")
     list_editable = ("stock", "activo", "orden")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change or "stock" in form.changed_data:
+            StockMovimiento.registrar_varios([
+                StockMovimiento.ajuste(
+                    obj.producto,
+                    form.initial.get("stock") if change else 0,
+                    obj.stock,
+                    variante=obj,
+                    usuario=request.user,
+                ),
+            ])
+        if change and "precio" in form.changed_data:
+            PrecioHistorial.registrar(
+                obj.producto,
+                form.initial.get("precio"),
+                obj.precio,
+                origen="admin",
+                variante=obj,
+            )
+
+
+@admin.register(PrecioHistorial)
+class PrecioHistorialAdmin(admin.ModelAdmin):
+    list_display = (
+        "producto",
+        "variante",
+        "precio_anterior",
+        "precio_nuevo",
+        "costo_anterior",
+        "costo_nuevo",
+        "origen",
+        "creado_en",
+    )
+    list_filter = ("origen",)
+    search_fields = ("producto__nombre_publico", "producto__sku")
+    date_hierarchy = "creado_en"
+    raw_id_fields = ("producto", "variante")
+
+
+@admin.register(StockMovimiento)
+class StockMovimientoAdmin(admin.ModelAdmin):
+    list_display = (
+        "producto",
+        "variante",
+        "motivo",
+        "cantidad",
+        "saldo",
+        "ref_model",
+        "ref_id",
+        "usuario",
+        "creado_en",
+    )
+    list_filter = ("motivo",)
+    search_fields = ("producto__nombre_publico", "producto__sku", "ref_id")
+    date_hierarchy = "creado_en"
+    raw_id_fields = ("producto", "variante", "usuario")
+
+    # El libro solo se agrega desde el código (ver StockMovimiento.mover)
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ItemFactura)
+class ItemFacturaAdmin(admin.ModelAdmin):
+    # Para vincular a mano los ítems que no matchearon con el catálogo
+    list_display = (
+        "producto",
+        "producto_catalogo",
+        "variante",
+        "cantidad",
+        "precio_unitario",
+        "fecha",
+        "factura",
+    )
+    list_filter = (("producto_catalogo", admin.EmptyFieldListFilter),)
+    search_fields = ("producto", "producto_catalogo__sku", "producto_catalogo__nombre_publico")
+    date_hierarchy = "fecha"
+    raw_id_fields = ("factura", "producto_catalogo", "variante")
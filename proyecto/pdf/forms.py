@@ -23,6 +23,42 @@ class FacturaProveedorForm(forms.ModelForm):
             'archivo': forms.FileInput(attrs={'class': 'form-control', 'accept': '.pdf'})
         }
 
+# Tope de archivos por lote (cada uno se parsea en el pool de procesos)
+MAX_FACTURAS_LOTE = 30
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)]
+
+
+class FacturasProveedorLoteForm(forms.Form):
+    archivos = MultipleFileField(
+        label="Facturas (PDF)",
+        widget=MultipleFileInput(attrs={"class": "form-control", "accept": ".pdf"}),
+    )
+
+    def clean_archivos(self):
+        archivos = self.cleaned_data["archivos"]
+        if len(archivos) > MAX_FACTURAS_LOTE:
+            raise forms.ValidationError(f"Máximo {MAX_FACTURAS_LOTE} facturas por lote.")
+        no_pdf = [a.name for a in archivos if not a.name.lower().endswith(".pdf")]
+        if no_pdf:
+            raise forms.ValidationError(f"Sólo PDF: {', '.join(no_pdf)}")
+        return archivos
+
+
 class ListaPreciosPDFForm(forms.Form):
     TECH_CHOICES = [
         ("ALL", "Toda la base"),
@@ -32,7 +68,21 @@ class ListaPreciosPDFForm(forms.Form):
         ("OTR", "Otros"),
     ]
 
+    MODO_CHOICES = [
+        ("completa", "Lista completa"),
+        ("cambios", "Solo cambios de precio"),
+    ]
+
     tecnica = forms.ChoiceField(choices=TECH_CHOICES, initial="ALL", required=True)
+
+    # Lista completa o solo los productos cuyo precio cambió
+    modo = forms.ChoiceField(choices=MODO_CHOICES, initial="completa", required=True)
+    cambios_desde = forms.DateField(
+        required=False,
+        label="Cambios desde",
+        widget=forms.DateInput(attrs={"type": "date"}),
+        help_text="Si lo dejás vacío, se usa la fecha de la última lista generada.",
+    )
     incluir_sku = forms.BooleanField(required=False, initial=True)
 
     # % de descuento mayorista (ej: 20 = -20%)
@@ -87,4 +137,22 @@ class FacturaForm(forms.Form):
     vendedor_direccion = forms.CharField(max_length=160, required=True)
 
     validez_dias = forms.IntegerField(label="Validez (días)", initial=7, min_value=1)
-    sena = forms.DecimalField(label="Seña ($)", initial=Decimal("0.00"), required=False, min_value=Decimal("0.00"))
\ No newline at end of file
+    sena = forms.DecimalField(label="Seña ($)", initial=Decimal("0.00"), required=False, min_value=Decimal("0.00"))
+
+class FacturasLoteForm(forms.Form):
+    desde = forms.DateField(
+        label="Desde",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+    )
+    hasta = forms.DateField(
+        label="Hasta",
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}),
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        desde = cleaned.get("desde")
+        hasta = cleaned.get("hasta")
+        if desde and hasta and desde > hasta:
+            self.add_error("hasta", "La fecha 'hasta' no puede ser anterior a 'desde'.")
+        return cleaned
@@ -0,0 +1,119 @@
+# pdf/management/commands/benchmark_pdf_texto.py
+"""
+Compara los backends de pdf/utils_texto_pdf.py sobre PDFs reales:
+velocidad (páginas/seg) y cuántos ítems sacan los parsers con ese texto.
+
+    python manage.py benchmark_pdf_texto
+    python manage.py benchmark_pdf_texto media/listas_precios --parser lista
+    python manage.py benchmark_pdf_texto factura.pdf --backends pdfium,pdfplumber -r 5
+"""
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pdf.utils import _parsear_pagina
+from pdf.utils_facturas import parse_invoice_text
+from pdf.utils_texto_pdf import backends_disponibles, iterar_paginas
+
+
+def _archivos(rutas):
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(sorted(glob.glob(os.path.join(ruta, "**", "*.pdf"), recursive=True)))
+        else:
+            archivos.extend(sorted(glob.glob(ruta)))
+    return archivos
+
+
+def _items(parser, paginas):
+    if parser == "lista":
+        return sum(
+            len(_parsear_pagina(p["numero"] - 1, p["texto"])[0])
+            for p in paginas
+        )
+    if parser == "factura":
+        return len(parse_invoice_text("\n".join(p["texto"] for p in paginas)))
+    return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark de extracción de texto de PDF por backend (pdfium / pypdf / PyPDF2 / pdfplumber)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "rutas", nargs="*",
+            help="Archivos, carpetas o globs. Por defecto: media/listas_precios y media/facturas.",
+        )
+        parser.add_argument(
+            "--backends", default="",
+            help="Lista separada por comas. Por defecto, todos los instalados.",
+        )
+        parser.add_argument(
+            "-r", "--repeticiones", type=int, default=3,
+            help="Se toma el mejor tiempo de N corridas por archivo.",
+        )
+        parser.add_argument(
+            "--parser", choices=("lista", "factura", "ninguno"), default="ninguno",
+            help="Además de medir, pasar el texto por este parser y contar ítems.",
+        )
+
+    def handle(self, *args, **options):
+        rutas = options["rutas"] or [
+            os.path.join(settings.MEDIA_ROOT, "listas_precios"),
+            os.path.join(settings.MEDIA_ROOT, "facturas"),
+        ]
+        archivos = _archivos(rutas)
+        if not archivos:
+            raise CommandError("No se encontraron PDFs en: " + ", ".join(rutas))
+
+        disponibles = backends_disponibles()
+        backends = [b.strip() for b in options["backends"].split(",") if b.strip()] or disponibles
+        faltan = [b for b in backends if b not in disponibles]
+        if faltan:
+            raise CommandError(f"Backends no disponibles: {', '.join(faltan)}")
+
+        repeticiones = max(1, options["repeticiones"])
+        parser = options["parser"]
+
+        self.stdout.write(f"{len(archivos)} PDFs · {repeticiones} repeticiones · parser: {parser}\n")
+        self.stdout.write(
+            f"{'backend':<12}{'págs':>8}{'seg':>10}{'págs/seg':>12}{'líneas':>10}{'ítems':>9}{'errores':>9}"
+        )
+
+        for backend in backends:
+            paginas_total = lineas_total = errores = 0
+            items_total = None
+            segundos = 0.0
+
+            for archivo in archivos:
+                mejor = None
+                paginas = []
+                try:
+                    for _ in range(repeticiones):
+                        inicio = time.perf_counter()
+                        paginas = list(iterar_paginas(archivo, backend))
+                        transcurrido = time.perf_counter() - inicio
+                        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+                except Exception as e:
+                    errores += 1
+                    if options["verbosity"] > 1:
+                        self.stderr.write(f"  {backend}: {archivo}: {e}")
+                    continue
+
+                segundos += mejor
+                paginas_total += len(paginas)
+                lineas_total += sum(len(p["lineas"]) for p in paginas)
+
+                items = _items(parser, paginas)
+                if items is not None:
+                    items_total = (items_total or 0) + items
+
+            por_segundo = paginas_total / segundos if segundos else 0
+            self.stdout.write(
+                f"{backend:<12}{paginas_total:>8}{segundos:>10.3f}{por_segundo:>12.1f}"
+                f"{lineas_total:>10}{'-' if items_total is None else items_total:>9}{errores:>9}"
+            )
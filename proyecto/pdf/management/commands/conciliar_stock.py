@@ -0,0 +1,90 @@
+# pdf/management/commands/conciliar_stock.py
+"""
+Conciliación de stock: compara el stock de cada producto / variante contra
+la suma de su libro de movimientos (StockMovimiento).
+
+    python manage.py conciliar_stock
+    python manage.py conciliar_stock --sku MATE_IMPERIAL      # historial de un producto
+    python manage.py conciliar_stock --ajustar                # asienta las diferencias
+
+Las diferencias salen de cambios hechos por fuera del libro (admin,
+shell, scripts viejos). --ajustar deja un movimiento "ajuste" por cada una.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pdf.models import ProductoPrecio, StockMovimiento
+
+
+class Command(BaseCommand):
+    help = "Compara stock vs. libro de movimientos y, opcionalmente, asienta las diferencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ajustar", action="store_true",
+            help="Registrar un movimiento de ajuste por cada diferencia.",
+        )
+        parser.add_argument(
+            "--sku", default="",
+            help="Mostrar el historial de movimientos de este producto.",
+        )
+        parser.add_argument(
+            "--limite", type=int, default=50,
+            help="Cantidad de movimientos a mostrar con --sku.",
+        )
+
+    def handle(self, *args, **options):
+        if options["sku"]:
+            return self._historial(options["sku"], options["limite"])
+
+        productos, variantes = StockMovimiento.diferencias()
+        productos = list(productos.order_by("sku"))
+        variantes = list(variantes.order_by("producto__sku", "orden", "id"))
+
+        if not productos and not variantes:
+            self.stdout.write(self.style.SUCCESS("Stock y libro coinciden."))
+            return
+
+        self.stdout.write(f"{'sku':<40}{'variante':<20}{'stock':>8}{'libro':>8}{'dif.':>8}")
+        for p in productos:
+            self.stdout.write(
+                f"{p.sku[:39]:<40}{'':<20}{p.stock:>8}{p.stock_libro:>8}{p.stock - p.stock_libro:>8}"
+            )
+        for v in variantes:
+            self.stdout.write(
+                f"{v.producto.sku[:39]:<40}{v.nombre[:19]:<20}{v.stock:>8}{v.stock_libro:>8}"
+                f"{v.stock - v.stock_libro:>8}"
+            )
+        self.stdout.write(f"\n{len(productos)} productos y {len(variantes)} variantes con diferencias.")
+
+        if not options["ajustar"]:
+            return
+
+        filas = [StockMovimiento.ajuste(p, p.stock_libro, p.stock) for p in productos]
+        filas += [
+            StockMovimiento.ajuste(v.producto, v.stock_libro, v.stock, variante=v)
+            for v in variantes
+        ]
+        with transaction.atomic():
+            creadas = StockMovimiento.registrar_varios(filas)
+        self.stdout.write(self.style.SUCCESS(f"{len(creadas)} movimientos de ajuste registrados."))
+
+    def _historial(self, sku, limite):
+        producto = ProductoPrecio.objects.filter(sku__iexact=sku).first()
+        if producto is None:
+            raise CommandError(f"No existe un producto con SKU {sku}.")
+
+        movimientos = (
+            StockMovimiento.objects
+            .filter(producto=producto)
+            .select_related("variante", "usuario")
+            .order_by("-creado_en", "-id")[:limite]
+        )
+        self.stdout.write(f"{producto.nombre_publico} ({producto.sku}) · stock actual {producto.stock}\n")
+        self.stdout.write(f"{'fecha':<18}{'variante':<20}{'motivo':<24}{'cant.':>7}{'saldo':>7}  referencia")
+        for m in movimientos:
+            referencia = f"{m.ref_model} #{m.ref_id}" if m.ref_model else ""
+            self.stdout.write(
+                f"{m.creado_en:%d/%m/%Y %H:%M}  {(m.variante.nombre if m.variante else '')[:19]:<20}"
+                f"{m.get_motivo_display():<24}{m.cantidad:>+7}{m.saldo:>7}  {referencia}"
+            )
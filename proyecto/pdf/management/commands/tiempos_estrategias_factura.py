@@ -0,0 +1,84 @@
+# pdf/management/commands/tiempos_estrategias_factura.py
+"""
+Resumen de cómo les fue a las estrategias de extracción de facturas
+(guardado en ImportBatch.estrategias), para ajustar presupuestos y plazo.
+
+    python manage.py tiempos_estrategias_factura
+    python manage.py tiempos_estrategias_factura --dias 7
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pdf.models import ImportBatch
+from pdf.utils_estrategias_factura import ESTRATEGIAS_FACTURA, PRESUPUESTOS, Estado
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Tiempos, timeouts y victorias de cada estrategia de extracción de facturas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=30,
+            help="Sólo facturas analizadas en los últimos N días (0 = todas).",
+        )
+
+    def handle(self, *args, **options):
+        qs = ImportBatch.objects.filter(tipo=ImportBatch.Tipo.FACTURA).exclude(estrategias=[])
+        if options["dias"]:
+            qs = qs.filter(creado_en__gte=timezone.now() - timedelta(days=options["dias"]))
+
+        stats = {}
+        facturas = 0
+        for corrida in qs.values_list("estrategias", flat=True).iterator():
+            facturas += 1
+            ganadora = max(
+                (r for r in corrida if r.get("puntaje", 0) > 0),
+                key=lambda r: r["puntaje"],
+                default=None,
+            )
+            for r in corrida:
+                s = stats.setdefault(r["estrategia"], {
+                    "corridas": 0, "segundos": [], "ganadas": 0, "cierra": 0,
+                    Estado.TIEMPO_AGOTADO: 0, Estado.ERROR: 0, Estado.DESCARTADA: 0,
+                })
+                s["corridas"] += 1
+                if r["estado"] == Estado.OK:
+                    s["segundos"].append(r["segundos"])
+                    s["cierra"] += bool(r.get("cierra_total"))
+                else:
+                    s[r["estado"]] = s.get(r["estado"], 0) + 1
+                if r is ganadora:
+                    s["ganadas"] += 1
+
+        if not facturas:
+            self.stdout.write("No hay facturas analizadas con estrategias en el período.")
+            return
+
+        self.stdout.write(f"{facturas} facturas\n")
+        self.stdout.write(
+            f"{'estrategia':<12}{'presup.':>9}{'corridas':>10}{'ganadas':>9}{'cierra':>8}"
+            f"{'p50':>8}{'p95':>8}{'máx':>8}{'timeout':>9}{'error':>7}{'descart.':>10}"
+        )
+        orden = list(ESTRATEGIAS_FACTURA) + sorted(set(stats) - set(ESTRATEGIAS_FACTURA))
+        for nombre in orden:
+            s = stats.get(nombre)
+            if not s:
+                continue
+            presupuesto = PRESUPUESTOS.get(
+                nombre, ESTRATEGIAS_FACTURA.get(nombre, {}).get("presupuesto", "-")
+            )
+            self.stdout.write(
+                f"{nombre:<12}{presupuesto:>9}{s['corridas']:>10}{s['ganadas']:>9}{s['cierra']:>8}"
+                f"{_percentil(s['segundos'], 50):>8.2f}{_percentil(s['segundos'], 95):>8.2f}"
+                f"{max(s['segundos'], default=0):>8.2f}{s[Estado.TIEMPO_AGOTADO]:>9}"
+                f"{s[Estado.ERROR]:>7}{s[Estado.DESCARTADA]:>10}"
+            )
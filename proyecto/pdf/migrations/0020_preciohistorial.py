@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0019_pdfbranding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioHistorial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio_anterior', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('precio_nuevo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('origen', models.CharField(blank=True, default='', max_length=40)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_precios', to='pdf.productoprecio')),
+            ],
+            options={
+                'ordering': ['-creado_en', '-id'],
+                'indexes': [models.Index(fields=['creado_en'], name='pdf_precioh_creado__ebf30b_idx')],
+            },
+        ),
+    ]
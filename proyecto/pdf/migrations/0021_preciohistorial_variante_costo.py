@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0020_preciohistorial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preciohistorial',
+            name='costo_anterior',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='preciohistorial',
+            name='costo_nuevo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='preciohistorial',
+            name='variante',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='historial_precios', to='pdf.productovariante'),
+        ),
+        migrations.AlterField(
+            model_name='preciohistorial',
+            name='precio_nuevo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='preciohistorial',
+            index=models.Index(fields=['producto', 'creado_en'], name='pdf_precioh_product_8e0d63_idx'),
+        ),
+    ]
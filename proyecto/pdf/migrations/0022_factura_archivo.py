@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:43
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0021_preciohistorial_variante_costo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='archivo',
+            field=models.FileField(blank=True, null=True, upload_to='facturas_cliente/'),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='sena',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='validez_dias',
+            field=models.PositiveIntegerField(default=7),
+        ),
+        migrations.AddField(
+            model_name='facturaitem',
+            name='descripcion',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['creado'], name='pdf_factura_creado_4d8a46_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0022_factura_archivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('lista', 'Lista de precios'), ('factura', 'Factura de proveedor')], max_length=10)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente de confirmar'), ('confirmado', 'Confirmado'), ('descartado', 'Descartado')], default='pendiente', max_length=12)),
+                ('update_only', models.BooleanField(default=False)),
+                ('parse_errors', models.JSONField(blank=True, default=list)),
+                ('total_filas', models.PositiveIntegerField(default=0)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('confirmado_en', models.DateTimeField(blank=True, null=True)),
+                ('factura_proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_batches', to='pdf.facturaproveedor')),
+                ('lista_pdf', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_batches', to='pdf.listapreciopdf')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado_en', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cantidad', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('moneda', models.CharField(default='ARS', max_length=3)),
+                ('pagina', models.PositiveIntegerField(blank=True, null=True)),
+                ('dup_en_pdf', models.BooleanField(default=False)),
+                ('sugerencia_score', models.PositiveSmallIntegerField(default=0)),
+                ('sugerencias', models.JSONField(blank=True, default=list)),
+                ('accion', models.CharField(blank=True, default='', max_length=40)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filas', to='pdf.importbatch')),
+                ('exacto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pdf.productoprecio')),
+                ('sugerido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pdf.productoprecio')),
+            ],
+            options={
+                'ordering': ['batch', 'orden'],
+                'unique_together': {('batch', 'orden')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:50
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def calcular_sha256_existentes(apps, schema_editor):
+    # Las listas ya subidas también cuentan para detectar duplicados
+    ListaPrecioPDF = apps.get_model("pdf", "ListaPrecioPDF")
+    for lista in ListaPrecioPDF.objects.filter(sha256="").iterator():
+        if not lista.archivo_pdf:
+            continue
+        try:
+            h = hashlib.sha256()
+            with lista.archivo_pdf.open("rb") as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                    h.update(chunk)
+        except (OSError, ValueError):
+            continue
+        ListaPrecioPDF.objects.filter(pk=lista.pk).update(sha256=h.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0023_import_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listapreciopdf',
+            name='parse_cache',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listapreciopdf',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.RunPython(calcular_sha256_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0024_lista_sha256_parse_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='filas_sin_cambios',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='lista_anterior',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pdf.listapreciopdf'),
+        ),
+        migrations.AddField(
+            model_name='importrow',
+            name='cambio',
+            field=models.CharField(blank=True, choices=[('nuevo', 'Nuevo en la lista'), ('precio', 'Cambió el precio'), ('quitado', 'Ya no está en la lista')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importrow',
+            name='precio_anterior',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='listapreciopdf',
+            name='proveedor',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=120),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0025_import_solo_cambios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoOCR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('paginas', models.PositiveIntegerField(default=0)),
+                ('paginas_listas', models.PositiveIntegerField(default=0)),
+                ('texto', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('factura', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_ocr', to='pdf.facturaproveedor')),
+            ],
+            options={
+                'ordering': ['-creado_en', '-id'],
+            },
+        ),
+    ]
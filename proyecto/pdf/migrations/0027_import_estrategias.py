@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0026_trabajo_ocr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='estrategias',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def saldos_iniciales(apps, schema_editor):
+    # El stock que ya había entra al libro como saldo inicial
+    ProductoPrecio = apps.get_model("pdf", "ProductoPrecio")
+    ProductoVariante = apps.get_model("pdf", "ProductoVariante")
+    StockMovimiento = apps.get_model("pdf", "StockMovimiento")
+
+    filas = [
+        StockMovimiento(producto_id=pk, cantidad=stock, saldo=stock, motivo="inicial")
+        for pk, stock in ProductoPrecio.objects.exclude(stock=0).values_list("pk", "stock").iterator()
+    ]
+    filas.extend(
+        StockMovimiento(producto_id=producto_id, variante_id=pk, cantidad=stock, saldo=stock, motivo="inicial")
+        for pk, producto_id, stock in (
+            ProductoVariante.objects.exclude(stock=0).values_list("pk", "producto_id", "stock").iterator()
+        )
+    )
+    StockMovimiento.objects.bulk_create(filas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0027_import_estrategias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField()),
+                ('saldo', models.IntegerField()),
+                ('motivo', models.CharField(choices=[('inicial', 'Saldo inicial'), ('venta', 'Venta en local'), ('venta_anulada', 'Venta anulada'), ('compra', 'Factura de proveedor'), ('pedido', 'Pedido web pagado'), ('ajuste', 'Ajuste manual')], max_length=20)),
+                ('ref_model', models.CharField(blank=True, default='', max_length=100)),
+                ('ref_id', models.CharField(blank=True, default='', max_length=50)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_stock', to='pdf.productoprecio')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_stock', to=settings.AUTH_USER_MODEL)),
+                ('variante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_stock', to='pdf.productovariante')),
+            ],
+            options={
+                'ordering': ['-creado_en', '-id'],
+                'indexes': [models.Index(fields=['producto', 'creado_en'], name='pdf_stockmo_product_570c18_idx'), models.Index(fields=['variante', 'creado_en'], name='pdf_stockmo_variant_abf9aa_idx'), models.Index(fields=['ref_model', 'ref_id'], name='pdf_stockmo_ref_mod_a7e0d9_idx')],
+            },
+        ),
+        migrations.RunPython(saldos_iniciales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def completar_items(apps, schema_editor):
+    # Fecha de compra en cada ítem y, cuando el texto coincide con un SKU o
+    # un nombre del catálogo sin ambigüedad, el vínculo al producto
+    ItemFactura = apps.get_model("pdf", "ItemFactura")
+    ProductoPrecio = apps.get_model("pdf", "ProductoPrecio")
+
+    por_texto = {}
+    repetidos = set()
+    for pk, sku, nombre in ProductoPrecio.objects.values_list("pk", "sku", "nombre_publico").iterator():
+        for clave in {(sku or "").strip().lower(), (nombre or "").strip().lower()} - {""}:
+            if clave in por_texto and por_texto[clave] != pk:
+                repetidos.add(clave)
+            por_texto[clave] = pk
+    for clave in repetidos:
+        del por_texto[clave]
+
+    items = []
+    for item in ItemFactura.objects.select_related("factura").iterator(chunk_size=500):
+        factura = item.factura
+        # Igual que FacturaProveedor.fecha_compra: el día local, no el de UTC
+        item.fecha = factura.fecha_factura or timezone.localdate(factura.fecha_subida)
+        item.producto_catalogo_id = por_texto.get(item.producto.strip().lower())
+        items.append(item)
+    ItemFactura.objects.bulk_update(items, ["fecha", "producto_catalogo"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf', '0028_stock_movimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemfactura',
+            name='fecha',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemfactura',
+            name='producto_catalogo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items_factura', to='pdf.productoprecio'),
+        ),
+        migrations.AddField(
+            model_name='itemfactura',
+            name='variante',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items_factura', to='pdf.productovariante'),
+        ),
+        migrations.AddIndex(
+            model_name='itemfactura',
+            index=models.Index(fields=['producto_catalogo', 'fecha'], name='pdf_itemfac_product_916e5f_idx'),
+        ),
+        migrations.RunPython(completar_items, migrations.RunPython.noop),
+    ]
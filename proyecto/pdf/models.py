@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.db import models
-from django.db.models import Sum
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -9,6 +12,15 @@ class ListaPrecioPDF(models.Model):
     archivo_pdf = models.FileField(upload_to='listas_precios/')
     fecha_subida = models.DateTimeField(auto_now_add=True)
 
+    # Proveedor (texto libre): sirve para comparar contra la lista anterior del mismo proveedor
+    proveedor = models.CharField(max_length=120, blank=True, default="", db_index=True)
+
+    # SHA-256 del archivo: si se vuelve a subir el mismo PDF se reutiliza este registro
+    sha256 = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    # Resultado de extraer_precios_de_pdf ya serializado (ver pdf.views._parse_lista_con_cache)
+    parse_cache = models.JSONField(null=True, blank=True)
+
     def __str__(self):
         return self.nombre
 
@@ -134,9 +146,11 @@ class ProductoPrecio(models.Model):
         Entonces forzamos stock = 0.
         """
         if self.pk and self.variantes.filter(activo=True).exists() and self.stock != 0:
+            antes = self.stock
             self.stock = 0
             if save:
                 ProductoPrecio.objects.filter(pk=self.pk).update(stock=0)
+                StockMovimiento.registrar_varios([StockMovimiento.ajuste(self, antes, 0)])
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -154,6 +168,15 @@ class FacturaProveedor(models.Model):
     def __str__(self):
         return f"Factura {self.id} - {self.fecha_subida.strftime('%d/%m/%Y')}"
 
+    @property
+    def fecha_compra(self):
+        """Fecha de la factura; si no se cargó, el día en que se subió."""
+        if self.fecha_factura:
+            return self.fecha_factura
+        if self.fecha_subida:
+            return timezone.localdate(self.fecha_subida)
+        return timezone.localdate()
+
 
 class ItemFactura(models.Model):
     factura = models.ForeignKey(
@@ -166,9 +189,81 @@ class ItemFactura(models.Model):
     precio_unitario = models.DecimalField(max_digits=12, decimal_places=2)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
+    # Vínculo con el catálogo (el texto de "producto" queda tal cual vino en la factura)
+    producto_catalogo = models.ForeignKey(
+        ProductoPrecio,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="items_factura",
+    )
+    variante = models.ForeignKey(
+        "ProductoVariante",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="items_factura",
+    )
+    # Copia de factura.fecha_compra: un índice no puede cruzar tablas
+    fecha = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["producto_catalogo", "fecha"]),
+        ]
+
     def __str__(self):
         return f"{self.cantidad} x {self.producto}"
 
+    @classmethod
+    def costos_por_producto(cls, productos_ids=None, hasta=None):
+        """
+        Costo de compra por producto del catálogo, en una sola consulta:
+
+            {producto_id: {"unidades", "costo_promedio", "ultimo_costo", "ultima_compra"}}
+
+        - costo_promedio: ponderado por cantidad
+        - ultimo_costo: precio unitario de la compra más reciente
+        - hasta: sólo compras hasta esa fecha (inclusive)
+        """
+        qs = cls.objects.filter(producto_catalogo__isnull=False, cantidad__gt=0)
+        if productos_ids is not None:
+            qs = qs.filter(producto_catalogo_id__in=list(productos_ids))
+        if hasta is not None:
+            qs = qs.filter(fecha__lte=hasta)
+
+        ultimo = (
+            qs.filter(producto_catalogo=OuterRef("producto_catalogo"))
+            .order_by(F("fecha").desc(nulls_last=True), "-id")
+            .values("precio_unitario")[:1]
+        )
+        filas = (
+            qs.values("producto_catalogo")
+            .annotate(
+                unidades=Sum("cantidad"),
+                importe=Sum(ExpressionWrapper(
+                    F("cantidad") * F("precio_unitario"),
+                    output_field=DecimalField(max_digits=22, decimal_places=4),
+                )),
+                ultimo_costo=Subquery(ultimo),
+                ultima_compra=Max("fecha"),
+            )
+            .order_by()
+        )
+
+        costos = {}
+        for f in filas:
+            costos[f["producto_catalogo"]] = {
+                "unidades": f["unidades"],
+                "costo_promedio": (
+                    (Decimal(f["importe"]) / f["unidades"]).quantize(Decimal("0.01"))
+                    if f["unidades"] else None
+                ),
+                "ultimo_costo": f["ultimo_costo"],
+                "ultima_compra": f["ultima_compra"],
+            }
+        return costos
+
 
 class ProductoVariante(models.Model):
     producto = models.ForeignKey(
@@ -246,16 +341,33 @@ class Factura(models.Model):
     cliente_doc = models.CharField(max_length=60, blank=True)  # DNI/CUIL
     cliente_direccion = models.CharField(max_length=180, blank=True)
 
+    # Condiciones
+    validez_dias = models.PositiveIntegerField(default=7)
+    sena = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
     # Totales
     total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
 
+    # PDF ya generado: las re-descargas salen de acá sin volver a renderizar
+    archivo = models.FileField(upload_to="facturas_cliente/", blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["creado"]),
+        ]
+
     def __str__(self):
         return f"Factura #{self.id} - {self.cliente_nombre}"
 
+    @property
+    def nombre_archivo(self):
+        return f"factura_{self.pk}_{timezone.localtime(self.creado):%Y-%m-%d}.pdf"
+
 
 class FacturaItem(models.Model):
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE, related_name="items")
     producto_nombre = models.CharField(max_length=200)
+    descripcion = models.CharField(max_length=255, blank=True, default="")
     precio_unitario = models.DecimalField(max_digits=12, decimal_places=2)
     cantidad = models.PositiveIntegerField(default=1)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
@@ -314,4 +426,563 @@ class PDFBranding(models.Model):
     watermark = models.ImageField(upload_to="branding/", blank=True, null=True)
 
     def __str__(self):
-        return "PDFBranding"
\ No newline at end of file
+        return "PDFBranding"
+
+class PrecioHistorial(models.Model):
+    """
+    Historial compacto (solo se agregan filas) de cambios de precio de venta y de costo.
+    Una fila por cambio, así las consultas por rango de fechas ("qué cambió esta
+    semana", "cuánto salía el día X") no tienen que recorrer el JSON de la bitácora.
+
+    - Si `variante` es NULL, la fila es del producto; si no, del precio propio de la variante.
+    - Cuando solo cambia el costo, precio_anterior y precio_nuevo quedan iguales
+      (el precio de venta vigente en ese momento).
+    """
+    producto = models.ForeignKey(
+        ProductoPrecio,
+        on_delete=models.CASCADE,
+        related_name="historial_precios",
+    )
+    variante = models.ForeignKey(
+        ProductoVariante,
+        on_delete=models.CASCADE,
+        related_name="historial_precios",
+        null=True,
+        blank=True,
+    )
+
+    precio_anterior = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    precio_nuevo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    costo_anterior = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    costo_nuevo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Desde dónde se cambió (importar_pdf, doc_precios, owner_editar, factura_proveedor, ...)
+    origen = models.CharField(max_length=40, blank=True, default="")
+
+    creado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-creado_en", "-id"]
+        indexes = [
+            models.Index(fields=["producto", "creado_en"]),
+            models.Index(fields=["creado_en"]),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.precio_anterior} → {self.precio_nuevo} ({self.creado_en:%d/%m/%Y})"
+
+    @classmethod
+    def nuevo(
+        cls,
+        producto,
+        precio_anterior,
+        precio_nuevo,
+        origen="",
+        costo_anterior=None,
+        costo_nuevo=None,
+        variante=None,
+    ):
+        """
+        Arma la fila SIN guardarla (para juntar varias y usar bulk_create).
+        Devuelve None si no cambió ni el precio ni el costo.
+        """
+        if precio_anterior == precio_nuevo and costo_anterior == costo_nuevo:
+            return None
+        return cls(
+            producto=producto,
+            variante=variante,
+            precio_anterior=precio_anterior,
+            precio_nuevo=precio_nuevo,
+            costo_anterior=costo_anterior,
+            costo_nuevo=costo_nuevo,
+            origen=origen,
+        )
+
+    @classmethod
+    def registrar(cls, producto, precio_anterior, precio_nuevo, origen="", **kwargs):
+        """
+        Guarda el cambio solo si el precio (o el costo) realmente cambió.
+        """
+        fila = cls.nuevo(producto, precio_anterior, precio_nuevo, origen=origen, **kwargs)
+        if fila is not None:
+            fila.save()
+        return fila
+
+    @classmethod
+    def registrar_varios(cls, filas):
+        """
+        Inserta de una sola vez las filas armadas con `nuevo()` (ignora los None).
+        """
+        filas = [f for f in filas if f is not None]
+        if not filas:
+            return []
+        return cls.objects.bulk_create(filas, batch_size=500)
+
+    @staticmethod
+    def precios_de_variantes(productos_ids):
+        """
+        {variante_id: precio} de las variantes de esos productos.
+        Se toma antes de guardar un formset para después comparar.
+        """
+        return dict(
+            ProductoVariante.objects
+            .filter(producto_id__in=productos_ids)
+            .values_list("pk", "precio")
+        )
+
+    @classmethod
+    def cambios_de_variantes(cls, antes, productos_ids, origen=""):
+        """
+        Compara `antes` (ver precios_de_variantes) contra lo que quedó en la base
+        y devuelve las filas (sin guardar) de las variantes cuyo precio cambió.
+        Las variantes nuevas no se registran: no tienen precio anterior.
+        """
+        filas = []
+        variantes = (
+            ProductoVariante.objects
+            .filter(producto_id__in=productos_ids, pk__in=list(antes.keys()))
+            .select_related("producto")
+        )
+        for v in variantes:
+            fila = cls.nuevo(
+                v.producto,
+                antes[v.pk],
+                v.precio,
+                origen=origen,
+                variante=v,
+            )
+            if fila is not None:
+                filas.append(fila)
+        return filas
+
+    @classmethod
+    def precio_en(cls, producto, momento):
+        """
+        Precio de venta del producto vigente en `momento`.
+        Usa el índice (producto, creado_en): a lo sumo dos lecturas puntuales.
+        """
+        qs = cls.objects.filter(producto=producto, variante__isnull=True)
+
+        ultimo = qs.filter(creado_en__lte=momento).order_by("-creado_en", "-id").first()
+        if ultimo is not None:
+            return ultimo.precio_nuevo
+
+        siguiente = qs.filter(creado_en__gt=momento).order_by("creado_en", "id").first()
+        if siguiente is not None:
+            return siguiente.precio_anterior
+
+        return producto.precio
+
+
+class StockInsuficiente(Exception):
+    """
+    No alcanzó el stock para un descuento (el UPDATE condicional no tocó la fila).
+    """
+
+    def __init__(self, disponible):
+        self.disponible = disponible
+        super().__init__(f"No hay stock suficiente. Stock actual: {disponible}.")
+
+
+class StockMovimiento(models.Model):
+    """
+    Libro de movimientos de stock (solo se agregan filas).
+    El stock de ProductoPrecio / ProductoVariante sigue siendo el saldo que se lee
+    en la tienda; cada cambio se hace con un UPDATE atómico en la misma transacción
+    que deja acá la fila, así el saldo y el libro no se separan.
+
+    - Si `variante` es NULL, el movimiento es del stock propio del producto.
+    - cantidad: delta (negativo = sale mercadería).
+    - saldo: stock que quedó después del movimiento.
+    - ref_model / ref_id: qué lo originó (VentaRapida, FacturaProveedor, Pedido...).
+    """
+
+    class Motivo(models.TextChoices):
+        INICIAL = "inicial", "Saldo inicial"
+        VENTA = "venta", "Venta en local"
+        VENTA_ANULADA = "venta_anulada", "Venta anulada"
+        COMPRA = "compra", "Factura de proveedor"
+        PEDIDO = "pedido", "Pedido web pagado"
+        AJUSTE = "ajuste", "Ajuste manual"
+
+    producto = models.ForeignKey(
+        ProductoPrecio,
+        on_delete=models.CASCADE,
+        related_name="movimientos_stock",
+    )
+    variante = models.ForeignKey(
+        ProductoVariante,
+        on_delete=models.CASCADE,
+        related_name="movimientos_stock",
+        null=True,
+        blank=True,
+    )
+
+    cantidad = models.IntegerField()
+    saldo = models.IntegerField()
+    motivo = models.CharField(max_length=20, choices=Motivo.choices)
+
+    ref_model = models.CharField(max_length=100, blank=True, default="")
+    ref_id = models.CharField(max_length=50, blank=True, default="")
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movimientos_stock",
+    )
+    creado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-creado_en", "-id"]
+        indexes = [
+            models.Index(fields=["producto", "creado_en"]),
+            models.Index(fields=["variante", "creado_en"]),
+            models.Index(fields=["ref_model", "ref_id"]),
+        ]
+
+    def __str__(self):
+        signo = "+" if self.cantidad > 0 else ""
+        return f"{self.producto_id}: {signo}{self.cantidad} → {self.saldo} ({self.get_motivo_display()})"
+
+    @staticmethod
+    def _ref(obj):
+        if obj is None:
+            return "", ""
+        return obj._meta.label, str(obj.pk)
+
+    @staticmethod
+    def _usuario(usuario):
+        if usuario is not None and getattr(usuario, "is_authenticated", False):
+            return usuario
+        return None
+
+    @classmethod
+    def nuevo(cls, producto, cantidad, saldo, motivo, variante=None, ref=None, usuario=None):
+        """
+        Arma la fila SIN guardarla (para juntar varias y usar bulk_create).
+        Devuelve None si la cantidad es 0.
+        """
+        if not cantidad:
+            return None
+        ref_model, ref_id = cls._ref(ref)
+        return cls(
+            producto=producto,
+            variante=variante,
+            cantidad=cantidad,
+            saldo=saldo,
+            motivo=motivo,
+            ref_model=ref_model,
+            ref_id=ref_id,
+            usuario=cls._usuario(usuario),
+        )
+
+    @classmethod
+    def ajuste(cls, producto, antes, despues, motivo=Motivo.AJUSTE, variante=None, ref=None, usuario=None):
+        """
+        Fila (sin guardar) para un stock que se cargó a mano con un valor absoluto
+        (formularios del panel). None si no cambió.
+        """
+        return cls.nuevo(
+            producto,
+            (despues or 0) - (antes or 0),
+            despues or 0,
+            motivo,
+            variante=variante,
+            ref=ref,
+            usuario=usuario,
+        )
+
+    @classmethod
+    def registrar_varios(cls, filas):
+        """
+        Inserta de una sola vez las filas armadas con `nuevo()` / `ajuste()` (ignora los None).
+        """
+        filas = [f for f in filas if f is not None]
+        if not filas:
+            return []
+        return cls.objects.bulk_create(filas, batch_size=500)
+
+    @classmethod
+    def mover(cls, producto, cantidad, motivo, variante=None, ref=None, usuario=None, permitir_negativo=False):
+        """
+        Suma `cantidad` (negativa para descontar) al stock del producto o de la
+        variante con un UPDATE condicional y deja el movimiento.
+        Tiene que correr dentro de transaction.atomic().
+
+        Dos ventas simultáneas no se pisan: el "stock >= cantidad" lo evalúa la
+        base sobre la fila ya bloqueada, no Python sobre un valor leído antes.
+        Si no alcanza levanta StockInsuficiente y no toca nada.
+        """
+        objeto = variante if variante is not None else producto
+        qs = type(objeto).objects.filter(pk=objeto.pk)
+
+        condicional = qs
+        if cantidad < 0 and not permitir_negativo:
+            condicional = qs.filter(stock__gte=-cantidad)
+
+        if not condicional.update(stock=F("stock") + cantidad):
+            raise StockInsuficiente(qs.values_list("stock", flat=True).first() or 0)
+
+        objeto.stock = qs.values_list("stock", flat=True).get()
+
+        fila = cls.nuevo(producto, cantidad, objeto.stock, motivo, variante=variante, ref=ref, usuario=usuario)
+        if fila is not None:
+            fila.save()
+        return fila
+
+    @classmethod
+    def sumar_varios(cls, entradas, motivo, usuario=None):
+        """
+        Ingresos en bloque al stock propio de productos (ej. facturas de proveedor).
+        entradas: [(producto_id, cantidad, ref)]. Un UPDATE por producto con
+        F("stock") + total y una fila del libro por entrada (en orden).
+        """
+        totales = {}
+        for producto_id, cantidad, _ in entradas:
+            totales[producto_id] = totales.get(producto_id, 0) + cantidad
+
+        a_actualizar = []
+        for pk, total in totales.items():
+            obj = ProductoPrecio(pk=pk)
+            obj.stock = F("stock") + total
+            a_actualizar.append(obj)
+        ProductoPrecio.objects.bulk_update(a_actualizar, ["stock"], batch_size=500)
+
+        saldos = dict(
+            ProductoPrecio.objects.filter(pk__in=list(totales)).values_list("pk", "stock")
+        )
+        # Saldo de cada entrada: el final menos lo que entró después
+        pendiente = dict(totales)
+        filas = []
+        for producto_id, cantidad, ref in entradas:
+            pendiente[producto_id] -= cantidad
+            filas.append(cls.nuevo(
+                ProductoPrecio(pk=producto_id),
+                cantidad,
+                saldos[producto_id] - pendiente[producto_id],
+                motivo,
+                ref=ref,
+                usuario=usuario,
+            ))
+        return cls.registrar_varios(filas)
+
+    @staticmethod
+    def stocks_de_variantes(productos_ids):
+        """
+        {variante_id: stock} de las variantes de esos productos.
+        Se toma antes de guardar un formset para después comparar.
+        """
+        return dict(
+            ProductoVariante.objects
+            .filter(producto_id__in=productos_ids)
+            .values_list("pk", "stock")
+        )
+
+    @classmethod
+    def ajustes_de_variantes(cls, antes, productos_ids, usuario=None):
+        """
+        Compara `antes` (ver stocks_de_variantes) contra lo que quedó en la base
+        y devuelve las filas (sin guardar) de las variantes cuyo stock cambió.
+        Las variantes nuevas cuentan desde 0.
+        """
+        filas = []
+        variantes = ProductoVariante.objects.filter(producto_id__in=productos_ids).select_related("producto")
+        for v in variantes:
+            filas.append(cls.ajuste(v.producto, antes.get(v.pk, 0), v.stock, variante=v, usuario=usuario))
+        return [f for f in filas if f is not None]
+
+    @classmethod
+    def diferencias(cls):
+        """
+        (productos, variantes) cuyo stock no coincide con la suma del libro.
+        Cada objeto trae `stock_libro` anotado. Usa los índices por producto/variante.
+        """
+        suma_producto = (
+            cls.objects
+            .filter(producto=OuterRef("pk"), variante__isnull=True)
+            .values("producto")
+            .annotate(total=Sum("cantidad"))
+            .values("total")
+        )
+        suma_variante = (
+            cls.objects
+            .filter(variante=OuterRef("pk"))
+            .values("variante")
+            .annotate(total=Sum("cantidad"))
+            .values("total")
+        )
+        productos = (
+            ProductoPrecio.objects
+            .annotate(stock_libro=Coalesce(Subquery(suma_producto), 0))
+            .exclude(stock=F("stock_libro"))
+        )
+        variantes = (
+            ProductoVariante.objects
+            .select_related("producto")
+            .annotate(stock_libro=Coalesce(Subquery(suma_variante), 0))
+            .exclude(stock=F("stock_libro"))
+        )
+        return productos, variantes
+
+
+class ImportBatch(models.Model):
+    """
+    Importación en curso (lista de precios PDF o factura de proveedor).
+    Las filas parseadas, los matches y las decisiones viven en ImportRow;
+    en la sesión solo queda el id del batch.
+    """
+
+    class Tipo(models.TextChoices):
+        LISTA = "lista", "Lista de precios"
+        FACTURA = "factura", "Factura de proveedor"
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", "Pendiente de confirmar"
+        CONFIRMADO = "confirmado", "Confirmado"
+        DESCARTADO = "descartado", "Descartado"
+
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    estado = models.CharField(max_length=12, choices=Estado.choices, default=Estado.PENDIENTE)
+
+    lista_pdf = models.ForeignKey(
+        ListaPrecioPDF,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_batches",
+    )
+    factura_proveedor = models.ForeignKey(
+        FacturaProveedor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_batches",
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_batches",
+    )
+
+    update_only = models.BooleanField(default=False)
+    parse_errors = models.JSONField(default=list, blank=True)
+    total_filas = models.PositiveIntegerField(default=0)
+
+    # Modo "solo cambios": lista contra la que se comparó y cuántas filas quedaron afuera
+    lista_anterior = models.ForeignKey(
+        ListaPrecioPDF,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    filas_sin_cambios = models.PositiveIntegerField(default=0)
+
+    # Factura: cómo le fue a cada estrategia de extracción (ver utils_estrategias_factura)
+    estrategias = models.JSONField(default=list, blank=True)
+
+    creado_en = models.DateTimeField(default=timezone.now)
+    confirmado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-creado_en", "-id"]
+
+    def __str__(self):
+        return f"Import {self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+
+class ImportRow(models.Model):
+    """
+    Una fila parseada de un ImportBatch, con sus coincidencias y la decisión del owner.
+    - accion (lista): "apply" / "ignore" / "merge:<id>" ("desactivar" en filas quitadas)
+    - sugerencias (factura): top de sugerencias_para(), tal cual se muestran
+    - cambio (modo "solo cambios"): qué pasó respecto de la lista anterior
+    """
+
+    class Cambio(models.TextChoices):
+        NUEVO = "nuevo", "Nuevo en la lista"
+        PRECIO = "precio", "Cambió el precio"
+        QUITADO = "quitado", "Ya no está en la lista"
+
+    batch = models.ForeignKey(ImportBatch, on_delete=models.CASCADE, related_name="filas")
+    orden = models.PositiveIntegerField()
+
+    nombre = models.CharField(max_length=255)
+    precio = models.DecimalField(max_digits=14, decimal_places=2)
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    moneda = models.CharField(max_length=3, default="ARS")
+    pagina = models.PositiveIntegerField(null=True, blank=True)
+    dup_en_pdf = models.BooleanField(default=False)
+
+    exacto = models.ForeignKey(
+        ProductoPrecio,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    sugerido = models.ForeignKey(
+        ProductoPrecio,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    sugerencia_score = models.PositiveSmallIntegerField(default=0)
+    sugerencias = models.JSONField(default=list, blank=True)
+
+    cambio = models.CharField(max_length=10, choices=Cambio.choices, blank=True, default="")
+    precio_anterior = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+
+    accion = models.CharField(max_length=40, blank=True, default="")
+
+    class Meta:
+        ordering = ["batch", "orden"]
+        unique_together = ("batch", "orden")
+
+    def __str__(self):
+        return f"{self.batch_id}#{self.orden} {self.nombre}"
+
+
+class TrabajoOCR(models.Model):
+    """
+    OCR de una factura escaneada (PDF sin capa de texto), corrido fuera del request
+    por pdf.utils_ocr.iniciar_trabajo_ocr. El texto queda guardado con el sha256
+    del archivo: la misma imagen subida de nuevo no se vuelve a procesar.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", "Pendiente"
+        PROCESANDO = "procesando", "Procesando"
+        LISTO = "listo", "Listo"
+        ERROR = "error", "Error"
+
+    factura = models.ForeignKey(
+        FacturaProveedor,
+        on_delete=models.CASCADE,
+        related_name="trabajos_ocr",
+    )
+    sha256 = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=12, choices=Estado.choices, default=Estado.PENDIENTE)
+
+    paginas = models.PositiveIntegerField(default=0)
+    paginas_listas = models.PositiveIntegerField(default=0)
+    texto = models.TextField(blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    creado_en = models.DateTimeField(default=timezone.now)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-creado_en", "-id"]
+
+    def __str__(self):
+        return f"OCR factura {self.factura_id} ({self.estado})"
+
+    @property
+    def terminado(self):
+        return self.estado in (self.Estado.LISTO, self.Estado.ERROR)
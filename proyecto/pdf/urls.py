@@ -15,6 +15,8 @@ urlpatterns = [
 
     # Procesamiento de Facturas (OCR)
     path('facturas/procesar/', views.procesar_factura, name='procesar_factura'),
+    path('facturas/ocr/<int:pk>/estado/', views.factura_ocr_estado, name='factura_ocr_estado'),
+    path('facturas/lote/', views.procesar_facturas_lote, name='procesar_facturas_lote'),
     
     # 🌟 NUEVA RUTA PARA VERIFICACIÓN DINÁMICA 🌟
     # Esta es la ruta que usa el fetch en tu template
@@ -25,6 +27,8 @@ urlpatterns = [
     path("lista-precios/", views.lista_precios_opciones, name="lista_precios_opciones"),
 
     path("factura/", views.factura_crear, name="factura_crear"),
+    path("factura/<int:pk>/pdf/", views.factura_descargar, name="factura_descargar"),
+    path("factura/lote/", views.facturas_lote, name="facturas_lote"),
     path("api/productos/", views.api_productos, name="api_productos"),
      path("api/catalogo/suggest/", views.catalogo_suggest, name="catalogo_api_suggest"),
      path("owner/productos/completar-desde-pdf/",views.owner_productos_completar_desde_pdf,name="owner_productos_completar_desde_pdf",),
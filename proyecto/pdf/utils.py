@@ -1,10 +1,30 @@
+import hashlib
+import os
 import pdfplumber
 import re
 from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
-from PyPDF2 import PdfReader
+from .utils_texto_pdf import contar_paginas, iterar_paginas
 import difflib
 
+# Subir este número cuando cambie lo que devuelve extraer_precios_de_pdf:
+# invalida los parse guardados en ListaPrecioPDF.parse_cache
+PARSER_LISTA_VERSION = 1
+
+
+def sha256_de_archivo(archivo) -> str:
+    """
+    SHA-256 de un archivo subido (UploadedFile), leyendo por chunks.
+    Deja el puntero al principio para poder guardarlo después.
+    """
+    h = hashlib.sha256()
+    for chunk in archivo.chunks():
+        h.update(chunk)
+    archivo.seek(0)
+    return h.hexdigest()
+
+
 def get_similarity(a: str, b: str) -> int:
     """
     Devuelve un porcentaje de similitud (0-100) entre dos strings.
@@ -17,195 +37,265 @@ def get_similarity(a: str, b: str) -> int:
 
 
 
+# ============================================================
+# Parser de listas de precios (por página)
+# ============================================================
 
-def extraer_precios_de_pdf(pdf_path: str):
-    """
-    Lee un PDF de lista de precios y devuelve:
-        productos: [
-            {
-                "nombre": str,
-                "precio": Decimal,
-                "moneda": "ARS" | "USD",
-                "page": int,
-            },
-            ...
-        ]
+# Palabras/fragmentos típicos de encabezado que NO son productos
+_HEADER_KEYWORDS = (
+    "GENES IS INSUMOS",
+    "VIGENCIA",
+    "Precios sujeto",
+    "Las fotos son",
+    "Forma de pago",
+    "Transferencia",
+    "Tarjeta",
+    "pág.",
+)
 
-        parse_errors: [str, ...]
+# Las heurísticas de abajo (cortes de línea, "GENES IS INSUMOS", etc.) están
+# ajustadas a cómo PyPDF2 arma las líneas: otros backends dan otro resultado.
+BACKEND_LISTAS = "pypdf2"
 
-    Pensado para listas tipo Génesis:
-    - Nombre y descripción del producto en 1 o más líneas
-    - Precio en una línea aparte con '$'
-    """
+# Con menos páginas que esto no vale la pena levantar procesos
+MIN_PAGINAS_POOL = 24
 
-    productos = []
-    parse_errors = []
+# Páginas que procesa cada tarea del pool (cada tarea abre el PDF una vez)
+PAGINAS_POR_TAREA = 16
 
-    try:
-        reader = PdfReader(pdf_path)
-    except Exception as e:
-        return [], [f"Error al abrir PDF: {e}"]
-
-    # Palabras/fragmentos típicos de encabezado que NO son productos
-    header_keywords = (
-        "GENES IS INSUMOS",
-        "VIGENCIA",
-        "Precios sujeto",
-        "Las fotos son",
-        "Forma de pago",
-        "Transferencia",
-        "Tarjeta",
-        "pág.",
-    )
-
-    def is_header(line: str) -> bool:
-        """
-        Devuelve True si la línea parece un encabezado/sección
-        y no parte de un producto.
-        """
-        s = line.strip()
-        if not s:
-            return False
-
-        lower = s.lower()
-        for k in header_keywords:
-            if k.lower() in lower:
-                return True
-
-        # Líneas TODO MAYÚSCULAS sin números tipo "CARTON", "CERAMICA", "NAVIDAD!!!!"
-        letters_only = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑ ]", "", s)
-        if letters_only and letters_only == letters_only.upper() and not any(ch.isdigit() for ch in s):
-            return True
 
+def _is_header(line: str) -> bool:
+    """
+    Devuelve True si la línea parece un encabezado/sección
+    y no parte de un producto.
+    """
+    s = line.strip()
+    if not s:
         return False
 
-    def normalize_spaces(s: str) -> str:
-        return re.sub(r"\s+", " ", s).strip()
-
-    def parse_price(line: str):
-        """
-        Recibe una línea que contiene '$' y devuelve:
-            (Decimal(precio), moneda_str)
-        Soporta formatos como:
-            "$460 0" -> 4600
-            "$5.642" -> 5642
-            "$12,50" -> 12.50
-        """
-        currency = "ARS"
-        if re.search(r"u\$d|usd|d[óo]lar", line, re.IGNORECASE):
-            currency = "USD"
-
-        # Sólo dejamos dígitos, coma y punto
-        num = re.sub(r"[^\d,\.]", "", line)
-        num = num.replace(" ", "")  # "460 0" -> "4600"
-
-        if not num:
-            raise ValueError("sin números")
-
-        # Si hay coma y punto: puntos como miles, coma como decimal
-        if "," in num and "." in num:
-            num = num.replace(".", "")
-            num = num.replace(",", ".")
-        elif "," in num:
-            # Sólo coma -> decimal
-            num = num.replace(",", ".")
-        else:
-            # Sólo punto: puede ser miles o decimal
-            if "." in num:
-                parts = num.split(".")
-                # Patrón típico de miles: 1-3 dígitos + grupos de 3
-                if len(parts) > 1 and all(len(p) == 3 for p in parts[1:]):
-                    # 5.642 -> 5642
-                    num = "".join(parts)
-                else:
-                    # Último grupo como decimales si es 1 o 2 dígitos
-                    if len(parts[-1]) in (1, 2):
-                        num = (''.join(parts[:-1]) or '0') + "." + parts[-1]
-                    else:
-                        # Ambiguo -> asumimos miles
-                        num = "".join(parts)
+    lower = s.lower()
+    for k in _HEADER_KEYWORDS:
+        if k.lower() in lower:
+            return True
 
-        return Decimal(num), currency
+    # Líneas TODO MAYÚSCULAS sin números tipo "CARTON", "CERAMICA", "NAVIDAD!!!!"
+    letters_only = re.sub(r"[^A-Za-zÁÉÍÓÚÜÑ ]", "", s)
+    if letters_only and letters_only == letters_only.upper() and not any(ch.isdigit() for ch in s):
+        return True
 
-    # Recorremos todas las páginas
-    for page_index, page in enumerate(reader.pages):
-        raw_text = page.extract_text() or ""
-        lines = raw_text.splitlines()
+    return False
 
-        current_lines = []  # acumulamos líneas del producto actual
 
-        for line_index, line in enumerate(lines):
-            # Si la línea tiene precio
-            if "$" in line:
-                nombre = normalize_spaces(" ".join(current_lines))
+def _normalize_spaces(s: str) -> str:
+    return re.sub(r"\s+", " ", s).strip()
 
-                if not nombre:
-                    parse_errors.append(
-                        f"pág {page_index+1}, línea {line_index+1}: "
-                        f"precio sin nombre. Línea precio: {line!r}"
-                    )
-                    current_lines = []
-                    continue
 
-                try:
-                    precio, moneda = parse_price(line)
-                except Exception as e:
-                    parse_errors.append(
-                        f"pág {page_index+1}, prod '{nombre}': "
-                        f"no pude parsear precio en '{line}': {e}"
-                    )
+def _parse_price(line: str):
+    """
+    Recibe una línea que contiene '$' y devuelve:
+        (Decimal(precio), moneda_str)
+    Soporta formatos como:
+        "$460 0" -> 4600
+        "$5.642" -> 5642
+        "$12,50" -> 12.50
+    """
+    currency = "ARS"
+    if re.search(r"u\$d|usd|d[óo]lar", line, re.IGNORECASE):
+        currency = "USD"
+
+    # Sólo dejamos dígitos, coma y punto
+    num = re.sub(r"[^\d,\.]", "", line)
+    num = num.replace(" ", "")  # "460 0" -> "4600"
+
+    if not num:
+        raise ValueError("sin números")
+
+    # Si hay coma y punto: puntos como miles, coma como decimal
+    if "," in num and "." in num:
+        num = num.replace(".", "")
+        num = num.replace(",", ".")
+    elif "," in num:
+        # Sólo coma -> decimal
+        num = num.replace(",", ".")
+    else:
+        # Sólo punto: puede ser miles o decimal
+        if "." in num:
+            parts = num.split(".")
+            # Patrón típico de miles: 1-3 dígitos + grupos de 3
+            if len(parts) > 1 and all(len(p) == 3 for p in parts[1:]):
+                # 5.642 -> 5642
+                num = "".join(parts)
+            else:
+                # Último grupo como decimales si es 1 o 2 dígitos
+                if len(parts[-1]) in (1, 2):
+                    num = (''.join(parts[:-1]) or '0') + "." + parts[-1]
                 else:
-                    productos.append({
-                        "nombre": nombre,
-                        "precio": precio,
-                        "moneda": moneda,
-                        "page": page_index + 1,
-                    })
-
-                # Reseteamos bloque para el siguiente producto
+                    # Ambiguo -> asumimos miles
+                    num = "".join(parts)
+
+    return Decimal(num), currency
+
+
+def _parsear_pagina(page_index: int, raw_text: str):
+    """
+    Parsea el texto de UNA página. Los bloques no cruzan páginas
+    (lo que queda sin precio al final se descarta), así que cada página
+    se puede procesar por separado y en cualquier proceso.
+
+    Devuelve (productos, parse_errors) de esa página.
+    """
+    productos = []
+    parse_errors = []
+
+    current_lines = []  # acumulamos líneas del producto actual
+
+    for line_index, line in enumerate(raw_text.splitlines()):
+        # Si la línea tiene precio
+        if "$" in line:
+            nombre = _normalize_spaces(" ".join(current_lines))
+
+            if not nombre:
+                parse_errors.append(
+                    f"pág {page_index+1}, línea {line_index+1}: "
+                    f"precio sin nombre. Línea precio: {line!r}"
+                )
                 current_lines = []
+                continue
+
+            try:
+                precio, moneda = _parse_price(line)
+            except Exception as e:
+                parse_errors.append(
+                    f"pág {page_index+1}, prod '{nombre}': "
+                    f"no pude parsear precio en '{line}': {e}"
+                )
             else:
-                # Línea sin precio
-                if is_header(line):
-                    # Si veníamos acumulando algo y nos cruzamos un encabezado,
-                    # lo descartamos porque nunca encontró su precio.
-                    if current_lines:
-                        parse_errors.append(
-                            f"pág {page_index+1}: descartado bloque sin precio: "
-                            f"{normalize_spaces(' '.join(current_lines[-3:]))}"
-                        )
-                        current_lines = []
-                    continue
-
-                stripped = line.strip()
-                if not stripped:
-                    # Líneas vacías no cortan el bloque, sólo las ignoramos.
-                    continue
-
-                current_lines.append(stripped)
-
-        # Si queda algo al final de la página sin precio, lo descartamos
-        if current_lines:
-            parse_errors.append(
-                f"pág {page_index+1}: bloque al final sin precio: "
-                f"{normalize_spaces(' '.join(current_lines[-3:]))}"
-            )
+                productos.append({
+                    "nombre": nombre,
+                    "precio": precio,
+                    "moneda": moneda,
+                    "page": page_index + 1,
+                })
+
+            # Reseteamos bloque para el siguiente producto
             current_lines = []
+        else:
+            # Línea sin precio
+            if _is_header(line):
+                # Si veníamos acumulando algo y nos cruzamos un encabezado,
+                # lo descartamos porque nunca encontró su precio.
+                if current_lines:
+                    parse_errors.append(
+                        f"pág {page_index+1}: descartado bloque sin precio: "
+                        f"{_normalize_spaces(' '.join(current_lines[-3:]))}"
+                    )
+                    current_lines = []
+                continue
+
+            stripped = line.strip()
+            if not stripped:
+                # Líneas vacías no cortan el bloque, sólo las ignoramos.
+                continue
+
+            current_lines.append(stripped)
+
+    # Si queda algo al final de la página sin precio, lo descartamos
+    if current_lines:
+        parse_errors.append(
+            f"pág {page_index+1}: bloque al final sin precio: "
+            f"{_normalize_spaces(' '.join(current_lines[-3:]))}"
+        )
+
+    return productos, parse_errors
+
+
+def _parsear_rango(args):
+    """
+    Tarea del pool: abre el PDF y parsea las páginas [desde, hasta).
+    Devuelve [(page_index, productos, parse_errors), ...] en orden.
+    """
+    pdf_path, desde, hasta = args
+    return [
+        (pagina["numero"] - 1, *_parsear_pagina(pagina["numero"] - 1, pagina["texto"]))
+        for pagina in iterar_paginas(pdf_path, BACKEND_LISTAS, desde=desde, hasta=hasta)
+    ]
+
+
+def _paginas_en_pool(pdf_path, total_paginas, workers):
+    """
+    Reparte las páginas en rangos entre procesos. executor.map devuelve
+    los rangos en orden, así el resultado es el mismo que en secuencial.
+    Si no se puede levantar el pool devuelve None.
+    """
+    rangos = [
+        (pdf_path, desde, min(desde + PAGINAS_POR_TAREA, total_paginas))
+        for desde in range(0, total_paginas, PAGINAS_POR_TAREA)
+    ]
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError):
+        return None
+
+    def _iterar():
+        with executor:
+            for resultado in executor.map(_parsear_rango, rangos):
+                yield from resultado
+
+    return _iterar()
+
+
+def iterar_precios_de_pdf(pdf_path: str, max_workers=None):
+    """
+    Versión generadora de extraer_precios_de_pdf: va devolviendo, página
+    por página y en orden, tuplas
+
+        (pagina, productos, parse_errors)
+
+    Los productos ya vienen sin duplicados respecto de las páginas
+    anteriores (mismo nombre + precio + moneda: gana la primera aparición),
+    y el descarte queda anotado en parse_errors de la página donde aparece.
+
+    - max_workers=1 (o una sola CPU): todo en este proceso, una página
+      en memoria a la vez.
+    - si no, con MIN_PAGINAS_POOL páginas o más se reparte en procesos.
+    """
+    try:
+        total_paginas = contar_paginas(pdf_path, BACKEND_LISTAS)
+    except Exception as e:
+        yield 0, [], [f"Error al abrir PDF: {e}"]
+        return
+
+    workers = max_workers or min(4, os.cpu_count() or 1)
+    paginas = None
+    if workers > 1 and total_paginas >= MIN_PAGINAS_POOL:
+        paginas = _paginas_en_pool(pdf_path, total_paginas, workers)
+
+    if paginas is None:
+        paginas = (
+            (pagina["numero"] - 1, *_parsear_pagina(pagina["numero"] - 1, pagina["texto"]))
+            for pagina in iterar_paginas(pdf_path, BACKEND_LISTAS)
+        )
 
     # Eliminamos duplicados (mismo nombre + precio + moneda)
-    unique = {}
-    for item in productos:
-        key = (item["nombre"], item["precio"], item.get("moneda", "ARS"))
-        if key in unique:
-            parse_errors.append(
-                f"Duplicado descartado: '{item['nombre']}' $ {item['precio']} "
-                f"(pág. {item['page']}) duplicado de pág. {unique[key]['page']}"
-            )
-        else:
-            unique[key] = item
+    vistos = {}
+    for page_index, productos_pagina, errores_pagina in paginas:
+        productos = []
+        parse_errors = list(errores_pagina)
+        for item in productos_pagina:
+            key = (item["nombre"], item["precio"], item.get("moneda", "ARS"))
+            if key in vistos:
+                parse_errors.append(
+                    f"Duplicado descartado: '{item['nombre']}' $ {item['precio']} "
+                    f"(pág. {item['page']}) duplicado de pág. {vistos[key]}"
+                )
+            else:
+                vistos[key] = item["page"]
+                productos.append(item)
+
+        yield page_index + 1, productos, parse_errors
+
 
-    productos_unicos = list(unique.values())
-    return productos_unicos, parse_errors
+def extraer_precios_de_pdf(pdf_path: str, max_workers=None):
     """
     Lee un PDF de lista de precios y devuelve:
         productos: [
@@ -223,24 +313,14 @@ def extraer_precios_de_pdf(pdf_path: str):
     Pensado para listas tipo Génesis:
     - Nombre y descripción del producto en 1 o más líneas
     - Precio en una línea aparte con '$'
-    """
 
+    Junta lo que va devolviendo iterar_precios_de_pdf.
+    """
     productos = []
     parse_errors = []
 
-    try:
-        reader = PdfReader(pdf_path)
-    except Exception as e:
-        return [], [f"Error al abrir PDF: {e}"]
-
-    # Palabras/fragmentos típicos de encabezado que NO son productos
-    header_keywords = (
-        "GENES IS INSUMOS",
-        "VIGENCIA",
-        "Precios sujeto",
-        "Las fotos son",
-        "Forma de pago",
-        "Transferencia",
-        "Tarjeta",
-        "pág.",
-    )
\ No newline at end of file
+    for _pagina, productos_pagina, errores_pagina in iterar_precios_de_pdf(pdf_path, max_workers):
+        productos.extend(productos_pagina)
+        parse_errors.extend(errores_pagina)
+
+    return productos, parse_errors
@@ -0,0 +1,384 @@
+# pdf/utils_estrategias_factura.py
+"""
+Estrategias de extracción de ítems de facturas de proveedor, en carrera.
+
+Antes se probaban en fila (posición → texto plano, tablas → regex) y un PDF
+patológico podía dejar a pdfplumber.extract_tables() girando dentro del
+request. Acá lo que puede colgarse corre en procesos aparte, cada uno con un
+presupuesto de tiempo; el que se pasa se mata:
+
+- La lectura del documento (leer_documento_factura, una sola decodificación
+  por factura) corre en un proceso; posición, texto y regex parsean ese
+  documento ya leído en este proceso.
+- tablas necesita page.extract_tables() y corre en su propio proceso.
+
+Al llegar al plazo (o antes, si alguna ya cierra contra el total de la
+factura) se elige la de mejor puntaje.
+
+Para sumar una estrategia: una función de módulo registrada en
+ESTRATEGIAS_FACTURA, (documento, contexto) -> (texto, items) si usa el
+documento compartido, o (pdf_path, contexto) -> (texto, items) con
+"documento": False si tiene que leer el PDF por su cuenta. Los tiempos de
+cada corrida quedan en ImportBatch.estrategias (ver `manage.py
+tiempos_estrategias_factura`).
+"""
+import hashlib
+import multiprocessing
+import re
+import time
+from multiprocessing.connection import wait
+
+from django.conf import settings
+
+from .utils_facturas import (
+    _parse_decimal,
+    leer_documento_factura,
+    parse_invoice_documento,
+    parse_invoice_text,
+)
+from .utils_ocr import extraer_items_tabla, procesar_texto_completo
+from .utils_texto_pdf import iterar_paginas
+
+
+# ============================================================
+# Estrategias
+# ============================================================
+
+def _estrategia_posicion(documento, contexto):
+    return documento["texto"], parse_invoice_documento(documento)
+
+
+def _estrategia_texto(documento, contexto):
+    return documento["texto"], parse_invoice_text(documento["texto"])
+
+
+def _estrategia_regex(documento, contexto):
+    return documento["texto"], procesar_texto_completo(documento["texto"], contexto.get("nombres_productos"))
+
+
+def _estrategia_tablas(pdf_path, contexto):
+    # Sólo texto y tablas: las palabras las trae la lectura compartida
+    with open(pdf_path, "rb") as fh:
+        paginas = list(iterar_paginas(fh.read(), tablas=True))
+    documento = {"texto": "\n".join(p["texto"] for p in paginas), "paginas": paginas}
+    return documento["texto"], extraer_items_tabla(documento)
+
+
+# El orden desempata: a igual puntaje gana la que está antes.
+# presupuesto: segundos que se le dan a cada una (nunca más que el plazo total).
+# Las de documento comparten la lectura: se la espera lo que pida la más generosa.
+ESTRATEGIAS_FACTURA = {
+    "posicion": {"funcion": _estrategia_posicion, "presupuesto": 10, "documento": True},
+    "texto": {"funcion": _estrategia_texto, "presupuesto": 5, "documento": True},
+    "tablas": {"funcion": _estrategia_tablas, "presupuesto": 8, "documento": False},
+    "regex": {"funcion": _estrategia_regex, "presupuesto": 5, "documento": True},
+}
+
+# Plazo total para tener un resultado
+PLAZO_ESTRATEGIAS = getattr(settings, "FACTURA_ESTRATEGIAS_PLAZO", 12)
+
+# {"tablas": 3, ...} para ajustar presupuestos sin tocar código
+PRESUPUESTOS = getattr(settings, "FACTURA_ESTRATEGIAS_PRESUPUESTO", {})
+
+
+class Estado:
+    OK = "ok"
+    ERROR = "error"
+    TIEMPO_AGOTADO = "tiempo_agotado"
+    DESCARTADA = "descartada"  # no hizo falta esperarla
+
+
+# ============================================================
+# Puntaje
+# ============================================================
+
+_RE_TOTAL = re.compile(r"^\s*(?:sub\s*total|total)\b[^\d$]*\$?\s*([\d][\d.,]*)", re.IGNORECASE)
+
+
+def _totales_declarados(texto):
+    """
+    Montos de las líneas "Subtotal"/"Total" de la factura.
+    Con envío o descuentos el total no cierra contra los ítems; el subtotal sí.
+    """
+    totales = []
+    for linea in (texto or "").splitlines():
+        m = _RE_TOTAL.match(linea)
+        if m:
+            valor = _parse_decimal(m.group(1))
+            if valor > 0:
+                totales.append(valor)
+    return totales
+
+
+def puntuar_items(items, texto):
+    """
+    (puntaje, cierra_total).
+    Cuenta ítems distintos con cantidad y precio válidos (los mails de
+    pedido repiten el detalle), resta los inválidos y suma un bonus grande
+    si los ítems cierran contra un total declarado en el texto (tolerancia
+    1%), tomando el precio como unitario o como total de la línea.
+    """
+    validos = {}
+    invalidos = 0
+    for i in items:
+        cantidad = i.get("cantidad") or 0
+        precio = i.get("precio_unitario") or 0
+        if cantidad > 0 and precio > 0:
+            validos[(i.get("producto"), cantidad, precio)] = (cantidad, precio)
+        else:
+            invalidos += 1
+    if not validos:
+        return 0, False
+
+    sumas = (
+        sum(c * p for c, p in validos.values()),
+        sum(p for _, p in validos.values()),
+    )
+    cierra = any(
+        abs(suma - total) <= max(1, total / 100)
+        for total in set(_totales_declarados(texto))
+        for suma in sumas
+    )
+
+    puntaje = len(validos) - invalidos + (100 if cierra else 0)
+    return puntaje, cierra
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+# Clave del trabajo que lee el documento compartido
+_LECTURA = "lectura"
+
+
+def _proceso_trabajo(funcion, args, conexion):
+    # Corre en el proceso hijo: manda (estado, payload) por el pipe
+    inicio = time.perf_counter()
+    try:
+        conexion.send((Estado.OK, (funcion(*args), time.perf_counter() - inicio)))
+    except Exception as e:
+        conexion.send((Estado.ERROR, f"{type(e).__name__}: {e}"))
+    finally:
+        conexion.close()
+
+
+def _contexto(nombres, contexto):
+    contexto = dict(contexto or {})
+    if "regex" in nombres and "nombres_productos" not in contexto:
+        from .models import ProductoPrecio
+        contexto["nombres_productos"] = list(
+            ProductoPrecio.objects.values_list("nombre_publico", flat=True)
+        )
+    return contexto
+
+
+def _presupuesto(nombre, plazo):
+    presupuesto = PRESUPUESTOS.get(nombre, ESTRATEGIAS_FACTURA[nombre]["presupuesto"])
+    return min(presupuesto, plazo)
+
+
+def _en_procesos(trabajos, al_terminar):
+    """
+    Un proceso por trabajo ({clave: (funcion, args, presupuesto)}).
+    Devuelve False si no se pudieron levantar (y no corrió nada);
+    al_terminar(clave, estado, payload, segundos) se llama por cada uno,
+    con payload = (resultado, segundos) si terminó bien. Si devuelve True
+    los que quedan se cortan (DESCARTADA).
+    """
+    ctx = multiprocessing.get_context()
+    inicio = time.monotonic()
+
+    pendientes = {}
+    try:
+        for clave, (funcion, args, presupuesto) in trabajos.items():
+            recibir, enviar = ctx.Pipe(duplex=False)
+            proceso = ctx.Process(
+                target=_proceso_trabajo,
+                args=(funcion, args, enviar),
+                daemon=True,
+            )
+            proceso.start()
+            enviar.close()
+            pendientes[recibir] = (clave, proceso, inicio + presupuesto)
+    except (OSError, NotImplementedError):
+        for recibir, (_, proceso, _) in pendientes.items():
+            proceso.kill()
+            recibir.close()
+        return False
+
+    def _cerrar(recibir):
+        clave, proceso, _ = pendientes.pop(recibir)
+        proceso.kill()
+        proceso.join()
+        recibir.close()
+        return clave
+
+    try:
+        while pendientes:
+            ahora = time.monotonic()
+
+            for recibir in [r for r, (_, _, limite) in pendientes.items() if limite <= ahora]:
+                al_terminar(_cerrar(recibir), Estado.TIEMPO_AGOTADO, None, ahora - inicio)
+            if not pendientes:
+                break
+
+            proximo = min(limite for _, _, limite in pendientes.values())
+            for recibir in wait(list(pendientes), timeout=max(0, proximo - time.monotonic())):
+                if recibir not in pendientes:
+                    # Descartado por uno que terminó antes en esta misma vuelta
+                    continue
+                try:
+                    estado, payload = recibir.recv()
+                except EOFError:
+                    # El proceso murió sin mandar nada
+                    estado, payload = Estado.ERROR, "el proceso terminó sin resultado"
+                segundos = payload[1] if estado == Estado.OK else time.monotonic() - inicio
+                if al_terminar(_cerrar(recibir), estado, payload, segundos):
+                    # Ya hay un resultado que no se va a mejorar
+                    for resto in list(pendientes):
+                        al_terminar(_cerrar(resto), Estado.DESCARTADA, None, time.monotonic() - inicio)
+    finally:
+        for recibir in list(pendientes):
+            _cerrar(recibir)
+
+    return True
+
+
+def correr_estrategias_factura(pdf_path, estrategias=None, plazo=None, contexto=None, en_paralelo=True):
+    """
+    Corre las estrategias sobre el PDF y devuelve la mejor:
+
+        {
+            "sha256": str,
+            "ganadora": str | None,
+            "texto": str,
+            "items": [...],
+            "tiempos": [{"estrategia", "estado", "segundos", "items", "puntaje", "cierra_total"}],
+        }
+
+    - estrategias: nombres de ESTRATEGIAS_FACTURA (por defecto, todas)
+    - plazo: segundos totales (PLAZO_ESTRATEGIAS)
+    - El PDF se decodifica una vez para todas las de documento; si esa
+      lectura se pasa de tiempo o falla, todas ellas quedan así.
+    - Si alguna cierra contra el total declarado, no se espera al resto.
+    - Sin procesos (o en_paralelo=False) corre todo en fila, en orden, hasta
+      agotar el plazo; ahí el presupuesto no se puede cortar a mitad.
+
+    "texto" es el de la mejor estrategia que haya leído algo, para el
+    preview y para detectar PDFs escaneados. Los segundos de las de
+    documento incluyen la lectura.
+    """
+    nombres = [n for n in (estrategias or ESTRATEGIAS_FACTURA) if n in ESTRATEGIAS_FACTURA]
+    plazo = PLAZO_ESTRATEGIAS if plazo is None else plazo
+    contexto = _contexto(nombres, contexto)
+
+    de_documento = [n for n in nombres if ESTRATEGIAS_FACTURA[n]["documento"]]
+
+    with open(pdf_path, "rb") as fh:
+        sha = hashlib.sha256(fh.read()).hexdigest()
+
+    resultados = {}
+    tiempos = {}
+
+    def registrar(nombre, estado, payload, segundos):
+        registro = {
+            "estrategia": nombre,
+            "estado": estado,
+            "segundos": round(segundos, 3),
+            "items": 0,
+            "puntaje": 0,
+            "cierra_total": False,
+        }
+        if estado == Estado.OK:
+            texto, items = payload
+            texto, items = texto or "", items or []
+            puntaje, cierra = puntuar_items(items, texto)
+            registro.update(items=len(items), puntaje=puntaje, cierra_total=cierra)
+            resultados[nombre] = (puntaje, texto, items)
+        elif estado == Estado.ERROR:
+            registro["error"] = str(payload)[:200]
+        tiempos[nombre] = registro
+        return registro["cierra_total"]
+
+    def con_documento(documento, lectura):
+        # Las de documento, en orden, sobre la lectura ya hecha
+        for i, nombre in enumerate(de_documento):
+            inicio = time.perf_counter()
+            try:
+                payload = ESTRATEGIAS_FACTURA[nombre]["funcion"](documento, contexto)
+                estado = Estado.OK
+            except Exception as e:
+                payload, estado = f"{type(e).__name__}: {e}", Estado.ERROR
+            if registrar(nombre, estado, payload, lectura + time.perf_counter() - inicio):
+                for resto in de_documento[i + 1:]:
+                    registrar(resto, Estado.DESCARTADA, None, lectura)
+                return True
+        return False
+
+    def al_terminar(clave, estado, payload, segundos):
+        if clave != _LECTURA:
+            return registrar(clave, estado, payload[0] if estado == Estado.OK else payload, segundos)
+        if estado == Estado.OK:
+            return con_documento(*payload)
+        for nombre in de_documento:
+            registrar(nombre, estado, payload, segundos)
+        return False
+
+    # Primero la lectura compartida (lo barato), después las que leen por su cuenta
+    trabajos = {}
+    if de_documento:
+        trabajos[_LECTURA] = (
+            leer_documento_factura,
+            (pdf_path,),
+            max(_presupuesto(n, plazo) for n in de_documento),
+        )
+    for nombre in nombres:
+        if not ESTRATEGIAS_FACTURA[nombre]["documento"]:
+            trabajos[nombre] = (
+                ESTRATEGIAS_FACTURA[nombre]["funcion"],
+                (pdf_path, contexto),
+                _presupuesto(nombre, plazo),
+            )
+
+    corrio = en_paralelo and len(trabajos) > 1 and _en_procesos(trabajos, al_terminar)
+
+    if not corrio:
+        claves = list(trabajos)
+        inicio = time.monotonic()
+        for i, clave in enumerate(claves):
+            if time.monotonic() - inicio >= plazo:
+                al_terminar(clave, Estado.TIEMPO_AGOTADO, None, 0)
+                continue
+            funcion, args, _ = trabajos[clave]
+            comienzo = time.perf_counter()
+            try:
+                resultado = funcion(*args)
+                segundos = time.perf_counter() - comienzo
+                cierra = al_terminar(clave, Estado.OK, (resultado, segundos), segundos)
+            except Exception as e:
+                cierra = al_terminar(clave, Estado.ERROR, f"{type(e).__name__}: {e}", 0)
+            if cierra:
+                for resto in claves[i + 1:]:
+                    al_terminar(resto, Estado.DESCARTADA, None, 0)
+                break
+
+    ganadora = None
+    for nombre in nombres:
+        if nombre in resultados and resultados[nombre][0] > 0:
+            if ganadora is None or resultados[nombre][0] > resultados[ganadora][0]:
+                ganadora = nombre
+
+    texto = ""
+    if ganadora:
+        texto = resultados[ganadora][1]
+    else:
+        texto = next((resultados[n][1] for n in nombres if n in resultados and resultados[n][1].strip()), "")
+
+    return {
+        "sha256": sha,
+        "ganadora": ganadora,
+        "texto": texto,
+        "items": resultados[ganadora][2] if ganadora else [],
+        "tiempos": [tiempos[n] for n in nombres if n in tiempos],
+    }
@@ -0,0 +1,263 @@
+# pdf/utils_factura_pdf.py
+"""
+Render de la factura simple (PDF para cliente) sin tocar la base.
+
+Todo lo que se necesita viaja en un dict de datos planos (ver `datos_factura`
+en pdf/views.py), así la misma función sirve para:
+- la descarga puntual desde factura_crear
+- el lote por rango de fechas, repartido en un pool de procesos
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+    Image,
+)
+
+
+Q2 = Decimal("0.01")
+
+# Por debajo de esto no vale la pena levantar procesos
+MIN_FACTURAS_POOL = 4
+
+
+# ============================================================
+# Estilos (se arman una sola vez por proceso)
+# ============================================================
+
+@lru_cache(maxsize=1)
+def _estilos():
+    """
+    Hoja de estilos + TableStyles fijos de la factura.
+    getSampleStyleSheet() arma ~20 estilos nuevos en cada llamada;
+    acá se crea una vez y se reutiliza en todas las facturas del proceso.
+    """
+    return {
+        "sheet": getSampleStyleSheet(),
+        "header": TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("LINEBELOW", (0, 0), (-1, 0), 0.75, colors.lightgrey),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
+        ]),
+        "cliente": TableStyle([
+            ("BOX", (0, 0), (-1, -1), 0.6, colors.lightgrey),
+            ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
+            ("LEFTPADDING", (0, 0), (-1, -1), 10),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+            ("TOPPADDING", (0, 0), (-1, -1), 8),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+        ]),
+        "items": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+            ("TOPPADDING", (0, 0), (-1, -1), 6),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+        ]),
+        "resumen": TableStyle([
+            ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+            ("FONTNAME", (0, 1), (-1, 1), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 11),
+            ("TOPPADDING", (0, 0), (-1, -1), 4),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ]),
+    }
+
+
+def _rl_safe(text):
+    # Texto seguro en Paragraph (evitar problemas con <, >, &)
+    return (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# ============================================================
+# Render
+# ============================================================
+
+def render_factura_pdf(datos) -> bytes:
+    """
+    Devuelve los bytes del PDF de una factura.
+
+    datos:
+      - vendedor_*, cliente_*: strings
+      - validez_dias: int
+      - sena, total: Decimal
+      - fecha: string ya formateado ("dd/mm/aaaa hh:mm")
+      - logo_path: ruta al logo (puede no existir)
+      - items: [{nombre, descripcion, cantidad, precio, subtotal}]
+    """
+    estilos = _estilos()
+    styles = estilos["sheet"]
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=2.0 * cm,
+        rightMargin=2.0 * cm,
+        topMargin=1.8 * cm,
+        bottomMargin=1.8 * cm,
+    )
+
+    story = []
+
+    # Logo
+    logo_path = datos.get("logo_path") or ""
+
+    left = []
+    if logo_path and os.path.exists(logo_path):
+        left.append(Image(logo_path, width=2.8 * cm, height=2.8 * cm))
+    else:
+        left.append(Paragraph("<b>Mundo Personalizado</b>", styles["Title"]))
+
+    titulo = Paragraph(
+        "<para align='center'>"
+        "<b>FACTURA SIN VALOR FISCAL</b><br/>"
+        f"<font size=9>Fecha: {datos['fecha']}</font><br/>"
+        f"<font size=9>Validez: {int(datos.get('validez_dias') or 7)} días</font>"
+        "</para>",
+        styles["Normal"],
+    )
+
+    vendedor = Paragraph(
+        "<para align='right'>"
+        f"<b>{_rl_safe(datos['vendedor_nombre'])}</b><br/>"
+        f"WhatsApp: {_rl_safe(datos['vendedor_whatsapp'])}<br/>"
+        f"Horario: {_rl_safe(datos['vendedor_horario'])}<br/>"
+        f"{_rl_safe(datos['vendedor_direccion'])}"
+        "</para>",
+        styles["Normal"],
+    )
+
+    header = Table(
+        [[left, titulo, vendedor]],
+        colWidths=[3.2 * cm, 7.0 * cm, 6.0 * cm],
+    )
+    header.setStyle(estilos["header"])
+    story.append(header)
+    story.append(Spacer(1, 0.5 * cm))
+
+    # Cliente (cajita)
+    cliente = Table(
+        [[
+            Paragraph(
+                f"<b>Cliente</b><br/>"
+                f"Nombre: {_rl_safe(datos['cliente_nombre'])}<br/>"
+                f"Tel: {_rl_safe(datos.get('cliente_telefono') or '—')}<br/>"
+                f"DNI/CUIL: {_rl_safe(datos.get('cliente_doc') or '—')}<br/>"
+                f"Dirección: {_rl_safe(datos.get('cliente_direccion') or '—')}",
+                styles["Normal"],
+            )
+        ]],
+        colWidths=[16.2 * cm],
+    )
+    cliente.setStyle(estilos["cliente"])
+    story.append(cliente)
+    story.append(Spacer(1, 0.5 * cm))
+
+    # Items (nombre + descripción debajo)
+    table_data = [["Producto", "Cant.", "Unitario", "Subtotal"]]
+
+    for it in datos["items"]:
+        nombre_safe = _rl_safe(it["nombre"])
+        desc_safe = _rl_safe(it.get("descripcion") or "")
+
+        if desc_safe:
+            prod_text = (
+                f"<b>{nombre_safe}</b><br/>"
+                f"<font size='8' color='#777777'>{desc_safe}</font>"
+            )
+        else:
+            prod_text = f"<b>{nombre_safe}</b>"
+
+        table_data.append([
+            Paragraph(prod_text, styles["Normal"]),
+            str(it["cantidad"]),
+            f"$ {it['precio']:.2f}",
+            f"$ {it['subtotal']:.2f}",
+        ])
+
+    tabla = Table(
+        table_data,
+        colWidths=[9.5 * cm, 1.5 * cm, 2.6 * cm, 2.6 * cm],
+        repeatRows=1,
+    )
+    tabla.setStyle(estilos["items"])
+    story.append(tabla)
+    story.append(Spacer(1, 0.5 * cm))
+
+    total = Decimal(datos["total"]).quantize(Q2)
+    sena = Decimal(datos.get("sena") or "0").quantize(Q2)
+    saldo = (total - sena).quantize(Q2)
+
+    resumen = Table(
+        [
+            ["Seña:", f"$ {sena:.2f}"],
+            ["Total:", f"$ {total:.2f}"],
+            ["Falta abonar:", f"$ {saldo:.2f}"],
+        ],
+        colWidths=[12.0 * cm, 4.2 * cm],
+    )
+    resumen.setStyle(estilos["resumen"])
+    story.append(resumen)
+
+    story.append(Spacer(1, 0.4 * cm))
+    story.append(
+        Paragraph(
+            "<para align='center'><font size=8 color='#666666'>"
+            "Presupuesto / Factura sin valor fiscal. Validez 7 días salvo indicación contraria."
+            "</font></para>",
+            styles["Normal"],
+        )
+    )
+
+    doc.build(story)
+
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def _render_con_id(par):
+    # Para el pool: (factura_id, datos) -> (factura_id, bytes)
+    factura_id, datos = par
+    return factura_id, render_factura_pdf(datos)
+
+
+def render_facturas_en_lote(pares, max_workers=None):
+    """
+    Renderiza muchas facturas. `pares` es una lista de (factura_id, datos).
+    Va devolviendo (factura_id, bytes) en el mismo orden a medida que terminan,
+    para que el ZIP pueda empezar a salir antes de tener todo listo.
+
+    Con pocas facturas (o si no se puede levantar el pool) renderiza en el
+    mismo proceso.
+    """
+    if len(pares) < MIN_FACTURAS_POOL:
+        for par in pares:
+            yield _render_con_id(par)
+        return
+
+    workers = max_workers or min(4, os.cpu_count() or 1)
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError):
+        for par in pares:
+            yield _render_con_id(par)
+        return
+
+    with executor:
+        yield from executor.map(_render_con_id, pares, chunksize=4)
@@ -1,11 +1,11 @@
 # pdf/utils_facturas.py
 from decimal import Decimal
+import hashlib
 import re
 
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
+from django.core.cache import cache
+
+from .utils_texto_pdf import backends_disponibles, iterar_paginas
 
 
 # ============================================================
@@ -146,6 +146,82 @@ def _rows_gap(a, b):
     return abs((b["top"] or 0) - (a["top"] or 0))
 
 
+# ============================================================
+# Documento (una sola lectura del PDF por factura)
+# ============================================================
+
+# Cuánto queda en cache un documento ya leído (re-subidas, re-análisis, OCR)
+DOCUMENTO_CACHE_TIMEOUT = 60 * 60
+
+# De cada palabra de pdfplumber sólo guardamos lo que usan los parsers
+_CLAVES_PALABRA = ("text", "x0", "x1", "top", "bottom")
+
+
+def leer_documento_factura(pdf_path: str, tablas: bool = False) -> dict:
+    """
+    Decodifica el PDF UNA vez y arma el documento que consumen todas
+    las estrategias (posición, texto plano, tablas):
+
+        {
+            "sha256": str,
+            "texto": str,
+            "con_tablas": bool,
+            "paginas": [{"numero", "texto", "lineas", "palabras", ["tablas"]}],
+        }
+
+    Queda en cache por hash del archivo, así la misma factura subida de
+    nuevo no se vuelve a leer. tablas=True agrega page.extract_tables()
+    (es lo más caro; sólo lo pide utils_ocr).
+    Sin pdfplumber cae a PyPDF2: sólo texto, sin palabras.
+    """
+    with open(pdf_path, "rb") as fh:
+        contenido = fh.read()
+    sha = hashlib.sha256(contenido).hexdigest()
+
+    clave = f"factura_doc:{sha}"
+    documento = cache.get(clave)
+    if documento is not None and (documento["con_tablas"] or not tablas):
+        return documento
+
+    paginas = []
+    if "pdfplumber" in backends_disponibles():
+        for pagina in iterar_paginas(contenido, palabras=True, tablas=tablas):
+            pagina["palabras"] = [
+                {k: w[k] for k in _CLAVES_PALABRA} for w in pagina["palabras"]
+            ]
+            paginas.append(pagina)
+    else:
+        for pagina in iterar_paginas(contenido, "pypdf2"):
+            pagina["palabras"] = []
+            paginas.append(pagina)
+
+    documento = {
+        "sha256": sha,
+        "texto": "\n".join(p["texto"] for p in paginas),
+        "con_tablas": tablas,
+        "paginas": paginas,
+    }
+    cache.set(clave, documento, DOCUMENTO_CACHE_TIMEOUT)
+    return documento
+
+
+def analizar_factura_pdf(pdf_path: str):
+    """
+    Corre las estrategias sobre una sola lectura del PDF:
+    primero por posición y, si no encuentra nada, texto plano.
+    Devuelve (raw_text, items).
+    """
+    try:
+        documento = leer_documento_factura(pdf_path)
+    except Exception:
+        return "", []
+
+    items = parse_invoice_documento(documento)
+    if not items:
+        items = parse_invoice_text(documento["texto"])
+    return documento["texto"], items
+
+
 # ============================================================
 # Texto simple
 # ============================================================
@@ -154,22 +230,10 @@ def extraer_texto_factura_simple(pdf_path: str) -> str:
     """
     Extrae texto sin formato de un PDF de factura.
     """
-    if pdfplumber is None:
-        try:
-            from PyPDF2 import PdfReader
-            reader = PdfReader(pdf_path)
-            texto = []
-            for page in reader.pages:
-                texto.append(page.extract_text() or "")
-            return "\n".join(texto)
-        except Exception:
-            return ""
-
-    texto = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            texto.append(page.extract_text() or "")
-    return "\n".join(texto)
+    try:
+        return leer_documento_factura(pdf_path)["texto"]
+    except Exception:
+        return ""
 
 
 # ============================================================
@@ -177,6 +241,17 @@ def extraer_texto_factura_simple(pdf_path: str) -> str:
 # ============================================================
 
 def parse_invoice_pdf(pdf_path: str):
+    """
+    parse_invoice_documento leyendo el PDF (o tomándolo de la cache).
+    """
+    try:
+        documento = leer_documento_factura(pdf_path)
+    except Exception:
+        return []
+    return parse_invoice_documento(documento)
+
+
+def parse_invoice_documento(documento: dict):
     """
     Parser basado en posiciones del PDF.
     Soporta estos 3 casos del layout real:
@@ -196,120 +271,116 @@ def parse_invoice_pdf(pdf_path: str):
     """
     items = []
 
-    if pdfplumber is None:
-        return items
-
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                words = page.extract_words(use_text_flow=False, keep_blank_chars=False)
-                if not words:
+        for pagina in documento["paginas"]:
+            words = pagina["palabras"]
+            if not words:
+                continue
+
+            rows = _group_words_into_rows(words, tolerance=3)
+
+            # Filtrar encabezado / pie
+            filtered_rows = []
+            for row in rows:
+                txt = _row_text(row)
+                if _is_header_or_footer_row(txt):
                     continue
+                filtered_rows.append(row)
 
-                rows = _group_words_into_rows(words, tolerance=3)
+            n = len(filtered_rows)
+            if n == 0:
+                continue
 
-                # Filtrar encabezado / pie
-                filtered_rows = []
-                for row in rows:
-                    txt = _row_text(row)
-                    if _is_header_or_footer_row(txt):
-                        continue
-                    filtered_rows.append(row)
+            # Detectar filas ancla (cantidad + precio)
+            anchors = []
+            for idx, row in enumerate(filtered_rows):
+                desc, qty, price = _extract_row_parts(row)
+                if _is_anchor_row(qty, price):
+                    anchors.append(idx)
 
-                n = len(filtered_rows)
-                if n == 0:
-                    continue
+            if not anchors:
+                continue
+
+            for pos, anchor_idx in enumerate(anchors):
+                row = filtered_rows[anchor_idx]
+                desc_anchor, qty, price = _extract_row_parts(row)
 
-                # Detectar filas ancla (cantidad + precio)
-                anchors = []
-                for idx, row in enumerate(filtered_rows):
-                    desc, qty, price = _extract_row_parts(row)
-                    if _is_anchor_row(qty, price):
-                        anchors.append(idx)
+                cantidad = Decimal(qty.strip())
+                precio_unitario = _parse_decimal(price)
 
-                if not anchors:
+                if cantidad <= 0 or precio_unitario <= 0:
                     continue
 
-                for pos, anchor_idx in enumerate(anchors):
-                    row = filtered_rows[anchor_idx]
-                    desc_anchor, qty, price = _extract_row_parts(row)
-
-                    cantidad = Decimal(qty.strip())
-                    precio_unitario = _parse_decimal(price)
-
-                    if cantidad <= 0 or precio_unitario <= 0:
-                        continue
-
-                    # Límite superior: luego del ancla anterior
-                    prev_anchor = anchors[pos - 1] if pos > 0 else None
-                    # Límite inferior: antes del ancla siguiente
-                    next_anchor = anchors[pos + 1] if pos + 1 < len(anchors) else None
-
-                    partes = []
-
-                    # 1) filas anteriores cercanas
-                    k = anchor_idx - 1
-                    prev_buffer = []
-                    while k >= 0:
-                        if prev_anchor is not None and k <= prev_anchor:
-                            break
-
-                        pdesc, pqty, pprice = _extract_row_parts(filtered_rows[k])
-
-                        if _is_anchor_row(pqty, pprice):
-                            break
-                        if not pdesc:
-                            break
-
-                        # si el salto vertical es muy grande, ya no pertenece al item
-                        gap = _rows_gap(filtered_rows[k], filtered_rows[k + 1])
-                        if gap > 20:
-                            break
-
-                        prev_buffer.append(pdesc)
-                        k -= 1
-
-                    prev_buffer.reverse()
-                    partes.extend(prev_buffer)
-
-                    # 2) texto descriptivo en la misma fila ancla (columna izquierda)
-                    if desc_anchor:
-                        partes.append(desc_anchor)
-
-                    # 3) filas siguientes cercanas
-                    j = anchor_idx + 1
-                    last_row = row
-                    while j < n:
-                        if next_anchor is not None and j >= next_anchor:
-                            break
-
-                        ndesc, nqty, nprice = _extract_row_parts(filtered_rows[j])
-
-                        if _is_anchor_row(nqty, nprice):
-                            break
-                        if not ndesc:
-                            break
-
-                        gap = _rows_gap(last_row, filtered_rows[j])
-                        if gap > 20:
-                            break
-
-                        partes.append(ndesc)
-                        last_row = filtered_rows[j]
-                        j += 1
-
-                    producto = " ".join(partes)
-                    producto = re.sub(r"\s+", " ", producto).strip(" -|,.;")
-
-                    if producto:
-                        items.append({
-                            "producto": producto,
-                            "cantidad": cantidad,
-                            "precio_unitario": precio_unitario,
-                            "subtotal": cantidad * precio_unitario,
-                            "descuento": None,
-                            "moneda": "ARS",
-                        })
+                # Límite superior: luego del ancla anterior
+                prev_anchor = anchors[pos - 1] if pos > 0 else None
+                # Límite inferior: antes del ancla siguiente
+                next_anchor = anchors[pos + 1] if pos + 1 < len(anchors) else None
+
+                partes = []
+
+                # 1) filas anteriores cercanas
+                k = anchor_idx - 1
+                prev_buffer = []
+                while k >= 0:
+                    if prev_anchor is not None and k <= prev_anchor:
+                        break
+
+                    pdesc, pqty, pprice = _extract_row_parts(filtered_rows[k])
+
+                    if _is_anchor_row(pqty, pprice):
+                        break
+                    if not pdesc:
+                        break
+
+                    # si el salto vertical es muy grande, ya no pertenece al item
+                    gap = _rows_gap(filtered_rows[k], filtered_rows[k + 1])
+                    if gap > 20:
+                        break
+
+                    prev_buffer.append(pdesc)
+                    k -= 1
+
+                prev_buffer.reverse()
+                partes.extend(prev_buffer)
+
+                # 2) texto descriptivo en la misma fila ancla (columna izquierda)
+                if desc_anchor:
+                    partes.append(desc_anchor)
+
+                # 3) filas siguientes cercanas
+                j = anchor_idx + 1
+                last_row = row
+                while j < n:
+                    if next_anchor is not None and j >= next_anchor:
+                        break
+
+                    ndesc, nqty, nprice = _extract_row_parts(filtered_rows[j])
+
+                    if _is_anchor_row(nqty, nprice):
+                        break
+                    if not ndesc:
+                        break
+
+                    gap = _rows_gap(last_row, filtered_rows[j])
+                    if gap > 20:
+                        break
+
+                    partes.append(ndesc)
+                    last_row = filtered_rows[j]
+                    j += 1
+
+                producto = " ".join(partes)
+                producto = re.sub(r"\s+", " ", producto).strip(" -|,.;")
+
+                if producto:
+                    items.append({
+                        "producto": producto,
+                        "cantidad": cantidad,
+                        "precio_unitario": precio_unitario,
+                        "subtotal": cantidad * precio_unitario,
+                        "descuento": None,
+                        "moneda": "ARS",
+                    })
 
     except Exception:
         return []
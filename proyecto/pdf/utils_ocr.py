@@ -1,8 +1,40 @@
+import os
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from decimal import Decimal
-from datetime import datetime
-import pdfplumber
+from datetime import datetime, timedelta
 from difflib import get_close_matches
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .utils_facturas import leer_documento_factura
+from .utils_texto_pdf import contar_paginas
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    from pdf2image import convert_from_path
+except ImportError:
+    convert_from_path = None
 
 def parse_decimal(str_val):
     """Convierte strings de dinero ($1.200,50) a Decimal."""
@@ -57,16 +89,17 @@ def extraer_fecha(texto):
                             except: pass
     return None
 
-def extraer_items_tabla(pdf):
+def extraer_items_tabla(documento):
     """
     Estrategia 1: Usar la detección nativa de tablas de pdfplumber.
     Funciona bien para facturas con lineas dibujadas o columnas claras.
+    Recibe el documento de leer_documento_factura(..., tablas=True).
     """
     items = []
     try:
-        for page in pdf.pages:
-            # Intentamos extraer tablas
-            tables = page.extract_tables()
+        for pagina in documento["paginas"]:
+            # Tablas ya detectadas en la lectura del documento
+            tables = pagina.get("tablas") or []
             for table in tables:
                 for row in table:
                     # Limpiamos valores None
@@ -104,16 +137,18 @@ def extraer_items_tabla(pdf):
     except: pass
     return items
 
-def buscar_producto_db(descripcion_pdf):
+def buscar_producto_db(descripcion_pdf, nombres_productos=None):
     """
     Busca si la descripción del PDF coincide con algún producto en la DB.
     Retorna el nombre del producto en DB si hay coincidencia, sino None.
+    nombres_productos: si ya se tienen (o se corre fuera de la base), no se consulta.
     """
-    # Importación diferida para evitar ciclos
-    from .models import ProductoPrecio
-    
-    # Obtenemos todos los nombres de productos de la base de datos
-    nombres_productos = list(ProductoPrecio.objects.values_list('nombre_publico', flat=True))
+    if nombres_productos is None:
+        # Importación diferida para evitar ciclos
+        from .models import ProductoPrecio
+
+        # Obtenemos todos los nombres de productos de la base de datos
+        nombres_productos = list(ProductoPrecio.objects.values_list('nombre_publico', flat=True))
     
     # Usamos get_close_matches para encontrar la mejor coincidencia
     # cutoff=0.6 significa que debe haber al menos un 60% de similitud
@@ -123,11 +158,15 @@ def buscar_producto_db(descripcion_pdf):
         return coincidencias[0]
     return None
 
-def procesar_texto_completo(texto):
+def procesar_texto_completo(texto, nombres_productos=None):
     """
     Estrategia 2: Regex Multilínea sobre todo el texto + Búsqueda en DB.
+    Los nombres de productos se leen una sola vez para todas las líneas.
     """
     items = []
+    if nombres_productos is None:
+        from .models import ProductoPrecio
+        nombres_productos = list(ProductoPrecio.objects.values_list('nombre_publico', flat=True))
     
     # --- PATRÓN CSV MULTILÍNEA (Tu Factura) ---
     # Busca: "Cualquier texto", "Numero", "Precio"
@@ -147,7 +186,7 @@ def procesar_texto_completo(texto):
         precio = parse_decimal(precio_raw.replace('\n',''))
         
         # Intentar mejorar la descripción con la base de datos
-        nombre_db = buscar_producto_db(desc)
+        nombre_db = buscar_producto_db(desc, nombres_productos)
         producto_final = nombre_db if nombre_db else desc
 
         if cantidad > 0 and precio > 0:
@@ -178,7 +217,7 @@ def procesar_texto_completo(texto):
         if match_std:
             c, d, p = match_std.groups()
             # Verificamos si la descripción coincide con algún producto en DB
-            nombre_db = buscar_producto_db(d)
+            nombre_db = buscar_producto_db(d, nombres_productos)
             if nombre_db:
                 # Si coincide, confiamos plenamente en esta línea
                 item = (c, nombre_db, p)
@@ -190,7 +229,7 @@ def procesar_texto_completo(texto):
             match_t = pattern_ticket.search(line)
             if match_t:
                 c, p, d = match_t.groups()
-                nombre_db = buscar_producto_db(d)
+                nombre_db = buscar_producto_db(d, nombres_productos)
                 if nombre_db:
                     item = (c, nombre_db, p)
                 elif any(char.isalpha() for char in d):
@@ -216,24 +255,26 @@ def extraer_datos_factura(file_path):
     fecha = None
     
     try:
-        with pdfplumber.open(file_path) as pdf:
-            # 1. Intentar extracción de texto
-            for page in pdf.pages:
-                txt = page.extract_text()
-                if txt: texto_completo += txt + "\n"
-            
-            # 2. Intentar extracción de tablas (Mejor para estructuras limpias)
-            items_tabla = extraer_items_tabla(pdf)
-            if items_tabla:
-                items = items_tabla
-            
-            # 3. Si tablas falló o devolvió poco, usamos Regex Multilínea (Mejor para tu factura CSV)
-            if not items or len(items) == 0:
-                items = procesar_texto_completo(texto_completo)
+        # Una sola lectura del PDF (compartida/cacheada con utils_facturas)
+        documento = leer_documento_factura(file_path, tablas=True)
+
+        # 1. Texto
+        for pagina in documento["paginas"]:
+            txt = pagina["texto"]
+            if txt: texto_completo += txt + "\n"
+
+        # 2. Intentar extracción de tablas (Mejor para estructuras limpias)
+        items_tabla = extraer_items_tabla(documento)
+        if items_tabla:
+            items = items_tabla
+
+        # 3. Si tablas falló o devolvió poco, usamos Regex Multilínea (Mejor para tu factura CSV)
+        if not items or len(items) == 0:
+            items = procesar_texto_completo(texto_completo)
+
+        # 4. Extraer Fecha
+        fecha = extraer_fecha(texto_completo)
 
-            # 4. Extraer Fecha
-            fecha = extraer_fecha(texto_completo)
-            
         if not texto_completo.strip():
             return {'fecha': None, 'items': [], 'raw_text': "El PDF parece ser una imagen sin texto. Escanea con OCR."}
 
@@ -244,4 +285,180 @@ def extraer_datos_factura(file_path):
         'fecha': fecha,
         'items': items,
         'raw_text': texto_completo
-    }
\ No newline at end of file
+    }
+
+
+# ============================================================
+# OCR de facturas escaneadas (corre fuera del request)
+# ============================================================
+
+OCR_DPI = 300
+OCR_IDIOMA = getattr(settings, "OCR_IDIOMA", "spa")
+OCR_CONFIG = "--psm 6"
+OCR_MAX_WORKERS = 4
+
+# Un trabajo "procesando" más viejo que esto se da por muerto (reinicio, etc.)
+OCR_TRABAJO_VENCE = timedelta(minutes=15)
+
+
+@lru_cache(maxsize=1)
+def ocr_disponible():
+    """
+    True si están pytesseract + el binario de Tesseract + algo para rasterizar.
+    """
+    if pytesseract is None or (pdfium is None and convert_from_path is None):
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+def _rasterizar_pagina(pdf_path, index, dpi=OCR_DPI):
+    """Página -> imagen PIL. pypdfium2 no necesita poppler; pdf2image sí."""
+    if pdfium is not None:
+        doc = pdfium.PdfDocument(pdf_path)
+        try:
+            page = doc[index]
+            imagen = page.render(scale=dpi / 72).to_pil()
+            page.close()
+            return imagen
+        finally:
+            doc.close()
+    return convert_from_path(pdf_path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+
+
+def _preprocesar(imagen):
+    """Gris + quitar ruido + binarizado Otsu: Tesseract lee mucho mejor así."""
+    if cv2 is None:
+        return imagen.convert("L")
+    gris = cv2.cvtColor(np.array(imagen.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    gris = cv2.medianBlur(gris, 3)
+    _, binaria = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binaria
+
+
+def _ocr_pagina(args):
+    # Tarea del pool: cada proceso rasteriza y lee su propia página
+    pdf_path, index, idioma = args
+    imagen = _preprocesar(_rasterizar_pagina(pdf_path, index))
+    return index, pytesseract.image_to_string(imagen, lang=idioma, config=OCR_CONFIG)
+
+
+def ocr_pdf(pdf_path, al_avanzar=None, max_workers=None):
+    """
+    Texto OCR de cada página, en orden. Las páginas son independientes, así
+    que se reparten en un pool de procesos; con una sola página (o si no se
+    puede levantar el pool) se hace en este proceso.
+    al_avanzar(listas, total) se llama a medida que terminan las páginas.
+    """
+    total = contar_paginas(pdf_path)
+    tareas = [(pdf_path, index, OCR_IDIOMA) for index in range(total)]
+    workers = max_workers or min(OCR_MAX_WORKERS, os.cpu_count() or 1)
+
+    def _resultados():
+        executor = None
+        if total > 1 and workers > 1:
+            try:
+                executor = ProcessPoolExecutor(max_workers=min(workers, total))
+            except (OSError, NotImplementedError):
+                executor = None
+
+        if executor is None:
+            for tarea in tareas:
+                yield _ocr_pagina(tarea)
+            return
+
+        with executor:
+            futuros = [executor.submit(_ocr_pagina, tarea) for tarea in tareas]
+            for futuro in as_completed(futuros):
+                yield futuro.result()
+
+    textos = [""] * total
+    for listas, (index, texto) in enumerate(_resultados(), start=1):
+        textos[index] = texto
+        if al_avanzar:
+            al_avanzar(listas, total)
+    return textos
+
+
+def _correr_trabajo_ocr(trabajo_id):
+    """
+    Cuerpo del hilo: corre el OCR y deja el resultado (o el error) en el TrabajoOCR.
+    """
+    from .models import TrabajoOCR
+
+    trabajos = TrabajoOCR.objects.filter(pk=trabajo_id)
+    try:
+        trabajo = TrabajoOCR.objects.select_related("factura").get(pk=trabajo_id)
+        trabajos.update(estado=TrabajoOCR.Estado.PROCESANDO)
+
+        def _progreso(listas, total):
+            trabajos.update(paginas=total, paginas_listas=listas)
+
+        textos = ocr_pdf(trabajo.factura.archivo.path, _progreso)
+
+        trabajos.update(
+            estado=TrabajoOCR.Estado.LISTO,
+            texto="\n".join(textos),
+            paginas=len(textos),
+            paginas_listas=len(textos),
+            terminado_en=timezone.now(),
+        )
+    except Exception as e:
+        trabajos.update(
+            estado=TrabajoOCR.Estado.ERROR,
+            error=str(e)[:2000],
+            terminado_en=timezone.now(),
+        )
+    finally:
+        # El hilo abrió su propia conexión: cerrarla
+        connection.close()
+
+
+def iniciar_trabajo_ocr(factura, sha256):
+    """
+    Devuelve el TrabajoOCR para esta factura y, si hace falta, lo lanza en un hilo.
+    - Mismo archivo (sha256) ya leído: se copia el texto, sin volver a hacer OCR.
+    - Mismo archivo procesándose ahora: se devuelve ese trabajo.
+    """
+    from .models import TrabajoOCR
+
+    previo = (
+        TrabajoOCR.objects
+        .filter(sha256=sha256)
+        .filter(
+            Q(estado=TrabajoOCR.Estado.LISTO)
+            | Q(
+                estado__in=[TrabajoOCR.Estado.PENDIENTE, TrabajoOCR.Estado.PROCESANDO],
+                creado_en__gte=timezone.now() - OCR_TRABAJO_VENCE,
+            )
+        )
+        .order_by("-creado_en")
+        .first()
+    )
+
+    if previo and previo.estado == TrabajoOCR.Estado.LISTO:
+        return TrabajoOCR.objects.create(
+            factura=factura,
+            sha256=sha256,
+            estado=TrabajoOCR.Estado.LISTO,
+            texto=previo.texto,
+            paginas=previo.paginas,
+            paginas_listas=previo.paginas,
+            terminado_en=timezone.now(),
+        )
+    if previo:
+        return previo
+
+    trabajo = TrabajoOCR.objects.create(factura=factura, sha256=sha256)
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_correr_trabajo_ocr,
+            args=(trabajo.pk,),
+            name=f"ocr-factura-{factura.pk}",
+            daemon=True,
+        ).start()
+    )
+    return trabajo
@@ -0,0 +1,254 @@
+# pdf/utils_texto_pdf.py
+"""
+Capa única de extracción de texto de PDFs.
+
+Backends (todos opcionales, se usan los que estén instalados):
+- "pdfium"     pypdfium2: el más rápido, pero devuelve el texto en el orden
+               del content stream (no siempre el visual).
+- "pypdf"      pypdf
+- "pypdf2"     PyPDF2 (lo que usa el parser de listas tipo Génesis)
+- "pdfplumber" el más lento; orden visual y único con posiciones de palabras.
+
+Los parsers con heurísticas atadas al orden de las líneas piden su backend
+explícitamente (ver `manage.py benchmark_pdf_texto` para comparar velocidad
+y resultados sobre los PDFs reales). Sin pedir nada se usa el más rápido.
+
+Todas las funciones aceptan una ruta o los bytes del PDF y devuelven
+páginas con la misma forma:
+
+    {
+        "numero": int,          # 1-based
+        "texto": str,
+        "lineas": [str, ...],   # sin vacías, espacios normalizados
+        "palabras": [...],      # sólo con palabras=True (dicts de pdfplumber)
+        "tablas": [...],        # sólo con tablas=True (page.extract_tables())
+    }
+"""
+import re
+from io import BytesIO
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+
+# Orden por defecto (de más rápido a más lento)
+BACKENDS_TEXTO = ("pdfium", "pypdf", "pypdf2", "pdfplumber")
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def _normalizar_linea(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "")).strip()
+
+
+def _pagina(numero, texto, palabras=None, tablas=None):
+    texto = (texto or "").replace("\r\n", "\n").replace("\r", "\n")
+    pagina = {
+        "numero": numero,
+        "texto": texto,
+        "lineas": [l for l in (_normalizar_linea(x) for x in texto.splitlines()) if l],
+    }
+    if palabras is not None:
+        pagina["palabras"] = palabras
+    if tablas is not None:
+        pagina["tablas"] = tablas
+    return pagina
+
+
+def _como_archivo(origen):
+    # pdfplumber / pypdf aceptan ruta o file-like; los bytes van en BytesIO
+    if isinstance(origen, (bytes, bytearray)):
+        return BytesIO(origen)
+    return origen
+
+
+def _rango(total, desde, hasta):
+    return range(desde, total if hasta is None else min(hasta, total))
+
+
+# ============================================================
+# Backends
+# ============================================================
+
+def _paginas_pdfium(origen, desde=0, hasta=None):
+    doc = pdfium.PdfDocument(bytes(origen) if isinstance(origen, bytearray) else origen)
+    try:
+        for index in _rango(len(doc), desde, hasta):
+            page = doc[index]
+            textpage = page.get_textpage()
+            try:
+                texto = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            yield _pagina(index + 1, texto)
+    finally:
+        doc.close()
+
+
+def _paginas_reader(modulo):
+    def _paginas(origen, desde=0, hasta=None):
+        reader = modulo.PdfReader(_como_archivo(origen))
+        for index in _rango(len(reader.pages), desde, hasta):
+            yield _pagina(index + 1, reader.pages[index].extract_text() or "")
+    return _paginas
+
+
+def _paginas_pdfplumber(origen, desde=0, hasta=None, palabras=False, tablas=False):
+    with pdfplumber.open(_como_archivo(origen)) as pdf:
+        for index in _rango(len(pdf.pages), desde, hasta):
+            page = pdf.pages[index]
+            words = None
+            if palabras:
+                words = page.extract_words(use_text_flow=False, keep_blank_chars=False)
+            yield _pagina(
+                index + 1,
+                page.extract_text() or "",
+                words,
+                page.extract_tables() if tablas else None,
+            )
+            # pdfplumber cachea objetos por página; liberarlos mantiene la memoria acotada
+            page.close()
+
+
+def _backends():
+    backends = {}
+    if pdfium is not None:
+        backends["pdfium"] = _paginas_pdfium
+    if pypdf is not None:
+        backends["pypdf"] = _paginas_reader(pypdf)
+    if PyPDF2 is not None:
+        backends["pypdf2"] = _paginas_reader(PyPDF2)
+    if pdfplumber is not None:
+        backends["pdfplumber"] = _paginas_pdfplumber
+    return backends
+
+
+_BACKENDS = _backends()
+
+
+def backends_disponibles():
+    """
+    Backends instalados, en el orden por defecto.
+    """
+    return [b for b in BACKENDS_TEXTO if b in _BACKENDS]
+
+
+# ============================================================
+# API
+# ============================================================
+
+def iterar_paginas(origen, backends=None, palabras=False, desde=0, hasta=None, tablas=False):
+    """
+    Generador de páginas (ver forma arriba) de [desde, hasta).
+
+    - backends: nombre o tupla de nombres en orden de preferencia;
+      None = BACKENDS_TEXTO. Se usa el primero instalado que pueda abrir
+      el PDF; si falla al abrir, se prueba el siguiente.
+    - palabras=True / tablas=True: pdfplumber, único backend con posiciones;
+      texto, palabras y tablas salen de la misma lectura de cada página.
+
+    Si ninguno puede abrir el PDF levanta la excepción del último intento.
+    """
+    if palabras or tablas:
+        backends = ("pdfplumber",)
+    elif backends is None:
+        backends = BACKENDS_TEXTO
+    elif isinstance(backends, str):
+        backends = (backends,)
+
+    candidatos = [b for b in backends if b in _BACKENDS]
+    if not candidatos:
+        raise RuntimeError(
+            f"No está disponible ninguna librería de PDF para: {', '.join(backends)}"
+        )
+
+    ultimo_error = None
+    for nombre in candidatos:
+        if nombre == "pdfplumber":
+            paginas = _paginas_pdfplumber(origen, desde, hasta, palabras=palabras, tablas=tablas)
+        else:
+            paginas = _BACKENDS[nombre](origen, desde, hasta)
+
+        try:
+            primera = next(paginas, None)
+        except Exception as e:
+            # No lo pudo abrir (PDF raro / dañado para este backend): probar el siguiente
+            ultimo_error = e
+            continue
+
+        if primera is not None:
+            yield primera
+            yield from paginas
+        return
+
+    raise ultimo_error
+
+
+def contar_paginas(origen, backends=None) -> int:
+    """
+    Cantidad de páginas (sin extraer texto).
+    """
+    if backends is None:
+        backends = BACKENDS_TEXTO
+    elif isinstance(backends, str):
+        backends = (backends,)
+
+    ultimo_error = None
+    for nombre in [b for b in backends if b in _BACKENDS]:
+        try:
+            if nombre == "pdfium":
+                doc = pdfium.PdfDocument(bytes(origen) if isinstance(origen, bytearray) else origen)
+                try:
+                    return len(doc)
+                finally:
+                    doc.close()
+            if nombre == "pypdf":
+                return len(pypdf.PdfReader(_como_archivo(origen)).pages)
+            if nombre == "pypdf2":
+                return len(PyPDF2.PdfReader(_como_archivo(origen)).pages)
+            if nombre == "pdfplumber":
+                with pdfplumber.open(_como_archivo(origen)) as pdf:
+                    return len(pdf.pages)
+        except Exception as e:
+            ultimo_error = e
+
+    if ultimo_error is not None:
+        raise ultimo_error
+    raise RuntimeError("No hay ninguna librería de PDF instalada.")
+
+
+def extraer_lineas(origen, backends=None) -> list[str]:
+    """
+    Todas las líneas no vacías del PDF, en orden.
+    """
+    lineas = []
+    for pagina in iterar_paginas(origen, backends):
+        lineas.extend(pagina["lineas"])
+    return lineas
+
+
+def extraer_texto(origen, backends=None) -> str:
+    """
+    Texto completo, páginas separadas por salto de línea.
+    """
+    return "\n".join(pagina["texto"] for pagina in iterar_paginas(origen, backends))
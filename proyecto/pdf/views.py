@@ -2,18 +2,21 @@ import os
 
 import unicodedata
 import re
-from io import BytesIO
+import zipfile
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
 
 from django.core.paginator import Paginator
 
 from django.conf import settings
 from django.contrib import messages
-from django.db import IntegrityError, transaction
-from django.db.models import F, Q
-from django.http import JsonResponse, HttpResponse
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
@@ -46,6 +49,8 @@ from .forms import (
     FacturaProveedorForm,
     ListaPreciosPDFForm,
     FacturaForm,
+    FacturasLoteForm,
+    FacturasProveedorLoteForm,
 )
 from .models import (
     ListaPrecioPDF,
@@ -53,14 +58,25 @@ from .models import (
     FacturaProveedor,
     ItemFactura,
     ProductoVariante,
+    Factura,
+    FacturaItem,
     Rubro,
     PDFBranding,
+    PrecioHistorial,
     SubRubro,
+    ImportBatch,
+    ImportRow,
+    StockMovimiento,
+    TrabajoOCR,
 )
-from .utils import extraer_precios_de_pdf, get_similarity
-from .utils_facturas import extraer_texto_factura_simple, parse_invoice_text, parse_invoice_pdf
+from .utils import extraer_precios_de_pdf, get_similarity, sha256_de_archivo, PARSER_LISTA_VERSION
+from .utils_estrategias_factura import Estado as EstadoEstrategia, correr_estrategias_factura
+from .utils_facturas import analizar_factura_pdf, parse_invoice_text
+from .utils_ocr import iniciar_trabajo_ocr, ocr_disponible
+from .utils_factura_pdf import render_factura_pdf, render_facturas_en_lote
 from ofertas.utils import get_precio_con_oferta
 from owner.models import BitacoraEvento, SiteConfig, SiteCarouselImage
+from owner.views import _check_owner
 
 
 Q2 = Decimal("0.01")
@@ -303,13 +319,18 @@ def _slug_sku_base(texto: str) -> str:
     return texto[:60] or "producto_pdf"
 
 
-def _sku_unico(base: str) -> str:
+def _sku_unico(base: str, usados: set) -> str:
+    """
+    SKU libre a partir de `base`, contra un set en memoria de SKUs en minúscula
+    (se carga una vez por importación). El SKU elegido se agrega al set.
+    """
     sku = base
     n = 2
-    while ProductoPrecio.objects.filter(sku__iexact=sku).exists():
+    while sku.lower() in usados:
         sufijo = f"_{n}"
         sku = f"{base[:60-len(sufijo)]}{sufijo}"
         n += 1
+    usados.add(sku.lower())
     return sku
 
 # ============================================================
@@ -774,6 +795,127 @@ def _tech_label(tech: str) -> str:
 # IMPORTAR LISTA DE PRECIOS (PDF)
 # ============================================================
 
+IMPORT_FILAS_POR_PAGINA = 100
+
+# Tamaño de los bloques de IN (...) / bulk_create / bulk_update al confirmar
+IMPORT_CHUNK = 500
+
+
+def _parse_lista_con_cache(lista_pdf):
+    """
+    extraer_precios_de_pdf con cache en ListaPrecioPDF.parse_cache.
+    Una lista ya analizada (misma versión de parser) no se vuelve a leer.
+    """
+    cache = lista_pdf.parse_cache or {}
+    if cache.get("version") == PARSER_LISTA_VERSION:
+        productos = [
+            {**p, "precio": Decimal(p["precio"])}
+            for p in cache.get("productos", [])
+        ]
+        return productos, list(cache.get("errores", []))
+
+    pdf_path = os.path.join(settings.MEDIA_ROOT, lista_pdf.archivo_pdf.name)
+    productos, parse_errors = extraer_precios_de_pdf(pdf_path)
+
+    lista_pdf.parse_cache = {
+        "version": PARSER_LISTA_VERSION,
+        "productos": [{**p, "precio": str(p["precio"])} for p in productos],
+        "errores": [str(e) for e in parse_errors],
+    }
+    lista_pdf.save(update_fields=["parse_cache"])
+
+    return productos, parse_errors
+
+
+def _lista_anterior_de_proveedor(lista_pdf):
+    """
+    Última lista (distinta de esta) del mismo proveedor que ya tenga el parse guardado
+    y una importación confirmada: las descartadas o a medio revisar no llegaron
+    a los precios, así que no sirven de base para "solo cambios".
+    """
+    return (
+        ListaPrecioPDF.objects
+        .filter(
+            proveedor__iexact=lista_pdf.proveedor,
+            parse_cache__isnull=False,
+            import_batches__estado=ImportBatch.Estado.CONFIRMADO,
+        )
+        .exclude(pk=lista_pdf.pk)
+        .distinct()
+        .order_by("-fecha_subida", "-id")
+        .first()
+    )
+
+
+def _diff_listas(anteriores, actuales):
+    """
+    Compara dos parses de lista por nombre normalizado (dict, O(n)).
+    Devuelve (filas_a_revisar, quitados, cantidad_sin_cambios):
+    - filas_a_revisar: ítems actuales nuevos o con otro precio/moneda,
+      marcados con "cambio" y "precio_anterior"
+    - quitados: ítems de la lista anterior que ya no aparecen
+    """
+    por_clave = {_norm(p["nombre"]): p for p in anteriores}
+
+    filas = []
+    vistas = set()
+    sin_cambios = 0
+
+    for item in actuales:
+        clave = _norm(item["nombre"])
+        vistas.add(clave)
+        anterior = por_clave.get(clave)
+
+        if anterior is None:
+            filas.append({**item, "cambio": ImportRow.Cambio.NUEVO})
+        elif (
+            anterior["precio"] != item["precio"]
+            or anterior.get("moneda", "ARS") != item.get("moneda", "ARS")
+        ):
+            filas.append({
+                **item,
+                "cambio": ImportRow.Cambio.PRECIO,
+                "precio_anterior": anterior["precio"],
+            })
+        else:
+            sin_cambios += 1
+
+    quitados = [p for clave, p in por_clave.items() if clave not in vistas]
+    return filas, quitados, sin_cambios
+
+
+def _import_batch_en_sesion(request, clave, tipo):
+    """
+    Batch de importación pendiente cuyo id está en la sesión (o None).
+    """
+    batch_id = request.session.get(clave)
+    if not batch_id:
+        return None
+    return ImportBatch.objects.filter(
+        pk=batch_id,
+        tipo=tipo,
+        estado=ImportBatch.Estado.PENDIENTE,
+    ).first()
+
+
+def _guardar_acciones_pagina(request, batch):
+    """
+    Guarda las acciones (action_<orden>) de las filas que se vieron en esta página.
+    """
+    acciones = {}
+    for key, valor in request.POST.items():
+        if key.startswith("action_") and key[7:].isdigit():
+            acciones[int(key[7:])] = (valor or "").strip()[:40]
+
+    if not acciones:
+        return
+
+    filas = list(batch.filas.filter(orden__in=list(acciones.keys())))
+    for fila in filas:
+        fila.accion = acciones[fila.orden]
+    ImportRow.objects.bulk_update(filas, ["accion"], batch_size=500)
+
+
 def importar_pdf(request):
     """
     Importa / actualiza precios desde un PDF de lista de precios.
@@ -787,6 +929,8 @@ def importar_pdf(request):
     Mejora importante:
     - busca coincidencia exacta por SKU y también por nombre_publico
     - sugiere comparando contra nombre_publico o sku
+    - las filas parseadas y las decisiones quedan en ImportBatch/ImportRow
+      (en sesión solo el id del batch) y la revisión se pagina
     """
 
     report = {
@@ -803,13 +947,35 @@ def importar_pdf(request):
     }
     msg = ""
     update_only = request.POST.get("update_only") in ("on", "true", "1")
+    solo_cambios = request.POST.get("solo_cambios") in ("on", "true", "1")
+    proveedor = (request.POST.get("proveedor") or "").strip()[:120]
+
+    batch = _import_batch_en_sesion(request, "import_batch_id", ImportBatch.Tipo.LISTA)
+
+    # ============================================================
+    # REVISIÓN: descartar / marcar todo / cambiar de página
+    # ============================================================
+    if request.method == "POST" and batch and request.POST.get("descartar"):
+        batch.estado = ImportBatch.Estado.DESCARTADO
+        batch.save(update_fields=["estado"])
+        request.session.pop("import_batch_id", None)
+        messages.info(request, "Importación descartada.")
+        return redirect("importar_pdf")
+
+    if request.method == "POST" and batch and request.POST.get("marcar_todo") in ("apply", "ignore"):
+        # Las filas "quitado" no se tocan: su única acción posible es desactivar
+        batch.filas.exclude(cambio=ImportRow.Cambio.QUITADO).update(accion=request.POST["marcar_todo"])
+        return redirect(f"{reverse('importar_pdf')}?page={request.POST.get('page') or 1}")
+
+    if request.method == "POST" and batch and request.POST.get("ir_a_pagina"):
+        _guardar_acciones_pagina(request, batch)
+        return redirect(f"{reverse('importar_pdf')}?page={request.POST['ir_a_pagina']}")
 
     # ============================================================
     # PASO 2: CONFIRMAR E IMPORTAR
     # ============================================================
     if request.method == "POST" and request.POST.get("confirm"):
-        productos_a_revisar = request.session.pop("productos_a_revisar", [])
-        lista_pdf_id = request.session.pop("lista_pdf_id", None)
+        lista_pdf_id = batch.lista_pdf_id if batch else None
 
         if not lista_pdf_id:
             msg = "Error: sesión expirada. Volvé a subir el PDF."
@@ -827,158 +993,246 @@ def importar_pdf(request):
             )
 
         lista_pdf = get_object_or_404(ListaPrecioPDF, pk=lista_pdf_id)
+        update_only = batch.update_only
+
+        # Las acciones de la página visible todavía no se guardaron
+        _guardar_acciones_pagina(request, batch)
+
+        filas = list(batch.filas.all())
+
+        # ---------------------------------------------------------
+        # Resolver todos los destinos de una vez (ids de "merge" +
+        # nombres por sku/nombre_publico, sin distinguir mayúsculas)
+        # ---------------------------------------------------------
+        target_ids = set()
+        nombres_l = set()
+        for fila in filas:
+            accion_valor = (fila.accion or "").strip()
+            if ":" in accion_valor:
+                target_id = accion_valor.split(":", 1)[1]
+                if target_id.isdigit():
+                    target_ids.add(int(target_id))
+            if fila.nombre.strip():
+                nombres_l.add(fila.nombre.strip().lower())
+
+        por_id = {}
+        por_sku_l = {}
+        por_nombre_l = {}
+
+        def _indexar(productos):
+            for p in productos:
+                por_id[p.pk] = p
+                if p.sku:
+                    por_sku_l.setdefault(p.sku.lower(), p)
+                if p.nombre_publico:
+                    por_nombre_l.setdefault(p.nombre_publico.lower(), p)
+
+        if target_ids:
+            _indexar(ProductoPrecio.objects.filter(pk__in=target_ids))
+
+        nombres_l = list(nombres_l)
+        for i in range(0, len(nombres_l), IMPORT_CHUNK):
+            chunk = nombres_l[i:i + IMPORT_CHUNK]
+            _indexar(
+                ProductoPrecio.objects
+                .annotate(sku_l=Lower("sku"), nombre_l=Lower("nombre_publico"))
+                .filter(Q(sku_l__in=chunk) | Q(nombre_l__in=chunk))
+                .order_by("pk")
+            )
+
+        # SKUs existentes (para SKUs nuevos únicos y para "no vistos")
+        todos_skus = list(
+            ProductoPrecio.objects
+            .exclude(sku__isnull=True)
+            .exclude(sku__exact="")
+            .values_list("sku", flat=True)
+        )
+        skus_usados = {sku.lower() for sku in todos_skus}
 
         skus_vistos_pdf = []
         productos_pdf_creados_ids = []
+        historial = []
+        a_actualizar = {}
+        a_desactivar = {}
+        a_crear = []
+        report["deactivated"] = 0
+        report["deactivated_items"] = []
+
+        for fila in filas:
+            accion_valor = (fila.accion or "").strip()
+            nombre_final = fila.nombre.strip()
+
+            if not nombre_final:
+                report["skipped"] += 1
+                report["skipped_items"].append({
+                    "reason": "Nombre vacío",
+                    "sku": fila.nombre,
+                })
+                continue
 
-        with transaction.atomic():
-            for index, producto in enumerate(productos_a_revisar):
-                action_key = f"action_{index}"
-                accion_valor = (request.POST.get(action_key) or "").strip()
-
-                name_key = f"name_{index}"
-                nombre_final = request.POST.get(name_key, producto["sku_original"]).strip()
-
-                if not nombre_final:
+            if not accion_valor:
+                accion = "ignore"
+                target_id = None
+            else:
+                parts = accion_valor.split(":", 1)
+                accion = parts[0]
+                target_id = parts[1] if len(parts) > 1 else None
+
+            precio_nuevo = fila.precio
+            moneda = fila.moneda
+
+            producto_existente_db = None
+
+            if target_id and target_id.isdigit():
+                producto_existente_db = por_id.get(int(target_id))
+
+            # Buscar por sku o por nombre público
+            if not producto_existente_db:
+                clave = nombre_final.lower()
+                producto_existente_db = por_sku_l.get(clave) or por_nombre_l.get(clave)
+
+            # Ya no está en la lista del proveedor: solo se puede desactivar
+            if fila.cambio == ImportRow.Cambio.QUITADO:
+                if accion == "desactivar" and producto_existente_db and producto_existente_db.activo:
+                    producto_existente_db.activo = False
+                    a_desactivar[producto_existente_db.pk] = producto_existente_db
+                    report["deactivated"] += 1
+                    report["deactivated_items"].append({
+                        "sku": producto_existente_db.sku,
+                        "nombre": producto_existente_db.nombre_publico,
+                    })
+                else:
                     report["skipped"] += 1
                     report["skipped_items"].append({
-                        "reason": "Nombre vacío",
-                        "sku": producto["sku_original"],
+                        "reason": "Ya no está en la lista (sin cambios en catálogo)",
+                        "sku": nombre_final,
                     })
-                    continue
+                continue
 
-                skus_vistos_pdf.append(nombre_final)
-
-                if not accion_valor:
-                    accion = "ignore"
-                    target_id = None
-                else:
-                    parts = accion_valor.split(":", 1)
-                    accion = parts[0]
-                    target_id = parts[1] if len(parts) > 1 else None
+            skus_vistos_pdf.append(nombre_final)
 
-                precio_nuevo = Decimal(producto["precio_nuevo"])
-                moneda = producto.get("moneda", "ARS")
-
-                producto_existente_db = None
+            item_reporte = {
+                "sku": nombre_final,
+                "currency": moneda,
+                "price": f"{precio_nuevo:.2f}",
+            }
 
-                if target_id:
-                    try:
-                        producto_existente_db = ProductoPrecio.objects.get(pk=target_id)
-                    except ProductoPrecio.DoesNotExist:
-                        producto_existente_db = None
-
-                # Buscar por sku o por nombre público
-                if not producto_existente_db:
-                    producto_existente_db = ProductoPrecio.objects.filter(
-                        Q(sku__iexact=nombre_final) |
-                        Q(nombre_publico__iexact=nombre_final)
-                    ).first()
-
-                item_reporte = {
+            if moneda == "USD":
+                report["usd_to_review"].append({
                     "sku": nombre_final,
-                    "currency": moneda,
                     "price": f"{precio_nuevo:.2f}",
-                }
-
-                if moneda == "USD":
-                    report["usd_to_review"].append({
-                        "sku": nombre_final,
-                        "price": f"{precio_nuevo:.2f}",
-                    })
+                })
 
-                # IGNORAR
-                if accion == "ignore":
-                    report["skipped"] += 1
-                    report["skipped_items"].append({
-                        "reason": "Ignorado por usuario",
-                        "sku": nombre_final,
+            # IGNORAR
+            if accion == "ignore":
+                report["skipped"] += 1
+                report["skipped_items"].append({
+                    "reason": "Ignorado por usuario",
+                    "sku": nombre_final,
+                })
+                continue
+
+            # SOLO ACTUALIZAR Y NO EXISTE
+            if update_only and not producto_existente_db:
+                report["skipped"] += 1
+                report["not_found"].append(nombre_final)
+                report["skipped_items"].append({
+                    "reason": "update_only_sin_existente",
+                    "sku": nombre_final,
+                })
+                continue
+
+            # =====================================================
+            # EXISTE -> ACTUALIZAR PRECIO (en memoria, se graba en bulk)
+            # =====================================================
+            if producto_existente_db:
+                prev_price = producto_existente_db.precio
+                changed = (prev_price != precio_nuevo)
+
+                if changed:
+                    producto_existente_db.precio = precio_nuevo
+                    producto_existente_db.lista_pdf = lista_pdf
+                    # Un borrador de una fila anterior (sin pk todavía) se graba
+                    # con el bulk_create, ya con el precio nuevo: no tiene
+                    # precio anterior que dejar en el historial
+                    if producto_existente_db.pk is not None:
+                        a_actualizar[producto_existente_db.pk] = producto_existente_db
+                        historial.append(PrecioHistorial.nuevo(
+                            producto_existente_db, prev_price, precio_nuevo, origen="importar_pdf"
+                        ))
+
+                    report["updated"] += 1
+                    item_reporte.update({
+                        "prev_price": f"{prev_price:.2f}",
+                        "changed": True,
+                        "note": "Precio actualizado",
                     })
-                    continue
-
-                # SOLO ACTUALIZAR Y NO EXISTE
-                if update_only and not producto_existente_db:
+                    report["updated_items"].append(item_reporte)
+                else:
                     report["skipped"] += 1
-                    report["not_found"].append(nombre_final)
                     report["skipped_items"].append({
-                        "reason": "update_only_sin_existente",
+                        "reason": "Precio sin cambios",
                         "sku": nombre_final,
                     })
-                    continue
 
-                # =====================================================
-                # EXISTE -> ACTUALIZAR PRECIO
-                # =====================================================
-                if producto_existente_db:
-                    prev_price = producto_existente_db.precio
-                    changed = (prev_price != precio_nuevo)
-
-                    if changed:
-                        producto_existente_db.precio = precio_nuevo
-                        producto_existente_db.lista_pdf = lista_pdf
-                        producto_existente_db.save(update_fields=["precio", "lista_pdf"])
-
-                        report["updated"] += 1
-                        item_reporte.update({
-                            "prev_price": f"{prev_price:.2f}",
-                            "changed": True,
-                            "note": "Precio actualizado",
-                        })
-                        report["updated_items"].append(item_reporte)
-                    else:
-                        report["skipped"] += 1
-                        report["skipped_items"].append({
-                            "reason": "Precio sin cambios",
-                            "sku": nombre_final,
-                        })
+                continue
+
+            # =====================================================
+            # NO EXISTE -> CREAR BORRADOR INCOMPLETO
+            # =====================================================
+            sku_nuevo = _sku_unico(_slug_sku_base(nombre_final), skus_usados)
+
+            borrador = ProductoPrecio(
+                lista_pdf=lista_pdf,
+                sku=sku_nuevo,
+                nombre_publico=nombre_final,
+                precio=precio_nuevo,
+                precio_costo=precio_nuevo,
+                descripcion=f"Importado desde PDF: {nombre_final}",
+                stock=0,
+                activo=False,
+            )
+            a_crear.append(borrador)
+            # Si el mismo nombre vuelve a aparecer en el PDF, actualiza este borrador
+            por_sku_l.setdefault(sku_nuevo.lower(), borrador)
+            por_nombre_l.setdefault(nombre_final.lower(), borrador)
+
+            report["imported"] += 1
+            item_reporte.update({
+                "sku_temporal": sku_nuevo,
+                "note": "Producto borrador creado para completar",
+            })
+            report["imported_items"].append(item_reporte)
 
-                    continue
+        with transaction.atomic():
+            ProductoPrecio.objects.bulk_update(
+                list(a_actualizar.values()),
+                ["precio", "lista_pdf"],
+                batch_size=IMPORT_CHUNK,
+            )
+            ProductoPrecio.objects.bulk_update(
+                list(a_desactivar.values()),
+                ["activo"],
+                batch_size=IMPORT_CHUNK,
+            )
+            creados = ProductoPrecio.objects.bulk_create(a_crear, batch_size=IMPORT_CHUNK)
+            productos_pdf_creados_ids = [p.pk for p in creados]
 
-                # =====================================================
-                # NO EXISTE -> CREAR BORRADOR INCOMPLETO
-                # =====================================================
-                base_sku = _slug_sku_base(nombre_final)
-                sku_nuevo = _sku_unico(base_sku)
+            PrecioHistorial.registrar_varios(historial)
 
-                try:
-                    nuevo = ProductoPrecio.objects.create(
-                        lista_pdf=lista_pdf,
-                        sku=sku_nuevo,
-                        nombre_publico=nombre_final,
-                        precio=precio_nuevo,
-                        precio_costo=precio_nuevo,
-                        descripcion=f"Importado desde PDF: {nombre_final}",
-                        stock=0,
-                        activo=False,
-                    )
-                except IntegrityError:
-                    report["skipped"] += 1
-                    report["skipped_items"].append({
-                        "reason": "Error: no se pudo crear el producto",
-                        "sku": nombre_final,
-                    })
-                    continue
-
-                productos_pdf_creados_ids.append(nuevo.id)
+            batch.estado = ImportBatch.Estado.CONFIRMADO
+            batch.confirmado_en = timezone.now()
+            batch.save(update_fields=["estado", "confirmado_en"])
 
-                report["imported"] += 1
-                item_reporte.update({
-                    "sku_temporal": sku_nuevo,
-                    "note": "Producto borrador creado para completar",
-                })
-                report["imported_items"].append(item_reporte)
+        request.session.pop("import_batch_id", None)
 
         # Productos existentes en DB que no aparecieron en este PDF
-        todos_skus = list(
-            ProductoPrecio.objects
-            .exclude(sku__isnull=True)
-            .exclude(sku__exact="")
-            .values_list("sku", flat=True)
-        )
+        # (en modo "solo cambios" eso ya lo cubren las filas "quitado")
         skus_vistos_pdf = set(skus_vistos_pdf)
-        report["not_seen_active"] = [
-            s for s in todos_skus if s not in skus_vistos_pdf
-        ][:200]
+        if batch.lista_anterior_id is None:
+            report["not_seen_active"] = [
+                s for s in todos_skus if s not in skus_vistos_pdf
+            ][:200]
 
         msg = (
             f"PROCESO OK — borradores creados {report['imported']}, "
@@ -986,6 +1240,11 @@ def importar_pdf(request):
             f"no encontrados (update_only) {len(report['not_found'])}, "
             f"activos no vistos {len(report['not_seen_active'])}."
         )
+        if batch.lista_anterior_id:
+            msg += (
+                f" Comparada con la lista anterior del proveedor: "
+                f"{batch.filas_sin_cambios} sin cambios, desactivados {report['deactivated']}."
+            )
 
         registrar_evento(
             tipo="lista_precio_importada",
@@ -1002,6 +1261,9 @@ def importar_pdf(request):
                 "not_seen_active": len(report["not_seen_active"]),
                 "usd_to_review": len(report["usd_to_review"]),
                 "productos_pdf_creados_ids": productos_pdf_creados_ids,
+                "lista_anterior_id": batch.lista_anterior_id,
+                "filas_sin_cambios": batch.filas_sin_cambios,
+                "deactivated": report["deactivated"],
             },
         )
 
@@ -1029,12 +1291,37 @@ def importar_pdf(request):
     # ============================================================
     if request.method == "POST" and request.FILES.get("file"):
         archivo_pdf = request.FILES["file"]
-
-        lista_pdf = ListaPrecioPDF.objects.create(
-            nombre=archivo_pdf.name,
-            archivo_pdf=archivo_pdf,
+        sha256 = sha256_de_archivo(archivo_pdf)
+
+        # Mismo PDF ya subido: reutilizamos archivo y parse (no se guarda otra copia)
+        lista_pdf = (
+            ListaPrecioPDF.objects
+            .filter(sha256=sha256)
+            .order_by("-fecha_subida")
+            .first()
         )
-        pdf_path = os.path.join(settings.MEDIA_ROOT, lista_pdf.archivo_pdf.name)
+        duplicada = bool(
+            lista_pdf
+            and lista_pdf.archivo_pdf
+            and lista_pdf.archivo_pdf.storage.exists(lista_pdf.archivo_pdf.name)
+        )
+
+        if duplicada:
+            messages.info(
+                request,
+                f"Esta lista ya se había subido el {timezone.localtime(lista_pdf.fecha_subida):%d/%m/%Y %H:%M}; "
+                "se reutiliza el archivo y el análisis.",
+            )
+            if proveedor and not lista_pdf.proveedor:
+                lista_pdf.proveedor = proveedor
+                lista_pdf.save(update_fields=["proveedor"])
+        else:
+            lista_pdf = ListaPrecioPDF.objects.create(
+                nombre=archivo_pdf.name,
+                archivo_pdf=archivo_pdf,
+                sha256=sha256,
+                proveedor=proveedor,
+            )
 
         registrar_evento(
             tipo="lista_precio_subida",
@@ -1046,14 +1333,45 @@ def importar_pdf(request):
                 "lista_id": lista_pdf.id,
                 "archivo": lista_pdf.archivo_pdf.name,
                 "update_only": update_only,
+                "sha256": sha256,
+                "duplicada": duplicada,
             },
         )
 
-        productos_extraidos, parse_errors = extraer_precios_de_pdf(pdf_path)
+        productos_extraidos, parse_errors = _parse_lista_con_cache(lista_pdf)
+
+        # Modo "solo cambios": comparar contra la última lista del mismo proveedor
+        lista_anterior = None
+        if solo_cambios:
+            if lista_pdf.proveedor:
+                lista_anterior = _lista_anterior_de_proveedor(lista_pdf)
+            if lista_anterior is None:
+                messages.warning(
+                    request,
+                    "No hay una lista anterior confirmada de ese proveedor para comparar; se muestran todos los ítems.",
+                )
+
+        quitados = []
+        sin_cambios = 0
+        if lista_anterior is not None:
+            productos_anteriores, _ = _parse_lista_con_cache(lista_anterior)
+            productos_extraidos, quitados, sin_cambios = _diff_listas(
+                productos_anteriores, productos_extraidos
+            )
+
+        batch = ImportBatch.objects.create(
+            tipo=ImportBatch.Tipo.LISTA,
+            lista_pdf=lista_pdf,
+            usuario=request.user if request.user.is_authenticated else None,
+            update_only=update_only,
+            parse_errors=[str(e) for e in parse_errors],
+            total_filas=len(productos_extraidos) + len(quitados),
+            lista_anterior=lista_anterior,
+            filas_sin_cambios=sin_cambios,
+        )
 
-        candidates = []
         productos_existentes = list(ProductoPrecio.objects.all())
-        productos_a_revisar = []
+        filas = []
         contador_nombres = {}
 
         skus_existentes = {}
@@ -1065,18 +1383,11 @@ def importar_pdf(request):
             if p.nombre_publico:
                 nombres_existentes[p.nombre_publico.strip().lower()] = p
 
-        for item in productos_extraidos:
+        for index, item in enumerate(productos_extraidos):
             sku_original = item["nombre"]
             precio_nuevo = item["precio"]
             moneda = item.get("moneda", "ARS")
 
-            if moneda == "USD":
-                report["usd_to_review"].append({
-                    "sku": sku_original,
-                    "price": str(precio_nuevo),
-                    "page": item.get("page"),
-                })
-
             contador_nombres[sku_original] = contador_nombres.get(sku_original, 0) + 1
 
             clave_pdf = sku_original.strip().lower()
@@ -1097,41 +1408,80 @@ def importar_pdf(request):
                         max_similitud = similitud
                         sug_match = existing_product
 
-            c = {
-                "name": sku_original,
-                "price": precio_nuevo,
-                "currency": moneda,
-                "dup_in_pdf": False,
-                "exact_db_id": exact_match.id if exact_match else None,
-                "exact_db_label": exact_match.nombre_publico if exact_match else None,
-                "sug_id": sug_match.id if sug_match else None,
-                "sug_label": sug_match.nombre_publico if sug_match else None,
-                "sug_score": max_similitud,
-            }
-            candidates.append(c)
-
-            productos_a_revisar.append({
-                "sku_original": sku_original,
-                "precio_nuevo": str(precio_nuevo),
-                "moneda": moneda,
-                "coincidencia_id": c["exact_db_id"] or c["sug_id"],
-            })
-
-        for c in candidates:
-            c["dup_in_pdf"] = contador_nombres.get(c["name"], 0) > 1
+            # Por defecto: si hay exacta y NO es update_only → ignorar; si no → apply.
+            # En modo "solo cambios" la fila está justamente porque cambió el precio.
+            accion = "ignore" if (exact_match and not update_only) else "apply"
+            if exact_match and item.get("cambio") == ImportRow.Cambio.PRECIO:
+                accion = "apply"
+
+            filas.append(ImportRow(
+                batch=batch,
+                orden=index,
+                nombre=sku_original[:255],
+                precio=precio_nuevo,
+                moneda=moneda,
+                pagina=item.get("page"),
+                exacto=exact_match,
+                sugerido=sug_match,
+                sugerencia_score=max_similitud,
+                cambio=item.get("cambio", ""),
+                precio_anterior=item.get("precio_anterior"),
+                accion=accion,
+            ))
+
+        # Los que ya no vienen en la lista: solo coincidencia exacta, por defecto no se tocan
+        for item in quitados:
+            clave_pdf = item["nombre"].strip().lower()
+            filas.append(ImportRow(
+                batch=batch,
+                orden=len(filas),
+                nombre=item["nombre"][:255],
+                precio=item["precio"],
+                moneda=item.get("moneda", "ARS"),
+                pagina=item.get("page"),
+                exacto=skus_existentes.get(clave_pdf) or nombres_existentes.get(clave_pdf),
+                cambio=ImportRow.Cambio.QUITADO,
+                precio_anterior=item["precio"],
+                accion="ignore",
+            ))
+
+        for f in filas:
+            f.dup_en_pdf = contador_nombres.get(f.nombre, 0) > 1
+
+        ImportRow.objects.bulk_create(filas, batch_size=500)
+
+        request.session["import_batch_id"] = batch.id
 
-        request.session["productos_a_revisar"] = productos_a_revisar
-        request.session["lista_pdf_id"] = lista_pdf.id
+        return redirect("importar_pdf")
 
-        report["parse_errors"] = parse_errors
+    # ============================================================
+    # PASO 1.5: REVISIÓN PAGINADA (batch pendiente)
+    # ============================================================
+    if batch:
+        filas_qs = batch.filas.select_related("exacto", "sugerido")
+        page_obj = Paginator(filas_qs, IMPORT_FILAS_POR_PAGINA).get_page(request.GET.get("page"))
+
+        report["parse_errors"] = batch.parse_errors
+        # Los USD se revisan antes de confirmar: lista completa, no solo la página
+        report["usd_to_review"] = [
+            {"sku": nombre, "price": str(precio), "page": pagina}
+            for nombre, precio, pagina in (
+                batch.filas
+                .filter(moneda="USD")
+                .exclude(cambio=ImportRow.Cambio.QUITADO)
+                .order_by("orden")
+                .values_list("nombre", "precio", "pagina")
+            )
+        ]
 
         return render(
             request,
             "pdf/importar_pdf.html",
             {
                 "preview": True,
-                "candidates": candidates,
-                "update_only": update_only,
+                "batch": batch,
+                "page_obj": page_obj,
+                "update_only": batch.update_only,
                 "report": report,
                 "msg": msg,
             },
@@ -1141,6 +1491,13 @@ def importar_pdf(request):
     # GET / FORM VACÍO
     # ============================================================
     listas_procesadas = ListaPrecioPDF.objects.all().order_by("-fecha_subida")[:5]
+    proveedores = (
+        ListaPrecioPDF.objects
+        .exclude(proveedor="")
+        .order_by("proveedor")
+        .values_list("proveedor", flat=True)
+        .distinct()
+    )
     return render(
         request,
         "pdf/importar_pdf.html",
@@ -1150,6 +1507,7 @@ def importar_pdf(request):
             "preview": False,
             "update_only": False,
             "listas_procesadas": listas_procesadas,
+            "proveedores": proveedores,
         },
     )
 
@@ -1178,6 +1536,11 @@ def owner_productos_completar_desde_pdf(request):
     todo_ok = True
 
     if request.method == "POST":
+        # Precios antes de que los forms toquen las instancias (para el historial)
+        precios_antes = {p.pk: (p.precio, p.precio_costo) for p in productos}
+        variantes_antes = PrecioHistorial.precios_de_variantes(ids)
+        historial = []
+
         for producto in productos:
             prefix = f"prod_{producto.id}"
             vprefix = f"vars_{producto.id}"
@@ -1211,6 +1574,16 @@ def owner_productos_completar_desde_pdf(request):
                 obj.save()
                 vformset.save()
 
+                precio_antes, costo_antes = precios_antes[obj.pk]
+                historial.append(PrecioHistorial.nuevo(
+                    obj,
+                    precio_antes,
+                    obj.precio,
+                    origen="completar_pdf",
+                    costo_anterior=costo_antes,
+                    costo_nuevo=obj.precio_costo,
+                ))
+
                 registrar_evento(
                     tipo="producto_actualizado",
                     titulo=f"Producto completado desde PDF: {obj.nombre_publico or obj.sku}",
@@ -1233,6 +1606,11 @@ def owner_productos_completar_desde_pdf(request):
                 "vprefix": vprefix,
             })
 
+        historial += PrecioHistorial.cambios_de_variantes(
+            variantes_antes, ids, origen="completar_pdf"
+        )
+        PrecioHistorial.registrar_varios(historial)
+
         if todo_ok:
             request.session.pop("productos_pdf_creados_ids", None)
             messages.success(request, "Se guardaron todos los productos creados desde PDF.")
@@ -1282,14 +1660,13 @@ def procesar_factura(request):
     # ======================================================
     if request.method == "POST" and "confirmar_factura" in request.POST:
 
-        factura_id = request.session.get("factura_id")
-        items_sesion = request.session.get("items_factura", [])
+        batch = _import_batch_en_sesion(request, "factura_batch_id", ImportBatch.Tipo.FACTURA)
 
-        if not factura_id:
+        if not batch or not batch.factura_proveedor_id:
             messages.error(request, "Sesión expirada. Volvé a cargar la factura.")
             return redirect("procesar_factura")
 
-        factura = get_object_or_404(FacturaProveedor, pk=factura_id)
+        factura = get_object_or_404(FacturaProveedor, pk=batch.factura_proveedor_id)
 
         # Fecha editable
         fecha_str = request.POST.get("fecha_factura")
@@ -1305,36 +1682,41 @@ def procesar_factura(request):
         productos_stock_actualizado = 0
         productos_costo_actualizado = 0
         productos_creados_ids = []
+        historial = []
+        items_factura = []
 
         with transaction.atomic():
 
-            for index, item in enumerate(items_sesion):
+            for fila in batch.filas.all():
+                index = fila.orden
 
                 if f"item_{index}_check" not in request.POST:
                     continue
 
                 producto_txt = _normalizar_texto_factura(
-                    request.POST.get(f"item_{index}_producto", item["producto"])
+                    request.POST.get(f"item_{index}_producto", fila.nombre)
                 )
 
                 cantidad = _to_decimal(
-                    request.POST.get(f"item_{index}_cantidad", item["cantidad"]), "1"
+                    request.POST.get(f"item_{index}_cantidad", fila.cantidad), "1"
                 )
 
                 precio = _to_decimal(
-                    request.POST.get(f"item_{index}_precio", item["precio_unitario"]), "0"
+                    request.POST.get(f"item_{index}_precio", fila.precio), "0"
                 )
 
                 subtotal = cantidad * precio
 
-                # Guardar ítem de factura
-                ItemFactura.objects.create(
+                # Ítem de factura (se guardan todos juntos al final, ya vinculados al catálogo)
+                item = ItemFactura(
                     factura=factura,
                     producto=producto_txt,
                     cantidad=cantidad,
                     precio_unitario=precio,
                     subtotal=subtotal,
+                    fecha=factura.fecha_compra,
                 )
+                items_factura.append(item)
                 items_creados += 1
 
                 # Vinculación con catálogo
@@ -1377,22 +1759,43 @@ def procesar_factura(request):
                 if not producto:
                     continue
 
+                item.producto_catalogo = producto
+
                 # Actualizar stock
                 if upd_stock:
-                    ProductoPrecio.objects.filter(pk=producto.pk).update(
-                        stock=F("stock") + int(cantidad)
+                    StockMovimiento.mover(
+                        producto,
+                        int(cantidad),
+                        StockMovimiento.Motivo.COMPRA,
+                        ref=factura,
+                        usuario=getattr(request, "user", None),
                     )
                     productos_stock_actualizado += 1
 
                 # Actualizar costo (precio_costo)
                 if upd_precio:
+                    costo_anterior = producto.precio_costo
                     producto.precio_costo = precio
                     producto.save(update_fields=["precio_costo"])
                     productos_costo_actualizado += 1
+                    historial.append(PrecioHistorial.nuevo(
+                        producto,
+                        producto.precio,
+                        producto.precio,
+                        origen="factura_proveedor",
+                        costo_anterior=costo_anterior,
+                        costo_nuevo=precio,
+                    ))
+
+            ItemFactura.objects.bulk_create(items_factura, batch_size=IMPORT_CHUNK)
+            PrecioHistorial.registrar_varios(historial)
+
+            batch.estado = ImportBatch.Estado.CONFIRMADO
+            batch.confirmado_en = timezone.now()
+            batch.save(update_fields=["estado", "confirmado_en"])
 
         # limpiar sesión de factura
-        request.session.pop("factura_id", None)
-        request.session.pop("items_factura", None)
+        request.session.pop("factura_batch_id", None)
 
         # Bitácora
         registrar_evento(
@@ -1454,72 +1857,72 @@ def procesar_factura(request):
 
             texto_manual = request.POST.get("texto_manual", "").strip()
             if texto_manual:
-                raw_text = texto_manual
-                factura_url = None
-                es_pdf = False
-                resultado = parse_invoice_text(raw_text)
-            else:
-                raw_text = extraer_texto_factura_simple(path)
-                factura_url = factura.archivo.url
-                es_pdf = True
-
-                # Primero intentamos parser por posición del PDF
-                resultado = parse_invoice_pdf(path)
-
-                # Fallback: si no encontró nada, usamos texto plano
-                if not resultado:
-                    resultado = parse_invoice_text(raw_text)
+                return _preview_factura(
+                    request, factura, texto_manual, parse_invoice_text(texto_manual), es_pdf=False
+                )
 
-            productos = list(
-                ProductoPrecio.objects.filter(activo=True).values(
-                    "id", "sku", "nombre_publico", "precio", "precio_costo"
+            # Estrategias en carrera, cada una con su presupuesto de tiempo
+            extraccion = correr_estrategias_factura(path)
+            raw_text = extraccion["texto"]
+
+            # Si ninguna terminó (todas se pasaron de tiempo o fallaron) el
+            # texto vacío no dice nada del PDF: no es para OCR
+            if not any(t["estado"] == EstadoEstrategia.OK for t in extraccion["tiempos"]):
+                messages.error(
+                    request,
+                    "No se pudo leer la factura: la extracción se pasó de tiempo o falló. "
+                    "Probá de nuevo o pegá el texto en \"Texto manual\".",
+                )
+                return _preview_factura(
+                    request, factura, "", [], estrategias=extraccion["tiempos"]
                 )
-            )
 
-            items = []
-            for r in resultado:
-                producto_txt = _normalizar_texto_factura(r.get("producto", ""))
-                cantidad = r.get("cantidad", Decimal("1"))
-                precio = r.get("precio_unitario", Decimal("0"))
+            # PDF escaneado (sin capa de texto): OCR en segundo plano
+            if not raw_text.strip():
+                if ocr_disponible():
+                    trabajo = iniciar_trabajo_ocr(factura, extraccion["sha256"])
+                    request.session["factura_ocr"] = {"trabajo": trabajo.pk, "factura": factura.pk}
+                    return render(
+                        request,
+                        "pdf/procesar_factura.html",
+                        {"trabajo_ocr": trabajo, "factura_url": factura.archivo.url},
+                    )
+                messages.warning(
+                    request,
+                    "El PDF parece ser una imagen sin texto y no hay OCR instalado en el servidor. "
+                    "Pegá el texto en \"Texto manual\".",
+                )
 
-                sugerencias = sugerencias_para(producto_txt, productos, top=2)
+            return _preview_factura(
+                request, factura, raw_text, extraccion["items"], estrategias=extraccion["tiempos"]
+            )
 
-                items.append({
-                    "producto": producto_txt,
-                    "cantidad": str(cantidad),
-                    "precio_unitario": str(precio),
-                    "subtotal": str(cantidad * precio),
-                    "sugerencias": sugerencias,
-                    "match_principal": sugerencias[0] if sugerencias else None,
-                })
+    # ======================================================
+    # GET ?ocr=<id> — OCR terminado: preview con ese texto
+    # ======================================================
+    if request.GET.get("ocr"):
+        en_sesion = request.session.get("factura_ocr") or {}
+        trabajo = TrabajoOCR.objects.filter(pk=en_sesion.get("trabajo")).first()
 
-            request.session["factura_id"] = factura.id
-            request.session["items_factura"] = [
-                {
-                    "producto": i["producto"],
-                    "cantidad": i["cantidad"],
-                    "precio_unitario": i["precio_unitario"],
-                    "subtotal": i["subtotal"],
-                    "sugerencias": i["sugerencias"],
-                    "decision": None,
-                }
-                for i in items
-            ]
+        if not trabajo or str(trabajo.pk) != request.GET["ocr"]:
+            messages.error(request, "Sesión expirada. Volvé a cargar la factura.")
+            return redirect("procesar_factura")
 
+        if not trabajo.terminado:
             return render(
                 request,
                 "pdf/procesar_factura.html",
-                {
-                    "preview": True,
-                    "items": items,
-                    "productos_livianos": productos,
-                    "fecha_detectada": datetime.now().strftime("%Y-%m-%d"),
-                    "factura_url": factura_url,
-                    "es_pdf": es_pdf,
-                    "raw_text": raw_text,
-                },
+                {"trabajo_ocr": trabajo},
             )
 
+        factura = get_object_or_404(FacturaProveedor, pk=en_sesion.get("factura"))
+        request.session.pop("factura_ocr", None)
+
+        if trabajo.estado == TrabajoOCR.Estado.ERROR:
+            messages.error(request, f"No se pudo leer la factura escaneada: {trabajo.error}")
+
+        return _preview_factura(request, factura, trabajo.texto, parse_invoice_text(trabajo.texto))
+
     # ======================================================
     # GET — FORMULARIO INICIAL
     # ======================================================
@@ -1532,6 +1935,519 @@ def procesar_factura(request):
         {"form": form, "ultimas_facturas": ultimas},
     )
 
+
+def _preview_factura(request, factura, raw_text, resultado, es_pdf=True, estrategias=None):
+    """
+    Paso 1 → 2: sugerencias por ítem, ImportBatch en sesión y render del preview.
+    estrategias: tiempos de correr_estrategias_factura, quedan en el batch.
+    """
+    productos = list(
+        ProductoPrecio.objects.filter(activo=True).values(
+            "id", "sku", "nombre_publico", "precio", "precio_costo"
+        )
+    )
+
+    items = []
+    for r in resultado:
+        producto_txt = _normalizar_texto_factura(r.get("producto", ""))
+        cantidad = r.get("cantidad", Decimal("1"))
+        precio = r.get("precio_unitario", Decimal("0"))
+
+        sugerencias = sugerencias_para(producto_txt, productos, top=2)
+
+        items.append({
+            "producto": producto_txt,
+            "cantidad": str(cantidad),
+            "precio_unitario": str(precio),
+            "subtotal": str(cantidad * precio),
+            "sugerencias": sugerencias,
+            "match_principal": sugerencias[0] if sugerencias else None,
+        })
+
+    batch = ImportBatch.objects.create(
+        tipo=ImportBatch.Tipo.FACTURA,
+        factura_proveedor=factura,
+        usuario=request.user if request.user.is_authenticated else None,
+        total_filas=len(items),
+        estrategias=estrategias or [],
+    )
+    ImportRow.objects.bulk_create([
+        ImportRow(
+            batch=batch,
+            orden=index,
+            nombre=i["producto"][:255],
+            cantidad=_to_decimal(i["cantidad"], "1").quantize(Q2),
+            precio=_to_decimal(i["precio_unitario"], "0").quantize(Q2),
+            sugerencias=i["sugerencias"],
+        )
+        for index, i in enumerate(items)
+    ], batch_size=500)
+
+    request.session["factura_batch_id"] = batch.id
+
+    return render(
+        request,
+        "pdf/procesar_factura.html",
+        {
+            "preview": True,
+            "items": items,
+            "productos_livianos": productos,
+            "fecha_detectada": datetime.now().strftime("%Y-%m-%d"),
+            "factura_url": factura.archivo.url if es_pdf else None,
+            "es_pdf": es_pdf,
+            "raw_text": raw_text,
+        },
+    )
+
+
+@require_GET
+def factura_ocr_estado(request, pk):
+    """
+    Polling del preview mientras corre el OCR de una factura escaneada.
+    """
+    en_sesion = request.session.get("factura_ocr") or {}
+    if en_sesion.get("trabajo") != pk:
+        return JsonResponse({"error": "not_found"}, status=404)
+
+    trabajo = get_object_or_404(TrabajoOCR, pk=pk)
+    return JsonResponse({
+        "estado": trabajo.estado,
+        "paginas": trabajo.paginas,
+        "paginas_listas": trabajo.paginas_listas,
+        "terminado": trabajo.terminado,
+        "url": f"{reverse('procesar_factura')}?ocr={trabajo.pk}",
+    })
+
+# ============================================================
+# FACTURAS PROVEEDOR EN LOTE
+# ============================================================
+
+# Sugerencias con este score o más quedan precargadas como SKU en la revisión
+LOTE_SCORE_AUTOMATICO = 90
+
+# Catálogo liviano para los procesos del pool (se manda una vez por proceso).
+# Sólo lo toca el initializer en los procesos hijos, nunca el proceso web.
+_PRODUCTOS_LOTE = []
+
+
+def _init_pool_lote(productos):
+    global _PRODUCTOS_LOTE
+    _PRODUCTOS_LOTE = productos
+
+
+def _analizar_factura_lote(par, productos=None):
+    """
+    Tarea del pool: parse + sugerencias de una factura.
+    (factura_id, path) -> (factura_id, raw_text, items)
+    productos: catálogo a usar; por defecto el que dejó el initializer del pool.
+    """
+    factura_id, path = par
+    if productos is None:
+        productos = _PRODUCTOS_LOTE
+    raw_text, resultado = analizar_factura_pdf(path)
+
+    items = []
+    for r in resultado:
+        producto_txt = _normalizar_texto_factura(r.get("producto", ""))
+        items.append({
+            "producto": producto_txt,
+            "cantidad": r.get("cantidad", Decimal("1")),
+            "precio_unitario": r.get("precio_unitario", Decimal("0")),
+            "sugerencias": sugerencias_para(producto_txt, productos, top=2),
+        })
+    return factura_id, raw_text, items
+
+
+def _analizar_facturas_en_lote(pares, productos):
+    """
+    Reparte las facturas en un pool de procesos (mismo patrón que
+    render_facturas_en_lote). Con una sola factura, una sola CPU o si no
+    se puede levantar el pool, corre en este proceso.
+    """
+    workers = min(4, os.cpu_count() or 1, len(pares))
+    if workers > 1:
+        try:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_pool_lote,
+                initargs=(productos,),
+            )
+        except (OSError, NotImplementedError):
+            executor = None
+
+        if executor is not None:
+            with executor:
+                yield from executor.map(_analizar_factura_lote, pares)
+            return
+
+    # En este proceso el catálogo va como argumento: otro request en otro
+    # hilo puede estar corriendo su propio lote
+    for par in pares:
+        yield _analizar_factura_lote(par, productos)
+
+
+def _batches_lote_en_sesion(request):
+    ids = request.session.get("facturas_lote_batch_ids") or []
+    if not ids:
+        return []
+    return list(
+        ImportBatch.objects
+        .filter(pk__in=ids, tipo=ImportBatch.Tipo.FACTURA, estado=ImportBatch.Estado.PENDIENTE)
+        .select_related("factura_proveedor")
+        .order_by("id")
+    )
+
+
+def _confirmar_lote_facturas(request, batches):
+    """
+    Aplica las filas marcadas de todas las facturas del lote en UNA transacción:
+    ItemFactura, productos nuevos, stock y costo con operaciones bulk.
+    Devuelve (totales, por_factura).
+    """
+    filas = list(
+        ImportRow.objects
+        .filter(batch__in=batches)
+        .select_related("batch")
+        .order_by("batch_id", "orden")
+    )
+
+    decisiones = []
+    for fila in filas:
+        pref = f"f{fila.pk}_"
+        if f"{pref}check" not in request.POST:
+            continue
+
+        producto_txt = _normalizar_texto_factura(request.POST.get(f"{pref}producto", fila.nombre))
+        cantidad = _to_decimal(request.POST.get(f"{pref}cantidad", fila.cantidad), "1")
+        precio = _to_decimal(request.POST.get(f"{pref}precio", fila.precio), "0")
+
+        sku_input = _normalizar_texto_factura(
+            request.POST.get(f"{pref}sku") or ""
+        ).replace(" ", "_").replace("/", "_").replace("-", "_")
+        crear = f"{pref}crear" in request.POST
+
+        if sku_input:
+            sku = sku_input[:50]
+        elif crear:
+            sku = producto_txt.replace(" ", "_").replace("/", "_").replace("-", "_")[:50]
+        else:
+            sku = ""
+
+        decisiones.append({
+            "factura_id": fila.batch.factura_proveedor_id,
+            "producto": producto_txt,
+            "cantidad": cantidad,
+            "precio": precio,
+            "sku": sku,
+            "crear": crear,
+            "stock": f"{pref}stock" in request.POST,
+            "costo": f"{pref}costo" in request.POST,
+        })
+
+    # Productos del catálogo por SKU (case-insensitive), en bloques
+    skus = sorted({d["sku"].lower() for d in decisiones if d["sku"]})
+    por_sku = {}
+    for i in range(0, len(skus), IMPORT_CHUNK):
+        qs = (
+            ProductoPrecio.objects
+            .annotate(sku_l=Lower("sku"))
+            .filter(sku_l__in=skus[i:i + IMPORT_CHUNK])
+            .order_by("pk")
+        )
+        for p in qs:
+            por_sku.setdefault(p.sku_l, p)
+
+    por_factura = {
+        b.factura_proveedor_id: {"items": 0, "creados": 0, "stock": 0, "costo": 0}
+        for b in batches
+    }
+
+    with transaction.atomic():
+        # Fechas editadas en la revisión (antes de los ítems, que las copian)
+        facturas = []
+        for b in batches:
+            fecha_str = request.POST.get(f"fecha_{b.pk}")
+            if not fecha_str:
+                continue
+            try:
+                b.factura_proveedor.fecha_factura = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            facturas.append(b.factura_proveedor)
+        FacturaProveedor.objects.bulk_update(facturas, ["fecha_factura"])
+
+        # Productos nuevos: uno por SKU aunque aparezca en varias facturas
+        nuevos = {}
+        for d in decisiones:
+            clave = d["sku"].lower()
+            if d["sku"] and d["crear"] and clave not in por_sku and clave not in nuevos:
+                nuevos[clave] = ProductoPrecio(
+                    sku=d["sku"],
+                    nombre_publico=d["producto"] or d["sku"],
+                    precio=d["precio"],
+                    precio_costo=d["precio"],
+                    stock=0,
+                    activo=False,  # mejor dejarlo incompleto hasta revisarlo
+                )
+                por_factura[d["factura_id"]]["creados"] += 1
+        ProductoPrecio.objects.bulk_create(list(nuevos.values()), batch_size=IMPORT_CHUNK)
+        por_sku.update(nuevos)
+
+        # Ítems de factura, ya vinculados al producto del catálogo
+        facturas_por_id = {b.factura_proveedor_id: b.factura_proveedor for b in batches}
+        ItemFactura.objects.bulk_create([
+            ItemFactura(
+                factura_id=d["factura_id"],
+                producto=d["producto"],
+                cantidad=d["cantidad"],
+                precio_unitario=d["precio"],
+                subtotal=d["cantidad"] * d["precio"],
+                producto_catalogo=por_sku.get(d["sku"].lower()) if d["sku"] else None,
+                fecha=facturas_por_id[d["factura_id"]].fecha_compra,
+            )
+            for d in decisiones
+        ], batch_size=IMPORT_CHUNK)
+
+        # Stock: un UPDATE por producto con todo lo que entró (un movimiento por
+        # ítem, con su factura); costo: gana la última factura
+        entradas_stock = []
+        costo_por_producto = {}
+        for d in decisiones:
+            producto = por_sku.get(d["sku"].lower()) if d["sku"] else None
+            if not producto:
+                continue
+            if d["stock"]:
+                entradas_stock.append((producto.pk, int(d["cantidad"]), facturas_por_id[d["factura_id"]]))
+                por_factura[d["factura_id"]]["stock"] += 1
+            if d["costo"]:
+                costo_por_producto[producto.pk] = (producto, d["precio"])
+                por_factura[d["factura_id"]]["costo"] += 1
+
+        StockMovimiento.sumar_varios(
+            entradas_stock, StockMovimiento.Motivo.COMPRA, usuario=getattr(request, "user", None)
+        )
+
+        a_costo = []
+        historial = []
+        for producto, costo in costo_por_producto.values():
+            historial.append(PrecioHistorial.nuevo(
+                producto,
+                producto.precio,
+                producto.precio,
+                origen="factura_proveedor",
+                costo_anterior=producto.precio_costo,
+                costo_nuevo=costo,
+            ))
+            producto.precio_costo = costo
+            a_costo.append(producto)
+        ProductoPrecio.objects.bulk_update(a_costo, ["precio_costo"], batch_size=IMPORT_CHUNK)
+        PrecioHistorial.registrar_varios(historial)
+
+        ImportBatch.objects.filter(pk__in=[b.pk for b in batches]).update(
+            estado=ImportBatch.Estado.CONFIRMADO,
+            confirmado_en=timezone.now(),
+        )
+
+    for d in decisiones:
+        por_factura[d["factura_id"]]["items"] += 1
+
+    totales = {
+        "items": len(decisiones),
+        "creados": len(nuevos),
+        "stock": len({pk for pk, _, _ in entradas_stock}),
+        "costo": len(costo_por_producto),
+        "creados_ids": [p.pk for p in nuevos.values()],
+    }
+    return totales, por_factura
+
+
+def procesar_facturas_lote(request):
+    """
+    Varias facturas de proveedor de una vez.
+
+    - Paso 1: subir N PDFs → se parsean y matchean en paralelo (pool de
+      procesos) y queda un ImportBatch por factura.
+    - Paso 2: una sola pantalla de revisión con las filas de todas.
+    - Paso 3: confirmar todo junto en una transacción (ver _confirmar_lote_facturas).
+    """
+    batches = _batches_lote_en_sesion(request)
+
+    if request.method == "POST" and request.POST.get("descartar"):
+        ImportBatch.objects.filter(pk__in=[b.pk for b in batches]).update(
+            estado=ImportBatch.Estado.DESCARTADO
+        )
+        request.session.pop("facturas_lote_batch_ids", None)
+        messages.info(request, "Lote de facturas descartado.")
+        return redirect("procesar_facturas_lote")
+
+    # ======================================================
+    # PASO 3 — CONFIRMAR TODO
+    # ======================================================
+    if request.method == "POST" and request.POST.get("confirmar_lote"):
+        if not batches:
+            messages.error(request, "Sesión expirada. Volvé a cargar las facturas.")
+            return redirect("procesar_facturas_lote")
+
+        totales, por_factura = _confirmar_lote_facturas(request, batches)
+        request.session.pop("facturas_lote_batch_ids", None)
+
+        for b in batches:
+            cuenta = por_factura[b.factura_proveedor_id]
+            registrar_evento(
+                tipo="factura_proveedor_confirmada",
+                titulo=f"Factura de proveedor procesada (ID {b.factura_proveedor_id})",
+                detalle=(
+                    f"Lote de {len(batches)} facturas. Items: {cuenta['items']}, "
+                    f"productos creados: {cuenta['creados']}, "
+                    f"stock actualizado: {cuenta['stock']}, "
+                    f"costo actualizado: {cuenta['costo']}."
+                ),
+                user=getattr(request, "user", None),
+                obj=b.factura_proveedor,
+                extra={
+                    "factura_id": b.factura_proveedor_id,
+                    "lote_facturas": [x.factura_proveedor_id for x in batches],
+                    "items_creados": cuenta["items"],
+                    "productos_creados": cuenta["creados"],
+                    "productos_stock_actualizado": cuenta["stock"],
+                    "productos_costo_actualizado": cuenta["costo"],
+                },
+            )
+
+        resumen = (
+            f"{len(batches)} facturas guardadas: {totales['items']} ítems, "
+            f"{totales['creados']} productos nuevos, stock en {totales['stock']} "
+            f"y costo en {totales['costo']} productos."
+        )
+
+        if totales["creados_ids"]:
+            request.session["productos_factura_creados_ids"] = totales["creados_ids"]
+            messages.success(request, f"{resumen} Ahora completá los datos de los productos creados.")
+            return redirect("owner_productos_completar_desde_factura")
+
+        messages.success(request, resumen)
+        return redirect("procesar_facturas_lote")
+
+    # ======================================================
+    # PASO 1 — SUBIR Y ANALIZAR EN PARALELO
+    # ======================================================
+    form = FacturasProveedorLoteForm()
+    if request.method == "POST":
+        form = FacturasProveedorLoteForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            # Si había un lote a medio revisar, se descarta
+            ImportBatch.objects.filter(pk__in=[b.pk for b in batches]).update(
+                estado=ImportBatch.Estado.DESCARTADO
+            )
+
+            facturas = {}
+            for archivo in form.cleaned_data["archivos"]:
+                factura = FacturaProveedor.objects.create(archivo=archivo)
+                facturas[factura.pk] = factura
+                registrar_evento(
+                    tipo="factura_proveedor_subida",
+                    titulo=f"Factura de proveedor subida (ID {factura.pk})",
+                    detalle="Factura de proveedor cargada en lote para análisis automático.",
+                    user=getattr(request, "user", None),
+                    obj=factura,
+                    extra={
+                        "factura_id": factura.pk,
+                        "archivo": factura.archivo.name,
+                    },
+                )
+
+            productos = list(
+                ProductoPrecio.objects.filter(activo=True).values(
+                    "id", "sku", "nombre_publico", "precio", "precio_costo"
+                )
+            )
+            pares = [
+                (pk, os.path.join(settings.MEDIA_ROOT, f.archivo.name))
+                for pk, f in facturas.items()
+            ]
+
+            filas = []
+            nuevos_batches = []
+            sin_texto = []
+            usuario = request.user if request.user.is_authenticated else None
+
+            for factura_id, raw_text, items in _analizar_facturas_en_lote(pares, productos):
+                if not raw_text.strip():
+                    sin_texto.append(facturas[factura_id].archivo.name)
+
+                batch = ImportBatch.objects.create(
+                    tipo=ImportBatch.Tipo.FACTURA,
+                    factura_proveedor=facturas[factura_id],
+                    usuario=usuario,
+                    total_filas=len(items),
+                )
+                nuevos_batches.append(batch.pk)
+                filas.extend(
+                    ImportRow(
+                        batch=batch,
+                        orden=index,
+                        nombre=i["producto"][:255],
+                        cantidad=_to_decimal(i["cantidad"], "1").quantize(Q2),
+                        precio=_to_decimal(i["precio_unitario"], "0").quantize(Q2),
+                        sugerencias=i["sugerencias"],
+                    )
+                    for index, i in enumerate(items)
+                )
+
+            ImportRow.objects.bulk_create(filas, batch_size=IMPORT_CHUNK)
+            request.session["facturas_lote_batch_ids"] = nuevos_batches
+
+            if sin_texto:
+                messages.warning(
+                    request,
+                    "Sin texto (¿escaneadas?), procesalas de a una para usar OCR: "
+                    + ", ".join(os.path.basename(n) for n in sin_texto),
+                )
+            return redirect("procesar_facturas_lote")
+
+    # ======================================================
+    # PASO 2 — REVISIÓN CONSOLIDADA
+    # ======================================================
+    if batches and request.method == "GET":
+        filas_por_batch = {}
+        for fila in ImportRow.objects.filter(batch__in=batches).order_by("batch_id", "orden"):
+            sugerencia = (fila.sugerencias or [None])[0]
+            fila.sku_sugerido = (
+                sugerencia["sku"]
+                if sugerencia and sugerencia.get("score", 0) >= LOTE_SCORE_AUTOMATICO
+                else ""
+            )
+            fila.subtotal = ((fila.cantidad or Decimal("1")) * fila.precio).quantize(Q2)
+            filas_por_batch.setdefault(fila.batch_id, []).append(fila)
+
+        grupos = [
+            {
+                "batch": b,
+                "factura": b.factura_proveedor,
+                "filas": filas_por_batch.get(b.pk, []),
+            }
+            for b in batches
+        ]
+
+        return render(
+            request,
+            "pdf/procesar_facturas_lote.html",
+            {
+                "grupos": grupos,
+                "total_filas": sum(len(g["filas"]) for g in grupos),
+                "productos_livianos": ProductoPrecio.objects.filter(activo=True).values("sku", "nombre_publico"),
+                "fecha_hoy": datetime.now().strftime("%Y-%m-%d"),
+            },
+        )
+
+    return render(
+        request,
+        "pdf/procesar_facturas_lote.html",
+        {"form": form},
+    )
+
+
 # ============================================================
 # HISTORIA LISTAS
 # ============================================================
@@ -1598,8 +2514,35 @@ def factura_crear(request):
                     "subtotal": subtotal,
                 })
 
-            # generar PDF + registrar en bitácora (con adjunto)
-            return _factura_pdf_response(request, form.cleaned_data, items, total)
+            data = form.cleaned_data
+            with transaction.atomic():
+                factura = Factura.objects.create(
+                    vendedor_nombre=data["vendedor_nombre"],
+                    vendedor_whatsapp=data["vendedor_whatsapp"],
+                    vendedor_horario=data["vendedor_horario"],
+                    vendedor_direccion=data["vendedor_direccion"],
+                    cliente_nombre=data["cliente_nombre"],
+                    cliente_telefono=data.get("cliente_telefono") or "",
+                    cliente_doc=data.get("cliente_doc") or "",
+                    cliente_direccion=data.get("cliente_direccion") or "",
+                    validez_dias=int(data.get("validez_dias") or 7),
+                    sena=_to_decimal(data.get("sena") or "0", "0").quantize(Q2),
+                    total=total.quantize(Q2),
+                )
+                FacturaItem.objects.bulk_create([
+                    FacturaItem(
+                        factura=factura,
+                        producto_nombre=it["nombre"][:200],
+                        descripcion=it["descripcion"][:255],
+                        precio_unitario=it["precio"],
+                        cantidad=it["cantidad"],
+                        subtotal=it["subtotal"],
+                    )
+                    for it in items
+                ])
+
+            # generar PDF + guardarlo en la factura + registrar en bitácora
+            return _factura_pdf_response(request, factura)
 
     else:
         form = FacturaForm(initial=initial)
@@ -1629,10 +2572,69 @@ def _precio_mayorista(unit: Decimal, descuento_pct: Decimal) -> Decimal:
     return (unit * factor).quantize(Q2, rounding=ROUND_HALF_UP)
 
 
+def _inicio_cambios_lista(fecha=None):
+    """
+    Desde cuándo se buscan cambios de precio:
+    - si viene fecha -> inicio de ese día
+    - si no -> momento en que se generó la última lista (None si nunca se generó)
+    """
+    if fecha:
+        return timezone.make_aware(datetime.combine(fecha, datetime.min.time()))
+
+    return (
+        BitacoraEvento.objects
+        .filter(tipo="lista_precios_pdf_generada")
+        .order_by("-created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    )
+
+
+def _cambios_de_precio_desde(desde, tecnica="ALL"):
+    """
+    Productos activos cuyo precio cambió desde `desde`, leyendo PrecioHistorial.
+    Compara el precio anterior al primer cambio del rango contra el precio actual,
+    así si un precio subió y volvió a bajar no aparece.
+    """
+    qs = (
+        PrecioHistorial.objects
+        .filter(creado_en__gte=desde, producto__activo=True, variante__isnull=True)
+        .select_related("producto")
+        .order_by("creado_en", "id")
+    )
+    if tecnica != "ALL":
+        qs = qs.filter(producto__tech=tecnica)
+
+    cambios = {}
+    for h in qs:
+        if h.producto_id not in cambios:
+            cambios[h.producto_id] = {
+                "producto": h.producto,
+                "precio_anterior": h.precio_anterior,
+            }
+
+    return sorted(
+        (c for c in cambios.values() if c["precio_anterior"] != c["producto"].precio),
+        key=lambda c: (c["producto"].nombre_publico or "").lower(),
+    )
+
+
 def lista_precios_opciones(request):
     if request.method == "POST":
         form = ListaPreciosPDFForm(request.POST, request.FILES)
+
+        # Modo "solo cambios": necesitamos una fecha de corte
+        desde = None
+        if form.is_valid() and form.cleaned_data.get("modo") == "cambios":
+            desde = _inicio_cambios_lista(form.cleaned_data.get("cambios_desde"))
+            if desde is None:
+                form.add_error(
+                    "cambios_desde",
+                    "Todavía no se generó ninguna lista. Elegí una fecha.",
+                )
+
         if form.is_valid():
+            modo = form.cleaned_data.get("modo") or "completa"
             tecnica = form.cleaned_data["tecnica"]          # ALL / SUB / LAS / 3D / OTR
             incluir_sku = form.cleaned_data["incluir_sku"]  # bool
             descuento = form.cleaned_data["descuento_mayorista"]  # Decimal
@@ -1665,15 +2667,21 @@ def lista_precios_opciones(request):
             # =========================
             # Productos
             # =========================
-            qs = ProductoPrecio.objects.filter(activo=True)
-            if tecnica != "ALL":
-                qs = qs.filter(tech=tecnica)
-            qs = qs.order_by("tech", "nombre_publico")
+            if modo == "cambios":
+                # Cada item: {"producto", "precio_anterior"}
+                qs = _cambios_de_precio_desde(desde, tecnica)
+                tech_de = lambda c: c["producto"].tech
+            else:
+                qs = ProductoPrecio.objects.filter(activo=True)
+                if tecnica != "ALL":
+                    qs = qs.filter(tech=tecnica)
+                qs = qs.order_by("tech", "nombre_publico")
+                tech_de = lambda p: p.tech
 
             buckets = {"SUB": [], "LAS": [], "3D": [], "OTR": []}
             if tecnica == "ALL":
                 for p in qs:
-                    code = p.tech if p.tech in buckets else "OTR"
+                    code = tech_de(p) if tech_de(p) in buckets else "OTR"
                     buckets[code].append(p)
                 tech_order = ["SUB", "LAS", "3D", "OTR"]
             else:
@@ -1683,7 +2691,10 @@ def lista_precios_opciones(request):
             # =========================
             # PDF Response
             # =========================
-            filename = f"lista_precios_{timezone.localdate().strftime('%Y-%m-%d')}.pdf"
+            if modo == "cambios":
+                filename = f"lista_precios_cambios_{timezone.localdate().strftime('%Y-%m-%d')}.pdf"
+            else:
+                filename = f"lista_precios_{timezone.localdate().strftime('%Y-%m-%d')}.pdf"
             resp = HttpResponse(content_type="application/pdf")
             resp["Content-Disposition"] = f'attachment; filename="{filename}"'
 
@@ -1787,89 +2798,104 @@ def lista_precios_opciones(request):
 
             story = []
 
-            # =========================
-            # Secciones + Tablas
-            # =========================
-            for tech_code in tech_order:
-                items = buckets.get(tech_code) or []
-                if not items:
-                    continue
-
-                # Heading1 “setea” current_tech para TODAS las páginas de esa sección
-                story.append(Paragraph(_tech_label(tech_code), styles["Heading1"]))
-                story.append(Spacer(1, 0.15 * cm))
-
-                # ===== 3 columnas SIEMPRE =====
-                # Imagen | Producto(+SKU opcional) | Precio (minorista o mayorista)
-                header_precio = "Mayorista" if lista_mayorista else "Unitario"
-                data = [["Imagen", "Producto", header_precio]]
-
-                # 🔸 Columnas ajustadas:
-                # - Imagen más ancha
-                # - Producto un poco más angosto (fuerza 2 renglones si es largo)
-                # - Precio más ancho
-                colw = [3.0 * cm, 9.0 * cm, 4.0 * cm]
-
-                for p in items:
-                    unit = (p.precio or Decimal("0.00")).quantize(Q2)
-                    may = _precio_mayorista(unit, descuento)
-                    precio = may if lista_mayorista else unit
-
-                    # Producto: nombre grande + SKU chico debajo (opcional)
-                    nombre_paragraph = Paragraph(
-                        f"<b>{p.nombre_publico}</b>",
-                        styles["Normal"],
-                    )
-
-                    if incluir_sku and (p.sku or "").strip():
-                        prod_cell = [
-                            nombre_paragraph,
-                            Paragraph(f"SKU: {p.sku}", sku_style),
-                        ]
-                    else:
-                        prod_cell = nombre_paragraph
-
-                    # Precio más grande y en negrita
-                    precio_paragraph = Paragraph(
-                        f"<b>$ {precio:.2f}</b>",
-                        styles["Normal"],
-                    )
-
-                    data.append([
-                        # Imagen más grande
-                        _safe_img(p.imagen, max_w_cm=2.4, max_h_cm=2.4),
-                        prod_cell,
-                        precio_paragraph,
-                    ])
-
-                table = Table(data, colWidths=colw, repeatRows=1)
-
-                # 🔧 Estilos: más fuente, más padding, menos filas por hoja
-                table.setStyle(TableStyle([
-                    ("GRID",       (0, 0), (-1, -1), 0.3, colors.grey),
-
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("FONTNAME",   (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE",   (0, 0), (-1, 0), 11),  # header más grande
-                    ("FONTSIZE",   (0, 1), (-1, -1), 10),  # cuerpo un poquito más grande
-
-                    ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
-                    ("ALIGN",      (2, 1), (2, -1), "RIGHT"),
-
-                    # Padding general (más altura de fila → menos ítems por página)
-                    ("TOPPADDING",    (0, 0), (-1, -1), 9),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 9),
-
-                    # Separar texto del borde
-                    ("LEFTPADDING", (1, 0), (1, -1), 10),
-
-                    # Imagen: un toque más de padding
-                    ("LEFTPADDING",  (0, 0), (0, -1), 6),
-                    ("RIGHTPADDING", (0, 0), (0, -1), 6),
-                ]))
-
-                story.append(table)
-                story.append(PageBreak())
+            if modo == "cambios":
+                story.extend(_story_cambios_precio(
+                    buckets,
+                    tech_order,
+                    desde=desde,
+                    styles=styles,
+                    sku_style=sku_style,
+                    incluir_sku=incluir_sku,
+                    lista_mayorista=lista_mayorista,
+                    descuento=descuento,
+                ))
+            else:
+                # =========================
+                # Secciones + Tablas
+                # =========================
+                for tech_code in tech_order:
+                    items = buckets.get(tech_code) or []
+                    if not items:
+                        continue
+
+                    # Heading1 “setea” current_tech para TODAS las páginas de esa sección
+                    story.append(Paragraph(_tech_label(tech_code), styles["Heading1"]))
+                    story.append(Spacer(1, 0.15 * cm))
+
+                    # ===== 3 columnas SIEMPRE =====
+                    # Imagen | Producto(+SKU opcional) | Precio (minorista o mayorista)
+                    header_precio = "Mayorista" if lista_mayorista else "Unitario"
+                    data = [["Imagen", "Producto", header_precio]]
+
+                    # 🔸 Columnas ajustadas:
+                    # - Imagen más ancha
+                    # - Producto un poco más angosto (fuerza 2 renglones si es largo)
+                    # - Precio más ancho
+                    colw = [3.0 * cm, 9.0 * cm, 4.0 * cm]
+
+                    for p in items:
+                        unit = (p.precio or Decimal("0.00")).quantize(Q2)
+                        may = _precio_mayorista(unit, descuento)
+                        precio = may if lista_mayorista else unit
+
+                        # Producto: nombre grande + SKU chico debajo (opcional)
+                        nombre_paragraph = Paragraph(
+                            f"<b>{p.nombre_publico}</b>",
+                            styles["Normal"],
+                        )
+
+                        if incluir_sku and (p.sku or "").strip():
+                            prod_cell = [
+                                nombre_paragraph,
+                                Paragraph(f"SKU: {p.sku}", sku_style),
+                            ]
+                        else:
+                            prod_cell = nombre_paragraph
+
+                        # Precio más grande y en negrita
+                        precio_paragraph = Paragraph(
+                            f"<b>$ {precio:.2f}</b>",
+                            styles["Normal"],
+                        )
+
+                        data.append([
+                            # Imagen más grande
+                            _safe_img(p.imagen, max_w_cm=2.4, max_h_cm=2.4),
+                            prod_cell,
+                            precio_paragraph,
+                        ])
+
+                    table = Table(data, colWidths=colw, repeatRows=1)
+
+                    # 🔧 Estilos: más fuente, más padding, menos filas por hoja
+                    table.setStyle(TableStyle([
+                        ("GRID",       (0, 0), (-1, -1), 0.3, colors.grey),
+
+                        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+                        ("FONTNAME",   (0, 0), (-1, 0), "Helvetica-Bold"),
+                        ("FONTSIZE",   (0, 0), (-1, 0), 11),  # header más grande
+                        ("FONTSIZE",   (0, 1), (-1, -1), 10),  # cuerpo un poquito más grande
+
+                        ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
+                        ("ALIGN",      (2, 1), (2, -1), "RIGHT"),
+
+                        # Padding general (más altura de fila → menos ítems por página)
+                        ("TOPPADDING",    (0, 0), (-1, -1), 9),
+                        ("BOTTOMPADDING", (0, 0), (-1, -1), 9),
+
+                        # Separar texto del borde
+                        ("LEFTPADDING", (1, 0), (1, -1), 10),
+
+                        # Imagen: un toque más de padding
+                        ("LEFTPADDING",  (0, 0), (0, -1), 6),
+                        ("RIGHTPADDING", (0, 0), (0, -1), 6),
+                    ]))
+
+                    story.append(table)
+                    story.append(PageBreak())
+
+            if not story:
+                story.append(Paragraph("No hay productos para mostrar.", styles["Normal"]))
 
             doc.build(
                 story,
@@ -1877,6 +2903,24 @@ def lista_precios_opciones(request):
                 onLaterPages=draw_header_and_watermark,
             )
 
+            registrar_evento(
+                tipo="lista_precios_pdf_generada",
+                titulo=(
+                    "Lista de precios PDF generada (solo cambios)"
+                    if modo == "cambios" else
+                    "Lista de precios PDF generada"
+                ),
+                detalle=f"Técnica: {tecnica}. Archivo: {filename}",
+                user=getattr(request, "user", None),
+                extra={
+                    "modo": modo,
+                    "tecnica": tecnica,
+                    "lista_mayorista": bool(lista_mayorista),
+                    "desde": desde.isoformat() if desde else None,
+                    "productos": sum(len(buckets.get(t) or []) for t in buckets),
+                },
+            )
+
             return resp
 
     else:
@@ -1885,197 +2929,149 @@ def lista_precios_opciones(request):
     return render(request, "pdf/lista_precios_opciones.html", {"form": form})
 
 
-# ============================================================
-# GENERACIÓN PDF FACTURA (con archivo en bitácora)
-# ============================================================
+def _story_cambios_precio(buckets, tech_order, desde, styles, sku_style,
+                          incluir_sku=False, lista_mayorista=False, descuento=Decimal("0")):
+    """
+    Arma el contenido del PDF "solo cambios": por técnica, una tabla
+    Producto | Antes | Ahora | Var. (sin imágenes, para que quede liviano).
+    """
+    story = [
+        Paragraph(
+            f"Cambios de precio desde el {timezone.localtime(desde).strftime('%d/%m/%Y %H:%M')}",
+            styles["Title"],
+        ),
+        Spacer(1, 0.3 * cm),
+    ]
 
-def _factura_pdf_response(request, data, items, total):
-    filename = f"factura_{timezone.localdate().strftime('%Y-%m-%d')}.pdf"
+    for tech_code in tech_order:
+        items = buckets.get(tech_code) or []
+        if not items:
+            continue
 
-    # Buffer en memoria para crear el PDF
-    buffer = BytesIO()
+        story.append(Paragraph(_tech_label(tech_code), styles["Heading1"]))
+        story.append(Spacer(1, 0.15 * cm))
 
-    styles = getSampleStyleSheet()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        leftMargin=2.0 * cm,
-        rightMargin=2.0 * cm,
-        topMargin=1.8 * cm,
-        bottomMargin=1.8 * cm,
-    )
+        data = [["Producto", "Antes", "Ahora", "Var."]]
 
-    story = []
+        for c in items:
+            p = c["producto"]
+            nuevo = (p.precio or Decimal("0.00")).quantize(Q2)
+            anterior = (c["precio_anterior"] or Decimal("0.00")).quantize(Q2)
 
-    # Helper para texto seguro en Paragraph (evitar problemas con <, >, &)
-    def _rl_safe(text):
-        return (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+            if lista_mayorista:
+                nuevo = _precio_mayorista(nuevo, descuento)
+                anterior = _precio_mayorista(anterior, descuento)
 
-    # Logo
-    logo_path = os.path.join(settings.MEDIA_ROOT, "branding", "logo.png")
+            if anterior > 0:
+                var = ((nuevo / anterior) - Decimal("1")) * Decimal("100")
+                var_txt = f"{var.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP):+}%"
+            else:
+                var_txt = "—"
 
-    left = []
-    if os.path.exists(logo_path):
-        left.append(Image(logo_path, width=2.8 * cm, height=2.8 * cm))
-    else:
-        left.append(Paragraph("<b>Mundo Personalizado</b>", styles["Title"]))
-
-    titulo = Paragraph(
-        "<para align='center'>"
-        "<b>FACTURA SIN VALOR FISCAL</b><br/>"
-        f"<font size=9>Fecha: {timezone.localtime().strftime('%d/%m/%Y %H:%M')}</font><br/>"
-        f"<font size=9>Validez: {int(data.get('validez_dias') or 7)} días</font>"
-        "</para>",
-        styles["Normal"],
-    )
+            nombre_paragraph = Paragraph(f"<b>{p.nombre_publico}</b>", styles["Normal"])
+            if incluir_sku and (p.sku or "").strip():
+                prod_cell = [nombre_paragraph, Paragraph(f"SKU: {p.sku}", sku_style)]
+            else:
+                prod_cell = nombre_paragraph
+
+            data.append([
+                prod_cell,
+                f"$ {anterior:.2f}",
+                Paragraph(f"<b>$ {nuevo:.2f}</b>", styles["Normal"]),
+                var_txt,
+            ])
+
+        table = Table(data, colWidths=[9.0 * cm, 2.6 * cm, 2.8 * cm, 1.8 * cm], repeatRows=1)
+        table.setStyle(TableStyle([
+            ("GRID",       (0, 0), (-1, -1), 0.3, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+            ("FONTNAME",   (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE",   (0, 0), (-1, -1), 10),
+            ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
+            ("ALIGN",      (1, 1), (-1, -1), "RIGHT"),
+            ("TEXTCOLOR",  (1, 1), (1, -1), colors.grey),
+            ("TOPPADDING",    (0, 0), (-1, -1), 5),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ]))
+
+        story.append(table)
+        story.append(Spacer(1, 0.5 * cm))
+
+    return story
 
-    vendedor = Paragraph(
-        "<para align='right'>"
-        f"<b>{_rl_safe(data['vendedor_nombre'])}</b><br/>"
-        f"WhatsApp: {_rl_safe(data['vendedor_whatsapp'])}<br/>"
-        f"Horario: {_rl_safe(data['vendedor_horario'])}<br/>"
-        f"{_rl_safe(data['vendedor_direccion'])}"
-        "</para>",
-        styles["Normal"],
-    )
 
-    header = Table(
-        [[left, titulo, vendedor]],
-        colWidths=[3.2 * cm, 7.0 * cm, 6.0 * cm],
-    )
-    header.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("LINEBELOW", (0, 0), (-1, 0), 0.75, colors.lightgrey),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
-    ]))
-    story.append(header)
-    story.append(Spacer(1, 0.5 * cm))
-
-    # Cliente (cajita)
-    cliente = Table(
-        [[
-            Paragraph(
-                f"<b>Cliente</b><br/>"
-                f"Nombre: {_rl_safe(data['cliente_nombre'])}<br/>"
-                f"Tel: {_rl_safe(data.get('cliente_telefono') or '—')}<br/>"
-                f"DNI/CUIL: {_rl_safe(data.get('cliente_doc') or '—')}<br/>"
-                f"Dirección: {_rl_safe(data.get('cliente_direccion') or '—')}",
-                styles["Normal"],
-            )
-        ]],
-        colWidths=[16.2 * cm],
-    )
+# ============================================================
+# GENERACIÓN PDF FACTURA (archivo guardado en la factura)
+# ============================================================
 
-    cliente.setStyle(TableStyle([
-        ("BOX", (0, 0), (-1, -1), 0.6, colors.lightgrey),
-        ("BACKGROUND", (0, 0), (-1, -1), colors.whitesmoke),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        ("TOPPADDING", (0, 0), (-1, -1), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-    ]))
-    story.append(cliente)
-    story.append(Spacer(1, 0.5 * cm))
-
-    # Items (nombre + descripción debajo)
-    table_data = [["Producto", "Cant.", "Unitario", "Subtotal"]]
-
-    for it in items:
-        nombre_safe = _rl_safe(it["nombre"])
-        desc_safe = _rl_safe(it.get("descripcion") or "")
-
-        if desc_safe:
-            prod_text = (
-                f"<b>{nombre_safe}</b><br/>"
-                f"<font size='8' color='#777777'>{desc_safe}</font>"
-            )
-        else:
-            prod_text = f"<b>{nombre_safe}</b>"
+def _datos_factura(factura):
+    """
+    Pasa la factura (con sus items) a datos planos para render_factura_pdf.
+    Así el render no toca la base y se puede mandar a otro proceso.
+    """
+    return {
+        "vendedor_nombre": factura.vendedor_nombre,
+        "vendedor_whatsapp": factura.vendedor_whatsapp,
+        "vendedor_horario": factura.vendedor_horario,
+        "vendedor_direccion": factura.vendedor_direccion,
+        "cliente_nombre": factura.cliente_nombre,
+        "cliente_telefono": factura.cliente_telefono,
+        "cliente_doc": factura.cliente_doc,
+        "cliente_direccion": factura.cliente_direccion,
+        "validez_dias": factura.validez_dias,
+        "sena": factura.sena,
+        "total": factura.total,
+        "fecha": timezone.localtime(factura.creado).strftime("%d/%m/%Y %H:%M"),
+        "logo_path": os.path.join(settings.MEDIA_ROOT, "branding", "logo.png"),
+        "items": [
+            {
+                "nombre": it.producto_nombre,
+                "descripcion": it.descripcion,
+                "cantidad": it.cantidad,
+                "precio": it.precio_unitario,
+                "subtotal": it.subtotal,
+            }
+            for it in factura.items.all()
+        ],
+    }
 
-        prod_paragraph = Paragraph(prod_text, styles["Normal"])
 
-        table_data.append([
-            prod_paragraph,
-            str(it["cantidad"]),
-            f"$ {it['precio']:.2f}",
-            f"$ {it['subtotal']:.2f}",
-        ])
+def _factura_tiene_archivo(factura) -> bool:
+    return bool(factura.archivo) and factura.archivo.storage.exists(factura.archivo.name)
 
-    tabla = Table(
-        table_data,
-        colWidths=[9.5 * cm, 1.5 * cm, 2.6 * cm, 2.6 * cm],
-        repeatRows=1,
-    )
-    tabla.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
-        ("TOPPADDING", (0, 0), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-    ]))
-    story.append(tabla)
-    story.append(Spacer(1, 0.5 * cm))
-
-    sena = _to_decimal(data.get("sena") or "0", "0").quantize(Q2)
-    saldo = (total - sena).quantize(Q2)
-
-    resumen = Table(
-        [
-            ["Seña:", f"$ {sena:.2f}"],
-            ["Total:", f"$ {total.quantize(Q2):.2f}"],
-            ["Falta abonar:", f"$ {saldo:.2f}"],
-        ],
-        colWidths=[12.0 * cm, 4.2 * cm],
-    )
 
-    resumen.setStyle(TableStyle([
-        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-        ("FONTNAME", (0, 1), (-1, 1), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 11),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-    ]))
-    story.append(resumen)
-
-    story.append(Spacer(1, 0.4 * cm))
-    story.append(
-        Paragraph(
-            "<para align='center'><font size=8 color='#666666'>"
-            "Presupuesto / Factura sin valor fiscal. Validez 7 días salvo indicación contraria."
-            "</font></para>",
-            styles["Normal"],
-        )
-    )
+def _guardar_pdf_factura(factura, pdf_bytes):
+    factura.archivo.save(factura.nombre_archivo, ContentFile(pdf_bytes), save=False)
+    Factura.objects.filter(pk=factura.pk).update(archivo=factura.archivo.name)
 
-    # Construimos el PDF en el buffer
-    doc.build(story)
 
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
+def _factura_pdf_response(request, factura):
+    pdf_bytes = render_factura_pdf(_datos_factura(factura))
+    _guardar_pdf_factura(factura, pdf_bytes)
 
-    # Registrar evento con adjunto
+    # Registrar evento; el adjunto apunta al mismo archivo de la factura
     usuario = request.user if request.user.is_authenticated else None
+    saldo = (factura.total - factura.sena).quantize(Q2)
 
     items_resumen = [
         {
-            "nombre": it["nombre"],
-            "descripcion": it.get("descripcion") or "",
-            "cantidad": it["cantidad"],
-            "precio": str(it["precio"]),
-            "subtotal": str(it["subtotal"]),
+            "nombre": it.producto_nombre,
+            "descripcion": it.descripcion,
+            "cantidad": it.cantidad,
+            "precio": str(it.precio_unitario),
+            "subtotal": str(it.subtotal),
         }
-        for it in items
+        for it in factura.items.all()
     ]
 
     extra = {
-        "cliente_nombre": data.get("cliente_nombre"),
-        "cliente_telefono": data.get("cliente_telefono"),
-        "cliente_doc": data.get("cliente_doc"),
-        "cliente_direccion": data.get("cliente_direccion"),
-        "total": str(total.quantize(Q2)),
-        "sena": str(sena),
+        "factura_id": factura.pk,
+        "cliente_nombre": factura.cliente_nombre,
+        "cliente_telefono": factura.cliente_telefono,
+        "cliente_doc": factura.cliente_doc,
+        "cliente_direccion": factura.cliente_direccion,
+        "total": str(factura.total),
+        "sena": str(factura.sena),
         "saldo": str(saldo),
         "items": items_resumen,
     }
@@ -2083,18 +3079,152 @@ def _factura_pdf_response(request, data, items, total):
     evento = BitacoraEvento.objects.create(
         usuario=usuario,
         tipo="factura_pdf_generada",
-        titulo=f"Factura PDF generada para {data.get('cliente_nombre') or 'cliente sin nombre'}",
-        detalle=f"Total $ {total.quantize(Q2):.2f} - Items: {len(items)}",
-        obj_model="",
-        obj_id="",
+        titulo=f"Factura PDF generada para {factura.cliente_nombre or 'cliente sin nombre'}",
+        detalle=f"Total $ {factura.total:.2f} - Items: {len(items_resumen)}",
+        obj_model=factura._meta.label,
+        obj_id=str(factura.pk),
         extra=extra,
     )
-
-    # Guardamos el PDF como archivo adjunto del evento
-    evento.archivo.save(filename, ContentFile(pdf_bytes))
+    evento.archivo.name = factura.archivo.name
+    evento.save(update_fields=["archivo"])
 
     # Respuesta HTTP con el PDF
     resp = HttpResponse(content_type="application/pdf")
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp["Content-Disposition"] = f'attachment; filename="{factura.nombre_archivo}"'
     resp.write(pdf_bytes)
-    return resp
\ No newline at end of file
+    return resp
+
+
+def factura_descargar(request, pk):
+    """
+    Re-descarga de una factura: si el PDF ya está guardado se sirve tal cual,
+    si no (facturas viejas) se genera una vez y queda guardado.
+    """
+    if not _check_owner(request.user):
+        raise PermissionDenied
+
+    factura = get_object_or_404(Factura.objects.prefetch_related("items"), pk=pk)
+
+    if _factura_tiene_archivo(factura):
+        return FileResponse(
+            factura.archivo.open("rb"),
+            as_attachment=True,
+            filename=factura.nombre_archivo,
+            content_type="application/pdf",
+        )
+
+    pdf_bytes = render_factura_pdf(_datos_factura(factura))
+    _guardar_pdf_factura(factura, pdf_bytes)
+
+    resp = HttpResponse(content_type="application/pdf")
+    resp["Content-Disposition"] = f'attachment; filename="{factura.nombre_archivo}"'
+    resp.write(pdf_bytes)
+    return resp
+
+
+class _ZipSalida:
+    """
+    "Archivo" de solo escritura para zipfile: junta lo escrito y el generador
+    lo va vaciando, así el ZIP sale por partes sin armarse entero en memoria.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        data = b"".join(self._partes)
+        self._partes.clear()
+        return data
+
+
+def _zip_facturas(facturas):
+    """
+    Genera el ZIP por partes:
+    1) primero las facturas que ya tienen PDF guardado (se leen del archivo)
+    2) después las que faltan, renderizadas en lote (pool de procesos)
+       y guardadas para la próxima vez.
+    """
+    salida = _ZipSalida()
+    pendientes = []
+    por_id = {f.pk: f for f in facturas}
+
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zf:
+        for factura in facturas:
+            if _factura_tiene_archivo(factura):
+                with factura.archivo.open("rb") as fh:
+                    zf.writestr(factura.nombre_archivo, fh.read())
+                yield salida.vaciar()
+            else:
+                pendientes.append((factura.pk, _datos_factura(factura)))
+
+        for factura_id, pdf_bytes in render_facturas_en_lote(pendientes):
+            factura = por_id[factura_id]
+            _guardar_pdf_factura(factura, pdf_bytes)
+            zf.writestr(factura.nombre_archivo, pdf_bytes)
+            yield salida.vaciar()
+
+    # directorio central del ZIP
+    yield salida.vaciar()
+
+
+def facturas_lote(request):
+    """
+    Descarga en un ZIP todas las facturas creadas en un rango de fechas.
+    """
+    if not _check_owner(request.user):
+        raise PermissionDenied
+
+    if request.method == "POST":
+        form = FacturasLoteForm(request.POST)
+        if form.is_valid():
+            desde = form.cleaned_data["desde"]
+            hasta = form.cleaned_data["hasta"]
+
+            # Rango por datetimes (no creado__date) para aprovechar el índice
+            tz = timezone.get_current_timezone()
+            inicio = timezone.make_aware(datetime.combine(desde, time.min), tz)
+            fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), tz)
+
+            facturas = list(
+                Factura.objects
+                .filter(creado__gte=inicio, creado__lt=fin)
+                .prefetch_related("items")
+                .order_by("creado", "id")
+            )
+
+            if not facturas:
+                messages.warning(request, "No hay facturas en ese rango de fechas.")
+            else:
+                registrar_evento(
+                    tipo="facturas_pdf_lote",
+                    titulo=f"Facturas PDF en lote ({len(facturas)})",
+                    detalle=f"Rango {desde:%d/%m/%Y} – {hasta:%d/%m/%Y}",
+                    user=request.user,
+                    extra={
+                        "desde": desde.isoformat(),
+                        "hasta": hasta.isoformat(),
+                        "facturas_ids": [f.pk for f in facturas],
+                    },
+                )
+
+                filename = f"facturas_{desde:%Y-%m-%d}_{hasta:%Y-%m-%d}.zip"
+                resp = StreamingHttpResponse(_zip_facturas(facturas), content_type="application/zip")
+                resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+                return resp
+    else:
+        hoy = timezone.localdate()
+        form = FacturasLoteForm(initial={"desde": hoy.replace(day=1), "hasta": hoy})
+
+    ultimas = Factura.objects.order_by("-creado", "-id")[:30]
+
+    return render(request, "pdf/facturas_lote.html", {
+        "form": form,
+        "ultimas": ultimas,
+    })